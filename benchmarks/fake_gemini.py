@@ -0,0 +1,205 @@
+"""
+Local stand-in for the Gemini API (generateContent / streamGenerateContent), used by the
+load test so no network access or API key is needed.
+
+    python -m benchmarks.fake_gemini --port 8765 --latency-ms 400 --output-tokens 60
+
+Point the google-genai clients to it with GOOGLE_GEMINI_BASE_URL=http://127.0.0.1:8765.
+
+Responses are scripted from the request tool declarations:
+  - rating requests get `update_practice_words(_batch)` calls rating every word of the message,
+  - tutor requests call `get_user_info` on the first turn of a conversation (answered
+    directly when the profile is preloaded in the session context), `save_user_info`
+    on the second, `get_practice_words` afterwards, and answer with text once the
+    tool result is in the request,
+  - structured-output (JSON) requests get a quiz (QuizBatch) of five words,
+  - anything else gets a text answer of --output-tokens words.
+Context caching (cachedContents) is answered as unsupported, so clients send prompts inline.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from typing import List, Optional
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+_WORDS = (
+    "muy bien sigue así hoy vamos a practicar un poco más la conversación sobre tu día "
+    "me encanta cómo usas los verbos en pasado recuerda que el gato es masculino y la casa femenina"
+).split()
+
+_TOKEN = re.compile(r"[^\W\d_]+", re.UNICODE)
+_SESSION_CONTEXT = "SESSION CONTEXT"
+
+
+def _declared_functions(body: dict) -> set:
+    return {
+        declaration.get("name")
+        for tool in body.get("tools") or []
+        for declaration in tool.get("functionDeclarations") or []
+    }
+
+
+def _text(content: dict) -> str:
+    return " ".join(part["text"] for part in content.get("parts") or [] if "text" in part)
+
+
+def _rate(message: str) -> List[dict]:
+    # Deterministic pseudo-grading, stable across runs
+    return [
+        {"word": word, "correctness": len(word) % 5}
+        for word in dict.fromkeys(token.lower() for token in _TOKEN.findall(message))
+    ]
+
+
+def _rate_batch(message: str) -> List[dict]:
+    try:
+        messages = json.loads(message)
+    except ValueError:
+        return []
+    return [{"message_id": m.get("message_id"), "updates": _rate(m.get("message", ""))} for m in messages]
+
+
+def _preloaded(text: str) -> bool:
+    # Dynamic tutor instruction (see charla_facil.session_bootstrap) with a loaded profile
+    return _SESSION_CONTEXT in text and "**User profile:** {" in text
+
+
+def _function_call(name: str, args: dict) -> dict:
+    return {"functionCall": {"name": name, "args": args}}
+
+
+class FakeGemini:
+    """Scripted model responses with a configurable latency and output length."""
+
+    def __init__(self, latency: float = 0.4, jitter: float = 0.1, output_tokens: int = 60, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.output_tokens = output_tokens
+        self.requests = 0
+        self._random = random.Random(seed)
+
+    def _reply(self) -> dict:
+        words = [_WORDS[i % len(_WORDS)] for i in range(self.output_tokens)]
+        return {"text": " ".join(words).capitalize() + "."}
+
+    def _quiz(self, message: str) -> dict:
+        topic = message.splitlines()[0].removeprefix("Topic: ") if message else "vocabulario"
+        items = [{"spanish_word": word, "english_translation": word, "difficulty": "easy"}
+                 for word in _WORDS[:5]]
+        return {"text": json.dumps({"topic": topic, "items": items}, ensure_ascii=False)}
+
+    def respond_parts(self, body: dict) -> List[dict]:
+        functions = _declared_functions(body)
+        contents = body.get("contents") or []
+        # The dynamic tutor instruction is sent as user content, not part of the conversation
+        preloaded = any(_preloaded(_text(content)) for content in contents)
+        contents = [content for content in contents if _SESSION_CONTEXT not in _text(content)]
+        last = contents[-1] if contents else {}
+        message = _text(last)
+
+        if (body.get("generationConfig") or {}).get("responseMimeType") == "application/json":
+            return [self._quiz(message)]
+        if "update_practice_words_batch" in functions:
+            return [_function_call("update_practice_words_batch", {"ratings": _rate_batch(message)})]
+        if "update_practice_words" in functions:
+            return [_function_call("update_practice_words", {"updates": _rate(message)})]
+
+        answered = any("functionResponse" in part for part in last.get("parts") or [])
+        if answered or "get_user_info" not in functions:
+            return [self._reply()]
+
+        user_turns = sum(1 for content in contents if content.get("role") == "user" and _text(content))
+        if user_turns <= 1:
+            if preloaded:
+                return [self._reply()]
+            return [_function_call("get_user_info", {"max_events": 10})]
+        if user_turns == 2 and "save_user_info" in functions:
+            return [_function_call("save_user_info", {"update_data": {"interests": ["música", "viajes"]}})]
+        return [_function_call("get_practice_words", {"count": 10})]
+
+    def response(self, body: dict) -> dict:
+        parts = self.respond_parts(body)
+        prompt_tokens = len(json.dumps(body, ensure_ascii=False)) // 4
+        output_tokens = sum(len(json.dumps(part, ensure_ascii=False)) // 4 for part in parts)
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": parts},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": output_tokens,
+                "totalTokenCount": prompt_tokens + output_tokens,
+            },
+            "modelVersion": "fake-gemini",
+        }
+
+    async def _wait(self) -> None:
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter) if self.jitter else self.latency
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def models(self, request: Request) -> Response:
+        _, _, method = request.path_params["model"].partition(":")
+        if method not in ("generateContent", "streamGenerateContent"):
+            return _error(404, f"Unsupported method: {method}")
+
+        self.requests += 1
+        body = await request.json()
+        await self._wait()
+        response = self.response(body)
+
+        if method == "streamGenerateContent":
+            # Single chunk server-sent event stream
+            return Response(f"data: {json.dumps(response)}\n\n", media_type="text/event-stream")
+        return JSONResponse(response)
+
+    async def cached_contents(self, request: Request) -> Response:
+        return _error(400, "Context caching is not supported by the fake model.")
+
+    async def health(self, request: Request) -> Response:
+        return JSONResponse({"status": "ok", "requests": self.requests})
+
+
+def _error(status: int, message: str) -> JSONResponse:
+    return JSONResponse({"error": {"code": status, "message": message, "status": "INVALID_ARGUMENT"}},
+                        status_code=status)
+
+
+def create_app(fake: Optional[FakeGemini] = None) -> Starlette:
+    fake = fake or FakeGemini()
+    app = Starlette(routes=[
+        Route("/{version}/models/{model:path}", fake.models, methods=["POST"]),
+        Route("/{version}/cachedContents", fake.cached_contents, methods=["POST", "GET"]),
+        Route("/{version}/cachedContents/{name:path}", fake.cached_contents, methods=["GET", "PATCH", "DELETE"]),
+        Route("/health", fake.health, methods=["GET"]),
+    ])
+    app.state.fake = fake
+    return app
+
+
+def main(argv=None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fake_gemini")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=400, help="Mean response latency.")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Uniform latency jitter (+/-).")
+    parser.add_argument("--output-tokens", type=int, default=60, help="Words of text answers.")
+    args = parser.parse_args(argv)
+
+    fake = FakeGemini(args.latency_ms / 1000, args.jitter_ms / 1000, args.output_tokens)
+    uvicorn.run(create_app(fake), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
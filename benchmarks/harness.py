@@ -0,0 +1,128 @@
+import json
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class BenchmarkResult:
+    runs: int
+    median_ms: float
+    p95_ms: float
+    min_ms: float
+    max_ms: float
+    mean_ms: float
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline_ms: Optional[float]
+    current_ms: Optional[float]
+    status: str  # ok, regressed, improved, new, missing
+
+    @property
+    def ratio(self) -> Optional[float]:
+        if not self.baseline_ms or self.current_ms is None:
+            return None
+        return self.current_ms / self.baseline_ms
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..1) of sorted values."""
+
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def measure(
+    fn: Callable[[], object],
+    repeats: int = 20,
+    warmup: int = 2,
+    setup: Optional[Callable[[], object]] = None,
+) -> BenchmarkResult:
+    """Times `fn` (setup excluded) and summarizes the runs in milliseconds."""
+
+    timings: List[float] = []
+    for i in range(warmup + repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        if i >= warmup:
+            timings.append(elapsed)
+
+    ordered = sorted(timings)
+    return BenchmarkResult(
+        runs=len(timings),
+        median_ms=statistics.median(ordered),
+        p95_ms=percentile(ordered, 0.95),
+        min_ms=ordered[0],
+        max_ms=ordered[-1],
+        mean_ms=statistics.fmean(ordered),
+    )
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "sqlite": sqlite3.sqlite_version,
+    }
+
+
+def write_results(path: str, results: Dict[str, BenchmarkResult], meta: dict) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": meta,
+            "results": {name: asdict(result) for name, result in sorted(results.items())},
+        }, f, indent=2)
+        f.write("\n")
+
+
+def load_results(path: str) -> Dict[str, dict]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], tolerance: float = 0.25) -> List[Comparison]:
+    """
+    Compares the median timings against the baseline. A benchmark regressed when it is
+    slower than the baseline by more than `tolerance` (0.25 = 25%).
+    """
+
+    comparisons = []
+    for name in sorted(set(current) | set(baseline)):
+        current_ms = current[name]["median_ms"] if name in current else None
+        baseline_ms = baseline[name]["median_ms"] if name in baseline else None
+        if baseline_ms is None:
+            status = "new"
+        elif current_ms is None:
+            status = "missing"
+        elif current_ms > baseline_ms * (1 + tolerance):
+            status = "regressed"
+        elif current_ms < baseline_ms / (1 + tolerance):
+            status = "improved"
+        else:
+            status = "ok"
+        comparisons.append(Comparison(name, baseline_ms, current_ms, status))
+    return comparisons
+
+
+def format_comparison(comparisons: List[Comparison]) -> str:
+    def ms(value):
+        return f"{value:.3f}" if value is not None else "-"
+
+    width = max([len(c.name) for c in comparisons] + [9])
+    lines = [f"{'benchmark':<{width}}  {'baseline':>10}  {'current':>10}  {'ratio':>6}  status"]
+    for c in comparisons:
+        ratio = f"{c.ratio:.2f}" if c.ratio is not None else "-"
+        lines.append(f"{c.name:<{width}}  {ms(c.baseline_ms):>10}  {ms(c.current_ms):>10}  {ratio:>6}  {c.status}")
+    return "\n".join(lines)
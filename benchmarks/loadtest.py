@@ -0,0 +1,314 @@
+"""
+Offline load test of the A2A server: virtual students run scripted multi-turn Spanish
+conversations over the A2A protocol (JSON-RPC `message/send`) at increasing concurrency.
+
+    python -m benchmarks.loadtest                                   # 1,4,16,32 students
+    python -m benchmarks.loadtest --concurrency 8,32,64,128 --p99-limit 10
+    python -m benchmarks.loadtest --latency-ms 800 --output-tokens 200
+    python -m benchmarks.loadtest --url http://localhost:8001       # an already running server
+
+Unless --url is given, a fake Gemini endpoint (benchmarks.fake_gemini) and
+`uvicorn benchmarks.loadtest_app:app` (the real agent, tools and a fresh SQLite DB, without
+the calendar MCP) are started as subprocesses. Nothing leaves the machine.
+
+Per concurrency level it reports throughput, p50/p95/p99 turn latency, the error rate and
+the database lock errors / mean write statement time scraped from the server /metrics.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.harness import environment, percentile
+
+SCRIPTS = [
+    [
+        "Hola, me llamo Ana y soy de Polonia.",
+        "Me gusta mucho la música y viajar por España.",
+        "Ayer fui a la playa con mis amigos y comimos paella.",
+        "¿Cómo se dice library en español?",
+        "Mañana voy a estudiar en la biblioteca.",
+        "Gracias, hasta luego.",
+    ],
+    [
+        "Buenos días, quiero practicar mi español.",
+        "Trabajo en una oficina en el centro de la ciudad.",
+        "Los fines de semana juego al fútbol con mi hermano.",
+        "I don't know how to say weekend.",
+        "El año pasado viajé a México y visité muchos museos.",
+        "¿Puedes darme un ejercicio de verbos?",
+    ],
+    [
+        "Hola, soy estudiante de nivel B1.",
+        "Estoy leyendo un libro muy interesante sobre la historia de Argentina.",
+        "Las gatas son rojo.",
+        "Yo quiero eat una manzana.",
+        "Cuando era niño vivía en un pueblo pequeño.",
+        "Muchas gracias por la ayuda.",
+    ],
+]
+
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+(\S+)$")
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    turns: int
+    errors: int
+    duration_s: float
+    throughput_tps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    error_rate: float
+    db_lock_errors: int
+    db_write_mean_ms: Optional[float]
+    db_transaction_mean_ms: Optional[float]
+
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Prometheus text format samples keyed by `name{labels}`."""
+
+    samples = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if match and not line.startswith("#"):
+            name, labels, value = match.groups()
+            samples[name + (labels or "")] = float(value)
+    return samples
+
+
+def _total(samples: Dict[str, float], name: str, **labels: str) -> float:
+    wanted = [f'{key}="{value}"' for key, value in labels.items()]
+    return sum(
+        value for key, value in samples.items()
+        if key.split("{", 1)[0] == name and all(label in key for label in wanted)
+    )
+
+
+def _mean_ms(before: Dict[str, float], after: Dict[str, float], name: str, operations=None) -> Optional[float]:
+    total = count = 0.0
+    for operation in operations or [None]:
+        labels = {"operation": operation} if operation else {}
+        total += _total(after, f"{name}_sum", **labels) - _total(before, f"{name}_sum", **labels)
+        count += _total(after, f"{name}_count", **labels) - _total(before, f"{name}_count", **labels)
+    return total / count * 1000 if count else None
+
+
+def send_message_request(text: str, context_id: str) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": str(uuid.uuid4()),
+        "method": "message/send",
+        "params": {
+            "message": {
+                "kind": "message",
+                "role": "user",
+                "messageId": str(uuid.uuid4()),
+                "contextId": context_id,
+                "parts": [{"kind": "text", "text": text}],
+            },
+        },
+    }
+
+
+def is_error(response: dict) -> bool:
+    """JSON-RPC errors and failed / rejected tasks count as errors."""
+
+    if "error" in response:
+        return True
+    result = response.get("result") or {}
+    state = (result.get("status") or {}).get("state")
+    return state in ("failed", "rejected", "canceled")
+
+
+async def _student(client: httpx.AsyncClient, url: str, script: List[str], conversations: int,
+                   latencies: List[float], errors: List[str]) -> None:
+    for _ in range(conversations):
+        context_id = str(uuid.uuid4())
+        for text in script:
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, json=send_message_request(text, context_id))
+                response.raise_for_status()
+                if is_error(response.json()):
+                    errors.append(json.dumps(response.json())[:200])
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+            latencies.append(time.perf_counter() - start)
+
+
+async def run_level(url: str, concurrency: int, conversations: int, timeout: float) -> LevelResult:
+    latencies: List[float] = []
+    errors: List[str] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        before = parse_metrics((await client.get(f"{url}/metrics")).text)
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _student(client, url, SCRIPTS[i % len(SCRIPTS)], conversations, latencies, errors)
+            for i in range(concurrency)
+        ))
+        duration = time.perf_counter() - start
+        # Background ratings finish after the turns, give them a moment before scraping
+        await asyncio.sleep(0.5)
+        after = parse_metrics((await client.get(f"{url}/metrics")).text)
+
+    for error in errors[:3]:
+        print(f"  error: {error}", file=sys.stderr)
+
+    ordered = sorted(latencies)
+    return LevelResult(
+        concurrency=concurrency,
+        turns=len(latencies),
+        errors=len(errors),
+        duration_s=duration,
+        throughput_tps=len(latencies) / duration if duration else 0.0,
+        p50_ms=percentile(ordered, 0.50) * 1000,
+        p95_ms=percentile(ordered, 0.95) * 1000,
+        p99_ms=percentile(ordered, 0.99) * 1000,
+        error_rate=len(errors) / len(latencies) if latencies else 0.0,
+        db_lock_errors=int(_total(after, "charla_db_lock_errors_total")
+                           - _total(before, "charla_db_lock_errors_total")),
+        db_write_mean_ms=_mean_ms(before, after, "charla_db_query_seconds", ["INSERT", "UPDATE", "DELETE"]),
+        db_transaction_mean_ms=_mean_ms(before, after, "charla_db_transaction_seconds"),
+    )
+
+
+def format_results(results: List[LevelResult]) -> str:
+    def ms(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    lines = [f"{'students':>8}  {'turns':>6}  {'turns/s':>8}  {'p50 ms':>9}  {'p95 ms':>9}  {'p99 ms':>9}"
+             f"  {'errors':>7}  {'db locks':>8}  {'db write ms':>11}  {'db tx ms':>9}"]
+    for r in results:
+        lines.append(
+            f"{r.concurrency:>8}  {r.turns:>6}  {r.throughput_tps:>8.2f}  {r.p50_ms:>9.1f}  {r.p95_ms:>9.1f}"
+            f"  {r.p99_ms:>9.1f}  {r.error_rate:>7.1%}  {r.db_lock_errors:>8}  {ms(r.db_write_mean_ms):>11}"
+            f"  {ms(r.db_transaction_mean_ms):>9}")
+    return "\n".join(lines)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 120) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with code {process.returncode} before serving {url}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+def start_servers(args, workdir: str) -> tuple[str, List[subprocess.Popen]]:
+    fake_port, server_port = _free_port(), _free_port()
+    fake = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_gemini", "--port", str(fake_port),
+        "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+        "--output-tokens", str(args.output_tokens),
+    ])
+    processes = [fake]
+    _wait_ready(f"http://127.0.0.1:{fake_port}/health", fake)
+
+    env = {
+        **os.environ,
+        "GOOGLE_API_KEY": "loadtest",
+        "GOOGLE_GEMINI_BASE_URL": f"http://127.0.0.1:{fake_port}",
+        "GOOGLE_GENAI_USE_VERTEXAI": "false",
+        "GOOGLE_CLOUD_PROJECT": "",
+        "GOOGLE_CLOUD_LOCATION": "",
+        "DB_PATH": os.path.join(workdir, "loadtest.db"),
+        "CONTEXT_CACHE": "false",
+        "MCP_POOL_WARM": "false",
+        "OTEL_EXPORTER_OTLP_ENDPOINT": "",
+    }
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "benchmarks.loadtest_app:app",
+        "--host", "127.0.0.1", "--port", str(server_port), "--log-level", "warning",
+    ], env=env)
+    processes.append(server)
+    url = f"http://127.0.0.1:{server_port}"
+    _wait_ready(f"{url}/.well-known/agent-card.json", server)
+    return url, processes
+
+
+def stop_servers(processes: List[subprocess.Popen]) -> None:
+    for process in reversed(processes):
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest")
+    parser.add_argument("--concurrency", default="1,4,16,32", help="Comma separated student counts.")
+    parser.add_argument("--conversations", type=int, default=1, help="Conversations per student and level.")
+    parser.add_argument("--latency-ms", type=float, default=400, help="Fake model latency.")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Fake model latency jitter (+/-).")
+    parser.add_argument("--output-tokens", type=int, default=60, help="Words of fake model answers.")
+    parser.add_argument("--timeout", type=float, default=120, help="Turn timeout in seconds.")
+    parser.add_argument("--p99-limit", type=float, default=None,
+                        help="Stop once the p99 turn latency exceeds this many seconds.")
+    parser.add_argument("--url", default=None, help="Load an already running A2A server instead.")
+    parser.add_argument("--output", default="loadtest_results.json", help="Results JSON path.")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(",") if level]
+    results: List[LevelResult] = []
+
+    with tempfile.TemporaryDirectory(prefix="charla_facil_loadtest") as workdir:
+        url, processes = (args.url.rstrip("/"), []) if args.url else start_servers(args, workdir)
+        try:
+            for level in levels:
+                print(f"{level} concurrent students...", file=sys.stderr)
+                result = asyncio.run(run_level(url, level, args.conversations, args.timeout))
+                results.append(result)
+                if args.p99_limit is not None and result.p99_ms > args.p99_limit * 1000:
+                    print(f"p99 above {args.p99_limit}s, stopping.", file=sys.stderr)
+                    break
+        finally:
+            stop_servers(processes)
+
+    print(format_results(results))
+    if args.p99_limit is not None:
+        within = [r.concurrency for r in results if r.p99_ms <= args.p99_limit * 1000 and not r.errors]
+        print(f"Max students within p99 {args.p99_limit}s: {max(within) if within else 'none'}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {**environment(), "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                     "output_tokens": args.output_tokens, "conversations": args.conversations},
+            "results": [asdict(r) for r in results],
+        }, f, indent=2)
+        f.write("\n")
+    print(f"Results written to {args.output}", file=sys.stderr)
+    return 1 if any(r.errors for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+"""
+The A2A app as served by `uvicorn charla_facil:a2a_app`, without the Google Calendar MCP
+toolset (it needs npx and network access). Used by `python -m benchmarks.loadtest`.
+"""
+
+from charla_facil import a2a_app
+from charla_facil.agent import root_agent
+from charla_facil.tools.mcp.google_calendar_mcp import google_calendar_mcp
+
+root_agent.tools = [tool for tool in root_agent.tools if tool is not google_calendar_mcp]
+
+app = a2a_app
@@ -0,0 +1,270 @@
+"""
+Benchmarks of the storage and scoring hot paths.
+
+    python -m benchmarks.run                                # 1k and 100k practice words
+    python -m benchmarks.run --sizes 1000,100000,1000000    # full suite
+    python -m benchmarks.run --baseline benchmarks/baseline.json --fail-on-regression
+    python -m benchmarks.run --save-baseline                # record a new baseline
+
+Each size seeds a fresh SQLite database with a synthetic learner, so numbers are
+comparable between runs of the same machine only.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, Iterable, List
+
+# Configure before charla_facil is imported: no real Gemini calls, no default.db
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("CONTEXT_CACHE", "false")
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.gettempdir(), "charla_facil_benchmark.db"))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+
+from benchmarks.harness import (  # noqa: E402
+    BenchmarkResult,
+    compare,
+    environment,
+    format_comparison,
+    load_results,
+    measure,
+    write_results,
+)
+from charla_facil import word_rating  # noqa: E402
+from charla_facil.storage import db  # noqa: E402
+from charla_facil.storage.config import DatabaseConfig  # noqa: E402
+from charla_facil.storage.orm_models import (  # noqa: E402
+    Base,
+    PracticeWordORM,
+    UserEventORM,
+    UserInterestORM,
+    UserProfileORM,
+)
+from charla_facil.storage.word_ranking import struggle_rankings  # noqa: E402
+from charla_facil.tools.practice_words import (  # noqa: E402
+    get_due_practice_words,
+    get_practice_words,
+    update_practice_words,
+    wait_for_warmups,
+)
+from charla_facil.tools.user_info import get_user_info, profile_cache, save_user_info  # noqa: E402
+
+DEFAULT_SIZES = (1_000, 100_000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+BATCH_SIZES = (1, 10, 100)
+SEED_CHUNK = 50_000
+
+RATED_MESSAGE = "Ayer fui a la playa con mi perro y comimos helado."
+RATED_UPDATES = [
+    {"word": "ayer", "correctness": 4},
+    {"word": "ir", "correctness": 4},
+    {"word": "playa", "correctness": 4},
+    {"word": "perro", "correctness": 3},
+    {"word": "comer", "correctness": 2},
+    {"word": "helado", "correctness": 4},
+]
+
+
+@contextmanager
+def patched(obj, attribute: str, value):
+    original = getattr(obj, attribute)
+    setattr(obj, attribute, value)
+    try:
+        yield
+    finally:
+        setattr(obj, attribute, original)
+
+
+@contextmanager
+def benchmark_database(path: str):
+    """Points the storage layer to a fresh database file."""
+
+    if os.path.exists(path):
+        os.remove(path)
+    config = DatabaseConfig(url=f"sqlite:///{path}")
+    engine = config.configure(create_engine(config.sync_url(), **config.engine_kwargs()))
+    Base.metadata.create_all(engine)
+
+    with patched(db, "config", config), patched(db, "_db", engine), patched(db, "_async_db", None):
+        struggle_rankings.clear()
+        profile_cache.clear()
+        try:
+            yield engine
+        finally:
+            struggle_rankings.clear()
+            profile_cache.clear()
+            engine.dispose()
+
+
+def _practice_word_rows(user_id: str, size: int, rng: random.Random) -> Iterable[List[dict]]:
+    now = datetime.now()
+    chunk = []
+    for i in range(size):
+        last_used = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+        chunk.append({
+            "user_id": user_id,
+            "word": f"palabra{i}",
+            "familiarity_level": rng.randrange(101),
+            "last_used": last_used,
+            "correct_streak_count": rng.randrange(6),
+            "update_count": rng.randrange(1, 21),
+            "next_due_at": last_used + timedelta(days=rng.randrange(1, 60)),
+        })
+        if len(chunk) == SEED_CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def seed_learner(engine, user_id: str, words: int, events: int, seed: int = 0) -> None:
+    """Synthetic learner with `words` practice words and an `events` long history."""
+
+    rng = random.Random(seed)
+    with engine.begin() as conn:
+        conn.execute(insert(UserProfileORM), [{
+            "id": user_id, "name": "Bench", "cefr_level": "B1", "nationality": "Polish",
+            "age": 30, "place_of_living": "Madrid",
+        }])
+        conn.execute(insert(UserInterestORM), [
+            {"user_id": user_id, "interest": interest} for interest in ("música", "cine", "fútbol")])
+        start = datetime(2020, 1, 1)
+        if events:
+            conn.execute(insert(UserEventORM), [
+                {"user_id": user_id, "name": f"Evento {i}",
+                 "date": (start + timedelta(days=i // 3)).strftime("%Y-%m-%d")}
+                for i in range(events)
+            ])
+        for chunk in _practice_word_rows(user_id, words, rng):
+            conn.execute(insert(PracticeWordORM), chunk)
+
+
+class _StubModels:
+    """Stands in for the Gemini client, returns a fixed rating."""
+
+    def generate_content(self, model, contents, config):
+        return SimpleNamespace(
+            function_calls=[SimpleNamespace(name="update_practice_words", args={"updates": RATED_UPDATES})],
+            usage_metadata=None,
+        )
+
+
+def run_size(size: int, events: int, repeats: int, warmup: int, workdir: str) -> Dict[str, BenchmarkResult]:
+    user_id = f"bench-{size}"
+    rng = random.Random(size)
+    results: Dict[str, BenchmarkResult] = {}
+    suffix = f"[rows={size}]"
+
+    with benchmark_database(os.path.join(workdir, f"benchmark_{size}.db")) as engine:
+        seed_learner(engine, user_id, size, events)
+
+        for batch in BATCH_SIZES:
+            def update(batch=batch):
+                # Half known words, half new ones
+                words = [f"palabra{rng.randrange(size)}" for _ in range(batch - batch // 2)]
+                words += [f"nueva{rng.randrange(10 ** 9)}" for _ in range(batch // 2)]
+                update_practice_words(
+                    [{"word": w, "correctness": rng.randrange(5)} for w in words], user_id)
+
+            results[f"update_practice_words[batch={batch}]{suffix}"] = measure(update, repeats, warmup)
+
+        def cold_rankings():
+            # Rankings are loaded in the background after a cold read
+            asyncio.run(wait_for_warmups())
+            struggle_rankings.clear()
+
+        results[f"get_practice_words[cold]{suffix}"] = measure(
+            lambda: get_practice_words(10, user_id), max(3, repeats // 4), 1,
+            setup=cold_rankings)
+        asyncio.run(wait_for_warmups())
+        results[f"get_practice_words[warm]{suffix}"] = measure(
+            lambda: get_practice_words(10, user_id), repeats, warmup)
+        results[f"get_due_practice_words{suffix}"] = measure(
+            lambda: get_due_practice_words(10, user_id), repeats, warmup)
+
+        results[f"get_user_info[cold][events={events}]{suffix}"] = measure(
+            lambda: get_user_info(10, user_id), max(3, repeats // 4), 1,
+            setup=profile_cache.clear)
+        results[f"get_user_info[events={events}]{suffix}"] = measure(
+            lambda: get_user_info(10, user_id), repeats, warmup)
+
+        counter = iter(range(10 ** 9))
+        results[f"save_user_info[events={events}]{suffix}"] = measure(
+            lambda: save_user_info({
+                "interests": ["música", "cine", "viajes"],
+                "new_events": [{"name": f"Nuevo evento {next(counter)}", "date": "2030-01-01"}],
+            }, user_id), repeats, warmup)
+
+        stub_client = SimpleNamespace(models=_StubModels())
+        with patched(word_rating, "_client", stub_client):
+            results[f"rate_word_use[stub_model]{suffix}"] = measure(
+                lambda: word_rating.rate_word_use(RATED_MESSAGE, user_id), repeats, warmup,
+                setup=word_rating.rating_cache.clear)
+
+    return results
+
+
+def run_suite(
+    sizes: Iterable[int] = DEFAULT_SIZES,
+    events: int = 10_000,
+    repeats: int = 20,
+    warmup: int = 2,
+    only: str = "",
+) -> Dict[str, BenchmarkResult]:
+    results: Dict[str, BenchmarkResult] = {}
+    with tempfile.TemporaryDirectory(prefix="charla_facil_bench") as workdir:
+        for size in sizes:
+            print(f"Seeding and benchmarking {size} practice words...", file=sys.stderr)
+            results.update(run_size(size, events, repeats, warmup, workdir))
+
+    return {name: result for name, result in results.items() if only in name}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma separated practice_word row counts.")
+    parser.add_argument("--events", type=int, default=10_000, help="user_event history length.")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--only", default="", help="Only report benchmarks containing this text.")
+    parser.add_argument("--output", default="benchmark_results.json", help="Results JSON path.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown (0.25 = 25%%).")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    results = run_suite(sizes, args.events, args.repeats, args.warmup, args.only)
+    meta = {**environment(), "sizes": sizes, "events": args.events, "repeats": args.repeats}
+
+    write_results(args.output, results, meta)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.save_baseline:
+        write_results(args.baseline, results, meta)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, skipping comparison.", file=sys.stderr)
+        return 0
+
+    current = load_results(args.output)
+    comparisons = compare(current, load_results(args.baseline), args.tolerance)
+    print(format_comparison(comparisons))
+
+    regressed = [c for c in comparisons if c.status == "regressed"]
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
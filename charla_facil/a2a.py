@@ -1,4 +1,37 @@
+import asyncio
+from contextlib import asynccontextmanager
 from google.adk.a2a.utils.agent_to_a2a import to_a2a
-from charla_facil.agent import root_agent
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 
-a2a_app = to_a2a(root_agent, port=8001)
+from charla_facil.agent import quiz_bank, root_agent
+from charla_facil.metrics import configure_tracing, registry
+from charla_facil.storage.db import dispose_engines
+from charla_facil.tools.mcp.google_calendar_mcp import google_calendar_mcp, warm_up
+from charla_facil.word_rating import rating_pipeline
+
+# Optional OTLP trace export (OTEL_EXPORTER_OTLP_ENDPOINT)
+configure_tracing()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Calendar MCP processes start in the background, the server accepts requests right away
+    warming = asyncio.create_task(warm_up())
+    yield
+    warming.cancel()
+    # Rate messages still waiting in the queue before the server exits
+    await rating_pipeline.shutdown()
+    # Let running quiz bank refills finish (bounded) so their tokens are not wasted
+    await quiz_bank.shutdown()
+    await google_calendar_mcp.close()
+    await dispose_engines()
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+a2a_app = to_a2a(root_agent, port=8001, lifespan=lifespan)
+a2a_app.add_route("/metrics", metrics, methods=["GET"])
@@ -1,11 +1,17 @@
 import logging
 import os
-import vertexai
 from charla_facil.agents.safe_web_search_agent import safe_web_search_agent
 from charla_facil.tools.mcp.google_calendar_mcp import google_calendar_mcp
-from charla_facil.util import retry_config
-from charla_facil.tools.user_info import get_user_info, save_user_info
-from charla_facil.tools.practice_words import get_practice_words
+from charla_facil.context_cache import create_context_cache
+from charla_facil.instrumentation import AgentInstrumentation
+from charla_facil.metrics import registry
+from charla_facil.quiz_bank import create_quiz_bank
+from charla_facil.quiz_builder import create_quiz_builder
+from charla_facil.search_cache import create_search_cache
+from charla_facil.session_bootstrap import bootstrap_session_callback, refresh_profile_callback, session_instruction
+from charla_facil.util import as_tool, init_vertexai_callback, retry_config
+from charla_facil.tools.user_info import get_user_info, get_user_info_async, save_user_info, save_user_info_async
+from charla_facil.tools.practice_words import get_practice_words, get_practice_words_async
 from charla_facil.agents.word_repetition_agent import word_repetition_agent
 from charla_facil.word_rating import rate_word_use_callback
 
@@ -27,7 +33,7 @@ prompt = """You are "Charla Facil", a warm, empathetic, and culturally savvy Spa
 
 ### 🧠 MEMORY & INITIALIZATION (Start of Session)
 *Perform this sequence immediately:*
-1.  **Load Context:** Call `get_user_info` and `get_practice_words`.
+1.  **Load Context:** The user profile and struggle words are preloaded in the SESSION CONTEXT. Only if they are missing there, call `get_user_info` and `get_practice_words`.
 2.  **Assess & Greet:**
     - If CEFR is unknown: Greet in English, ask for their level, then call `save_user_info`.
     - If CEFR < B1: Greet in simple Spanish with English support.
@@ -40,7 +46,7 @@ prompt = """You are "Charla Facil", a warm, empathetic, and culturally savvy Spa
      * *Bad:* "No, that's wrong. It is 'gato'."
      * *Good:* "¡Muy bien! Just a small tip: for 'cat', we say 'el gato' (masculine). ¡Sigue así! 😺"
    - **Handling English Fallbacks:** If the user inserts an English word (e.g., "Fui a la *library*"), IMMEDIATELY provide the Spanish translation ("biblioteca") and ask them to repeat the sentence with the correct word.
-   - **Steering:** If conversation drags, look at the `get_practice_words` list. Ask a question that forces the user to use a "struggle word."
+   - **Steering:** If conversation drags, look at the struggle words in the SESSION CONTEXT (refreshed every turn; if missing, call `get_practice_words` first). Ask a question that forces the user to use a "struggle word."
 
 **2. Quizzing (Delegated)**
    - **Trigger:** User asks for practice/quiz.
@@ -66,30 +72,72 @@ prompt = """You are "Charla Facil", a warm, empathetic, and culturally savvy Spa
 GOOGLE_CLOUD_PROJECT = os.getenv("GOOGLE_CLOUD_PROJECT")
 GOOGLE_CLOUD_LOCATION = os.getenv("GOOGLE_CLOUD_LOCATION")
 
+# Vertex AI is initialized on the first turn (init_vertexai_callback)
 if GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_LOCATION:
     logger.info("Using cloud deployment")
-    vertexai.init(
-        project=os.environ["GOOGLE_CLOUD_PROJECT"],
-        location=os.environ["GOOGLE_CLOUD_LOCATION"],
-    )
 else:
     logger.info("Using local deployment")
 
+model = Gemini(
+    model="gemini-2.5-flash",
+    retry_options=retry_config
+)
+
+# The tutor prompt and tool declarations are sent as Gemini cached content
+tutor_context_cache = create_context_cache(lambda: model.api_client)
+
+# Model and tool call timings (see /metrics)
+instrumentation = AgentInstrumentation()
+
+# Repeated web searches are answered without running the search agent
+search_cache = create_search_cache(
+    safe_web_search_agent.name, safe_web_search_agent.model.model, safe_web_search_agent.instruction)
+registry.register_collector(search_cache.collect_metrics)
+
+# Struggle word quizzes are built locally, other topics go to word_repetition_agent
+quiz_builder = create_quiz_builder(word_repetition_agent.name)
+registry.register_collector(quiz_builder.collect_metrics)
+
+# Other quizzes are served from a bank refilled in the background
+quiz_bank = create_quiz_bank(word_repetition_agent.name)
+registry.register_collector(quiz_bank.collect_metrics)
+
 root_agent = LlmAgent(
     name="spanish_conversation",
-    model=Gemini(
-        model="gemini-2.5-flash",
-        retry_options=retry_config
-    ),
+    model=model,
     description="The main agent for practicing conversations with students in spanish.",
-    instruction=prompt,
-    before_agent_callback=rate_word_use_callback,
+    # Static prompt (context cached) and the per-session context preloaded into state
+    static_instruction=prompt,
+    instruction=session_instruction,
+    before_agent_callback=[init_vertexai_callback, rate_word_use_callback, bootstrap_session_callback],
+    before_model_callback=[
+        tutor_context_cache.before_model_callback,
+        instrumentation.before_model_callback,
+    ],
+    after_model_callback=[
+        instrumentation.after_model_callback,
+        tutor_context_cache.after_model_callback,
+    ],
+    on_model_error_callback=instrumentation.on_model_error_callback,
+    before_tool_callback=[
+        instrumentation.before_tool_callback,
+        search_cache.before_tool_callback,
+        quiz_builder.before_tool_callback,
+        quiz_bank.before_tool_callback,
+    ],
+    after_tool_callback=[
+        instrumentation.after_tool_callback,
+        search_cache.after_tool_callback,
+        refresh_profile_callback,
+    ],
+    on_tool_error_callback=instrumentation.on_tool_error_callback,
     tools=[
         AgentTool(word_repetition_agent),
         AgentTool(safe_web_search_agent),
-        FunctionTool(get_practice_words),
-        FunctionTool(save_user_info),
-        FunctionTool(get_user_info),
+        # Async implementations, declared under the names of the sync functions
+        FunctionTool(as_tool(get_practice_words_async, get_practice_words.__name__)),
+        FunctionTool(as_tool(save_user_info_async, save_user_info.__name__)),
+        FunctionTool(as_tool(get_user_info_async, get_user_info.__name__)),
         google_calendar_mcp,
     ],
 )
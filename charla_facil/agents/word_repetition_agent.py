@@ -3,8 +3,13 @@ from google.adk.models.google_llm import Gemini
 from google.adk.tools import FunctionTool
 from typing import List
 from pydantic import BaseModel, Field
-from charla_facil.tools.practice_words import get_practice_words
-from charla_facil.util import retry_config
+from charla_facil.tools.practice_words import (
+    get_due_practice_words,
+    get_due_practice_words_async,
+    get_practice_words,
+    get_practice_words_async,
+)
+from charla_facil.util import as_tool, retry_config
 
 prompt = """You are the "Curriculum Specialist," a strict backend agent responsible for generating high-quality Spanish vocabulary exercises.
 
@@ -19,8 +24,9 @@ You will receive a string input representing a **Topic** (e.g., "Kitchen items",
 **2. Data Gathering Strategy**
 - **Case A: Specific Topic (e.g., "Travel"):** Generate 5-10 relevant words/phrases suitable for a general learner.
 - **Case B: "Words I'm currently struggling with":**
-    - You **MUST** call the `get_practice_words` tool first.
-    - Use the output list from that tool as your source material.
+    - You **MUST** call the `get_due_practice_words` tool first (words due for spaced repetition review).
+    - If it returns fewer than 5 words, also call `get_practice_words` to fill up the list with the hardest words.
+    - Use the output lists from these tools as your source material.
     - If the list is empty, fallback to generating general "common Spanish errors" words.
 
 **3. Output Generation**
@@ -55,6 +61,10 @@ word_repetition_agent = Agent(
     ),
     description="Agent for reviewing and practicing weak words only",
     instruction=prompt,
-    tools=[FunctionTool(get_practice_words)],
+    # Async implementations, declared under the names of the sync functions
+    tools=[
+        FunctionTool(as_tool(get_due_practice_words_async, get_due_practice_words.__name__)),
+        FunctionTool(as_tool(get_practice_words_async, get_practice_words.__name__)),
+    ],
     output_schema=QuizBatch,
 )
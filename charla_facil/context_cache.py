@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import Client, types
+
+logger = logging.getLogger(__name__)
+
+# Fields moved into the cached content, they must not be sent along with `cached_content`
+_CACHED_FIELDS = ("system_instruction", "tools", "tool_config")
+
+
+@dataclass
+class ContextCacheStats:
+    cached_requests: int = 0
+    inline_requests: int = 0
+    cached_tokens: int = 0
+    uncached_tokens: int = 0
+    creations: int = 0
+    refreshes: int = 0
+    failures: int = 0
+
+    @property
+    def cached_token_ratio(self) -> float:
+        total = self.cached_tokens + self.uncached_tokens
+        return self.cached_tokens / total if total else 0.0
+
+
+@dataclass
+class _CacheEntry:
+    name: Optional[str]
+    expires_at: float  # for failed entries: when to retry
+
+
+class ContextCache:
+    """
+    Keeps Gemini cached-content handles for the static part of requests (system instruction,
+    tool declarations and tool config), so they are not resent on every call.
+
+    Handles are keyed by a hash of the model and the cached fields, created on first use
+    and refreshed (TTL extended) refresh_margin seconds before they expire. When caching
+    is disabled or unavailable (e.g. prompt below the model minimum, unsupported backend)
+    the request config is returned unchanged and the creation is retried after retry_after.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Client],
+        ttl: float = 3600,
+        refresh_margin: float = 300,
+        retry_after: float = 600,
+        max_entries: int = 16,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.client_factory = client_factory
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_after = retry_after
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._clock = clock
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._stats = ContextCacheStats()
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._async_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def stats(self) -> ContextCacheStats:
+        with self._lock:
+            return ContextCacheStats(**vars(self._stats))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @staticmethod
+    def key(model: str, config: types.GenerateContentConfig) -> str:
+        payload = config.model_dump_json(include=set(_CACHED_FIELDS), exclude_none=True)
+        return hashlib.sha256(f"{model}\0{payload}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, key: str) -> tuple[Optional[_CacheEntry], bool]:
+        """Returns the entry and whether it has to be created / refreshed now."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, True
+            self._entries.move_to_end(key)
+            if entry.name is None:
+                return entry, self._clock() >= entry.expires_at
+            return entry, self._clock() >= entry.expires_at - self.refresh_margin
+
+    def _store(self, key: str, name: Optional[str], refreshed: bool = False) -> None:
+        with self._lock:
+            if name is None:
+                self._stats.failures += 1
+                expires_at = self._clock() + self.retry_after
+            else:
+                if refreshed:
+                    self._stats.refreshes += 1
+                else:
+                    self._stats.creations += 1
+                expires_at = self._clock() + self.ttl
+            self._entries[key] = _CacheEntry(name, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _create_config(self, model: str, config: types.GenerateContentConfig) -> types.CreateCachedContentConfig:
+        return types.CreateCachedContentConfig(
+            ttl=f"{int(self.ttl)}s",
+            display_name=f"charla_facil-{model}",
+            **{field: getattr(config, field) for field in _CACHED_FIELDS},
+        )
+
+    def _apply(self, entry: Optional[_CacheEntry], config: types.GenerateContentConfig) -> types.GenerateContentConfig:
+        with self._lock:
+            if entry is None or entry.name is None or self._clock() >= entry.expires_at:
+                self._stats.inline_requests += 1
+                return config
+            self._stats.cached_requests += 1
+
+        return config.model_copy(update={
+            **{field: None for field in _CACHED_FIELDS},
+            "cached_content": entry.name,
+        })
+
+    def _cacheable(self, config: Optional[types.GenerateContentConfig]) -> bool:
+        return self.enabled and config is not None and not config.cached_content and any(
+            getattr(config, field) for field in _CACHED_FIELDS)
+
+    def cached_config(self, model: str, config: types.GenerateContentConfig) -> types.GenerateContentConfig:
+        """
+        Returns the config to send: with `cached_content` instead of the cached fields, or
+        the config itself when no cache is available.
+        """
+
+        if not self._cacheable(config):
+            return config
+
+        key = self.key(model, config)
+        entry, stale = self._lookup(key)
+        if stale:
+            entry = self._refresh(key, entry, model, config)
+        return self._apply(entry, config)
+
+    def _refresh(self, key, entry, model, config) -> Optional[_CacheEntry]:
+        client = self.client_factory()
+        if entry is not None and entry.name is not None:
+            try:
+                client.caches.update(
+                    name=entry.name, config=types.UpdateCachedContentConfig(ttl=f"{int(self.ttl)}s"))
+                self._store(key, entry.name, refreshed=True)
+                return self._lookup(key)[0]
+            except Exception as e:
+                logger.warning(f"Refreshing cached content {entry.name} failed, recreating it: {e}")
+
+        try:
+            cached = client.caches.create(model=model, config=self._create_config(model, config))
+            self._store(key, cached.name)
+        except Exception as e:
+            logger.warning(f"Context caching unavailable, sending the prompt inline: {e}")
+            self._store(key, None)
+        return self._lookup(key)[0]
+
+    async def cached_config_async(self, model: str, config: types.GenerateContentConfig) -> types.GenerateContentConfig:
+        """Async version of `cached_config`."""
+
+        if not self._cacheable(config):
+            return config
+
+        key = self.key(model, config)
+        entry, stale = self._lookup(key)
+        if stale:
+            # One creation per key, concurrent requests wait for it
+            async with self._get_async_lock():
+                entry, stale = self._lookup(key)
+                if stale:
+                    entry = await self._refresh_async(key, entry, model, config)
+        return self._apply(entry, config)
+
+    def _get_async_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._async_lock_loop is not loop:
+            self._async_lock = asyncio.Lock()
+            self._async_lock_loop = loop
+        return self._async_lock
+
+    async def _refresh_async(self, key, entry, model, config) -> Optional[_CacheEntry]:
+        client = self.client_factory()
+        if entry is not None and entry.name is not None:
+            try:
+                await client.aio.caches.update(
+                    name=entry.name, config=types.UpdateCachedContentConfig(ttl=f"{int(self.ttl)}s"))
+                self._store(key, entry.name, refreshed=True)
+                return self._lookup(key)[0]
+            except Exception as e:
+                logger.warning(f"Refreshing cached content {entry.name} failed, recreating it: {e}")
+
+        try:
+            cached = await client.aio.caches.create(model=model, config=self._create_config(model, config))
+            self._store(key, cached.name)
+        except Exception as e:
+            logger.warning(f"Context caching unavailable, sending the prompt inline: {e}")
+            self._store(key, None)
+        return self._lookup(key)[0]
+
+    def record_usage(self, response: Any) -> None:
+        """Counts cached / uncached input tokens of a GenerateContentResponse or LlmResponse."""
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None:
+            return
+        prompt_tokens = usage.prompt_token_count or 0
+        cached_tokens = usage.cached_content_token_count or 0
+        with self._lock:
+            self._stats.cached_tokens += cached_tokens
+            self._stats.uncached_tokens += max(0, prompt_tokens - cached_tokens)
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        """ADK before_model_callback, moves the static part of the request into a cached content."""
+
+        if llm_request.model:
+            llm_request.config = await self.cached_config_async(llm_request.model, llm_request.config)
+
+    async def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+        """ADK after_model_callback, records the token usage."""
+
+        self.record_usage(llm_response)
+
+
+def create_context_cache(client_factory: Callable[[], Client]) -> ContextCache:
+    """Builds a context cache configured from environment variables."""
+
+    return ContextCache(
+        client_factory,
+        ttl=float(os.getenv("CONTEXT_CACHE_TTL", "3600")),
+        refresh_margin=float(os.getenv("CONTEXT_CACHE_REFRESH_MARGIN", "300")),
+        enabled=os.getenv("CONTEXT_CACHE", "true").lower() in ("1", "true", "yes"),
+    )
@@ -0,0 +1,81 @@
+import os
+from dataclasses import dataclass
+from importlib import resources
+from typing import Iterable, Optional, Sequence
+
+from charla_facil.lemma_index import SortedTsvIndex, get_lemma_index
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+
+def default_dictionary_path() -> str:
+    return str(resources.files("charla_facil").joinpath("data", "dictionary.tsv"))
+
+
+@dataclass(frozen=True)
+class DictionaryEntry:
+    word: str
+    # Definite article of nouns ("el", "la"), empty for other words
+    article: str
+    english: str
+    difficulty: str
+
+    @property
+    def spanish(self) -> str:
+        return f"{self.article} {self.word}" if self.article else self.word
+
+
+class BilingualDictionary(SortedTsvIndex):
+    """
+    Spanish -> English dictionary of common words (lemmas), stored as
+    `word<TAB>article<TAB>english<TAB>difficulty` lines (see SortedTsvIndex).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path or default_dictionary_path())
+
+    def entry(self, word: str) -> Optional[DictionaryEntry]:
+        """Entry of the word, or of its lemma for inflected forms ("gatos" -> "gato")."""
+
+        word = word.strip().lower()
+        value = self.lookup(word)
+        if value is None:
+            lemma = get_lemma_index().lookup(word)
+            if lemma is None:
+                return None
+            word, value = lemma, self.lookup(lemma)
+            if value is None:
+                return None
+
+        article, english, difficulty = value.split("\t")
+        return DictionaryEntry(word, article, english, difficulty)
+
+    @staticmethod
+    def build(rows: Iterable[Sequence[str]], path: str) -> int:
+        """
+        Writes a dictionary file from (word, article, english, difficulty) rows.
+        Invalid rows are dropped, the first entry of a duplicated word wins.
+        """
+
+        entries = {}
+        for row in rows:
+            if len(row) != 4:
+                continue
+            word, article, english, difficulty = (column.strip() for column in row)
+            word, article = word.lower(), article.lower()
+            if word and english and difficulty in DIFFICULTIES and "\t" not in word + article + english:
+                entries.setdefault(word, f"{article}\t{english}\t{difficulty}")
+
+        return SortedTsvIndex.write(entries, path)
+
+
+_dictionary: Optional[BilingualDictionary] = None
+
+
+def get_dictionary() -> BilingualDictionary:
+    """Shared dictionary (packaged data, or the file set in DICTIONARY_PATH), opened on first use."""
+
+    global _dictionary
+    if _dictionary is None:
+        _dictionary = BilingualDictionary(os.getenv("DICTIONARY_PATH") or None)
+    return _dictionary
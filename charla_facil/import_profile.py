@@ -0,0 +1,76 @@
+"""
+Import-time profile of a module, from `python -X importtime` run in a fresh interpreter.
+"""
+
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+@dataclass
+class ImportCost:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> List[ImportCost]:
+    costs = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            costs.append(ImportCost(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return costs
+
+
+def profile_imports(module: str, python: str = sys.executable, env: Dict[str, str] | None = None) -> List[ImportCost]:
+    """Imports `module` in a new interpreter and returns the cost of every imported module."""
+
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def package_of(module: str) -> str:
+    """Top-level package, namespace packages (google.*) keep their second part."""
+
+    parts = module.split(".")
+    return ".".join(parts[:2]) if parts[0] == "google" and len(parts) > 1 else parts[0]
+
+
+def by_package(costs: List[ImportCost]) -> Dict[str, int]:
+    """Self time (microseconds) summed per package, most expensive first."""
+
+    totals: Dict[str, int] = defaultdict(int)
+    for cost in costs:
+        totals[package_of(cost.module)] += cost.self_us
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+
+def total_us(costs: List[ImportCost]) -> int:
+    return sum(cost.self_us for cost in costs)
+
+
+def format_report(costs: List[ImportCost], top: int = 20, prefix: str = "charla_facil") -> str:
+    lines = [f"Total import time: {total_us(costs) / 1000:.1f} ms ({len(costs)} modules)", "",
+             f"{'package':<40} {'self ms':>10}"]
+    for package, self_us in list(by_package(costs).items())[:top]:
+        lines.append(f"{package:<40} {self_us / 1000:>10.1f}")
+
+    own = sorted((c for c in costs if c.module.split(".")[0] == prefix),
+                 key=lambda c: c.cumulative_us, reverse=True)
+    lines += ["", f"{prefix + ' module':<40} {'self ms':>10} {'cumulative ms':>14}"]
+    for cost in own[:top]:
+        lines.append(f"{cost.module:<40} {cost.self_us / 1000:>10.1f} {cost.cumulative_us / 1000:>14.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from opentelemetry import trace
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from charla_facil.metrics import (
+    DB_LOCK_ERRORS,
+    DB_QUERY_SECONDS,
+    DB_TRANSACTION_SECONDS,
+    MODEL_SECONDS,
+    TOOL_SECONDS,
+    record_model_usage,
+    tracer,
+)
+
+if TYPE_CHECKING:
+    from google.adk.agents.callback_context import CallbackContext
+    from google.adk.models import LlmRequest, LlmResponse
+    from google.adk.tools import BaseTool, ToolContext
+
+# Started calls that never finished (e.g. cancelled turns) are dropped past this size
+_MAX_PENDING = 10_000
+
+_SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA"}
+
+
+class AgentInstrumentation:
+    """
+    ADK agent callbacks timing the model calls (with token counts) and tool calls of an
+    agent. AgentTool sub-agents and MCP tools are tools of the agent, so they are timed too.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str], Tuple[float, str, trace.Span]] = {}
+        self._tools: Dict[str, Tuple[float, trace.Span]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, pending: dict, key, value) -> None:
+        with self._lock:
+            if len(pending) >= _MAX_PENDING:
+                pending.clear()
+            pending[key] = value
+
+    def _finish(self, pending: dict, key):
+        with self._lock:
+            return pending.pop(key, None)
+
+    async def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> None:
+        model = llm_request.model or ""
+        span = tracer.start_span("model_call", attributes={
+            "agent": callback_context.agent_name, "model": model})
+        self._start(self._models, (callback_context.invocation_id, callback_context.agent_name),
+                    (time.perf_counter(), model, span))
+
+    def _model_done(self, callback_context: CallbackContext, outcome: str, response=None) -> None:
+        started = self._finish(self._models, (callback_context.invocation_id, callback_context.agent_name))
+        if started is None:
+            return
+        start, model, span = started
+        MODEL_SECONDS.observe(time.perf_counter() - start,
+                              agent=callback_context.agent_name, model=model, outcome=outcome)
+        if response is not None:
+            record_model_usage(model, response)
+        span.set_attribute("outcome", outcome)
+        span.end()
+
+    async def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> None:
+        # Streaming responses call this per chunk, only the final one is counted
+        if not llm_response.partial:
+            self._model_done(callback_context, "error" if llm_response.error_code else "ok", llm_response)
+
+    async def on_model_error_callback(
+        self, callback_context: CallbackContext, llm_request: LlmRequest, error: Exception
+    ) -> None:
+        self._model_done(callback_context, "error")
+
+    async def before_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext) -> None:
+        span = tracer.start_span("tool_call", attributes={
+            "agent": tool_context.agent_name, "tool": tool.name})
+        self._start(self._tools, tool_context.function_call_id, (time.perf_counter(), span))
+
+    def _tool_done(self, tool: BaseTool, tool_context: ToolContext, outcome: str) -> None:
+        started = self._finish(self._tools, tool_context.function_call_id)
+        if started is None:
+            return
+        start, span = started
+        TOOL_SECONDS.observe(time.perf_counter() - start,
+                             agent=tool_context.agent_name, tool=tool.name, outcome=outcome)
+        span.set_attribute("outcome", outcome)
+        span.end()
+
+    async def after_tool_callback(
+        self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+    ) -> None:
+        self._tool_done(tool, tool_context, "ok")
+
+    async def on_tool_error_callback(
+        self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, error: Exception
+    ) -> None:
+        self._tool_done(tool, tool_context, "error")
+
+
+def _operation(statement: str) -> str:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return operation if operation in _SQL_OPERATIONS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("charla_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    starts = conn.info.get("charla_query_start")
+    if starts:
+        DB_QUERY_SECONDS.observe(time.perf_counter() - starts.pop(), operation=_operation(statement))
+
+
+def _handle_error(context) -> None:
+    starts = context.connection.info.get("charla_query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+    if "database is locked" in str(context.original_exception):
+        DB_LOCK_ERRORS.inc(operation=_operation(context.statement or ""))
+
+
+def _after_begin(session, transaction, connection) -> None:
+    if "charla_transaction_start" in session.info:
+        return
+    session.info["charla_transaction_start"] = time.perf_counter()
+    # Child of the current (tool or turn) span, so database time shows in the trace
+    session.info["charla_transaction_span"] = tracer.start_span("db_transaction")
+
+
+def _after_commit(session) -> None:
+    session.info["charla_transaction_outcome"] = "commit"
+
+
+def _after_rollback(session) -> None:
+    session.info["charla_transaction_outcome"] = "rollback"
+
+
+def _after_transaction_end(session, transaction) -> None:
+    # Nested (savepoint) transactions are part of the outer one
+    if transaction.parent is not None:
+        return
+    start: Optional[float] = session.info.pop("charla_transaction_start", None)
+    span: Optional[trace.Span] = session.info.pop("charla_transaction_span", None)
+    outcome = session.info.pop("charla_transaction_outcome", "close")
+    if start is not None:
+        DB_TRANSACTION_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
+    if span is not None:
+        span.set_attribute("outcome", outcome)
+        span.end()
+
+
+_instrumented = False
+
+
+def instrument_sqlalchemy() -> None:
+    """
+    Times every SQL statement and session transaction of all engines (sync and async), and
+    traces every session transaction as a `db_transaction` span.
+    """
+
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+
+    event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(Engine, "handle_error", _handle_error)
+    event.listen(Session, "after_begin", _after_begin)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_rollback", _after_rollback)
+    event.listen(Session, "after_transaction_end", _after_transaction_end)
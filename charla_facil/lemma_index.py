@@ -0,0 +1,154 @@
+import logging
+import mmap
+import os
+import threading
+from importlib import resources
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def default_index_path() -> str:
+    return str(resources.files("charla_facil").joinpath("data", "lemmas.tsv"))
+
+
+def default_homographs_path() -> str:
+    return str(resources.files("charla_facil").joinpath("data", "lemma_homographs.txt"))
+
+
+class SortedTsvIndex:
+    """
+    Read-only map over a text file of `key<TAB>value` lines sorted by their UTF-8 bytes.
+
+    The file is memory mapped and searched with a binary search over line starts, so lookups
+    are O(log n) and only the touched pages are resident.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mmap: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+
+    def _data(self) -> mmap.mmap:
+        if self._mmap is None:
+            with self._lock:
+                if self._mmap is None:
+                    with open(self.path, "rb") as f:
+                        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Returns the value of the key (rest of its line), or None when the key is not in the index."""
+
+        data = self._data()
+        prefix = key.encode("utf-8") + b"\t"
+
+        # lo / hi are always line starts, find the first line >= prefix
+        lo, hi = 0, len(data)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = data.rfind(b"\n", 0, mid) + 1
+            end = data.find(b"\n", start)
+            if end == -1:
+                end = len(data)
+            if data[start:end] < prefix:
+                lo = end + 1
+            else:
+                hi = start
+
+        end = data.find(b"\n", lo)
+        line = data[lo:end if end != -1 else len(data)]
+        if line.startswith(prefix):
+            return line[len(prefix):].decode("utf-8")
+        return None
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for line in self._data()[:].decode("utf-8").splitlines():
+            key, value = line.split("\t", 1)
+            yield key, value
+
+    @staticmethod
+    def write(rows: Dict[str, str], path: str) -> int:
+        """Writes an index file from a key -> value map (atomically replaces the file)."""
+
+        lines = sorted(f"{key}\t{value}".encode("utf-8") for key, value in rows.items())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(b"\n".join(lines))
+            if lines:
+                f.write(b"\n")
+        os.replace(tmp_path, path)
+        return len(lines)
+
+
+class LemmaIndex(SortedTsvIndex):
+    """
+    Read-only map of inflected Spanish forms to their lemma ("fui" -> "ir", "casas" -> "casa"),
+    stored as `form<TAB>lemma` lines (see SortedTsvIndex).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        super().__init__(path or default_index_path())
+
+    def lemmatize(self, word: str) -> str:
+        return self.lookup(word) or word
+
+    @staticmethod
+    def build(
+        pairs: Iterable[Tuple[str, str]],
+        path: str,
+        lemmas: Iterable[str] = (),
+        homographs: Iterable[str] = (),
+    ) -> int:
+        """
+        Writes an index file from (form, lemma) pairs. Only unambiguous forms are indexed,
+        these words are left as they are:
+
+        - forms with several lemmas in the pairs ("fui": ser / ir),
+        - lemmas: the lemmas of the pairs and the given ones (dictionary words such as
+          "abuela"); the plural of a given lemma maps to it ("abuelas" -> "abuela"),
+        - homographs: forms whose lemma depends on the part of speech ("gusto": noun or
+          gustar), and their plurals.
+        """
+
+        candidates: Dict[str, set] = {}
+        for form, lemma in pairs:
+            form, lemma = form.strip().lower(), lemma.strip().lower()
+            if form and lemma and form != lemma and "\t" not in form + lemma:
+                candidates.setdefault(form, set()).add(lemma)
+
+        lemmas = {word.strip().lower() for word in lemmas}
+        homographs = {word.strip().lower() for word in homographs}
+        known_lemmas = lemmas | {lemma for forms in candidates.values() for lemma in forms}
+
+        index = {}
+        for form, forms in candidates.items():
+            if len(forms) > 1 or form in known_lemmas or form in homographs:
+                continue
+            (lemma,) = forms
+            singulars = [form[:-1]] if form.endswith("s") else []
+            singulars += [form[:-2]] if form.endswith("es") else []
+            singular = next((s for s in singulars if candidates.get(s) == forms), None)
+            if singular in homographs:
+                continue
+            index[form] = singular if singular in lemmas else lemma
+
+        return SortedTsvIndex.write(index, path)
+
+
+_lemma_index: Optional[LemmaIndex] = None
+
+
+def get_lemma_index() -> LemmaIndex:
+    """Shared index (packaged data, or the file set in LEMMA_INDEX_PATH), opened on first use."""
+
+    global _lemma_index
+    if _lemma_index is None:
+        _lemma_index = LemmaIndex(os.getenv("LEMMA_INDEX_PATH") or None)
+    return _lemma_index
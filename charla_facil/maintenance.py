@@ -0,0 +1,154 @@
+"""
+One-off maintenance commands.
+
+    python -m charla_facil.maintenance merge-lemmas [--user USER_ID] [--dry-run]
+    python -m charla_facil.maintenance build-lemma-index SOURCE.tsv [--output PATH] [--homographs PATH]
+    python -m charla_facil.maintenance build-dictionary SOURCE.tsv [--output PATH]
+    python -m charla_facil.maintenance import-profile [--module charla_facil.agent] [--top 20] [--output PATH]
+"""
+
+import argparse
+import json
+import logging
+from dataclasses import asdict
+
+from sqlalchemy.orm import Session
+
+from charla_facil.dictionary import BilingualDictionary, default_dictionary_path
+from charla_facil.import_profile import by_package, format_report, profile_imports, total_us
+from charla_facil.lemma_index import LemmaIndex, default_homographs_path, default_index_path
+from charla_facil.storage.db import get_db_engine
+from charla_facil.storage.word_ranking import struggle_rankings
+from charla_facil.tools.practice_words import merge_lemma_duplicates
+
+logger = logging.getLogger(__name__)
+
+
+def merge_lemmas(user_id: str | None = None, dry_run: bool = False) -> int:
+    """
+    Merges practice_word rows of inflected forms into their lemma.
+
+    Returns:
+        Number of merged lemma rows.
+    """
+
+    with Session(get_db_engine()) as session:
+        merged = merge_lemma_duplicates(session, user_id)
+        if dry_run:
+            session.rollback()
+        else:
+            session.commit()
+
+    for merged_user_id in merged:
+        struggle_rankings.invalidate(merged_user_id)
+
+    count = sum(len(rows) for rows in merged.values())
+    logger.info(f"{'Would merge' if dry_run else 'Merged'} {count} words of {len(merged)} users")
+    return count
+
+
+def build_lemma_index(source: str, output: str | None = None, homographs: str | None = None) -> int:
+    """
+    Builds the lemma index from a `form<TAB>lemma` file (any order, `#` comments).
+    The homographs (one word per line) and the dictionary words are never lemmatized.
+
+    Returns:
+        Number of indexed forms.
+    """
+
+    with open(source, encoding="utf-8") as f:
+        pairs = [
+            line.rstrip("\n").split("\t", 1)
+            for line in f
+            if line.strip() and not line.startswith("#") and "\t" in line
+        ]
+    with open(homographs or default_homographs_path(), encoding="utf-8") as f:
+        ambiguous = [line for line in f if line.strip() and not line.startswith("#")]
+    dictionary_words = [word for word, _ in BilingualDictionary(default_dictionary_path())]
+
+    count = LemmaIndex.build(pairs, output or default_index_path(), dictionary_words, ambiguous)
+    logger.info(f"Indexed {count} forms")
+    return count
+
+
+def build_dictionary(source: str, output: str | None = None) -> int:
+    """
+    Builds the quiz dictionary from a `word<TAB>article<TAB>english<TAB>difficulty` file
+    (any order, `#` comments).
+
+    Returns:
+        Number of dictionary entries.
+    """
+
+    with open(source, encoding="utf-8") as f:
+        rows = [
+            line.rstrip("\n").split("\t")
+            for line in f
+            if line.strip() and not line.startswith("#")
+        ]
+
+    count = BilingualDictionary.build(rows, output or default_dictionary_path())
+    logger.info(f"Indexed {count} dictionary entries")
+    return count
+
+
+def import_profile(module: str = "charla_facil.agent", top: int = 20, output: str | None = None) -> int:
+    """
+    Prints the import-time cost per package and per charla_facil module (fresh interpreter).
+
+    Returns:
+        Total import time in microseconds.
+    """
+
+    costs = profile_imports(module)
+    print(format_report(costs, top))
+
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump({
+                "module": module,
+                "total_us": total_us(costs),
+                "packages": by_package(costs),
+                "modules": [asdict(cost) for cost in costs],
+            }, f, indent=2)
+            f.write("\n")
+    return total_us(costs)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m charla_facil.maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    merge = commands.add_parser("merge-lemmas", help="Merge practice words of inflected forms into their lemma.")
+    merge.add_argument("--user", help="Only merge the words of this user.")
+    merge.add_argument("--dry-run", action="store_true", help="Report without writing.")
+
+    build = commands.add_parser("build-lemma-index", help="Rebuild the lemma index from a TSV file.")
+    build.add_argument("source", help="form<TAB>lemma file.")
+    build.add_argument("--output", help="Index path (defaults to the packaged index).")
+    build.add_argument("--homographs", help="Words never lemmatized (defaults to the packaged list).")
+
+    dictionary = commands.add_parser("build-dictionary", help="Rebuild the quiz dictionary from a TSV file.")
+    dictionary.add_argument("source", help="word<TAB>article<TAB>english<TAB>difficulty file.")
+    dictionary.add_argument("--output", help="Dictionary path (defaults to the packaged dictionary).")
+
+    profile = commands.add_parser("import-profile", help="Report the import time per module.")
+    profile.add_argument("--module", default="charla_facil.agent", help="Module to import.")
+    profile.add_argument("--top", type=int, default=20, help="Rows per table.")
+    profile.add_argument("--output", help="Also write the full profile as JSON.")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "merge-lemmas":
+        merge_lemmas(args.user, args.dry_run)
+    elif args.command == "build-lemma-index":
+        build_lemma_index(args.source, args.output, args.homographs)
+    elif args.command == "build-dictionary":
+        build_dictionary(args.source, args.output)
+    elif args.command == "import-profile":
+        import_profile(args.module, args.top, args.output)
+
+
+if __name__ == "__main__":
+    main()
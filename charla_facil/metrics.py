@@ -0,0 +1,267 @@
+"""
+In-process metrics (Prometheus text format) and OpenTelemetry tracing helpers.
+
+Metrics are plain counters / histograms guarded by a lock, so they are cheap enough to
+stay on all the time. Spans go to the global OpenTelemetry tracer provider, which is a
+no-op unless `configure_tracing` (OTLP) or the ADK telemetry set one up.
+"""
+
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+
+tracer = trace.get_tracer("charla_facil")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+# (name, type, help, [(labels, value), ...])
+CollectedMetric = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, value: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+            return int(sum(counts[:-1])) if counts else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+
+        lines = []
+        for key, counts in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {int(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {int(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics plus collectors that report the stats of other components at scrape time."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[CollectedMetric]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[CollectedMetric]]) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        lines = []
+        for metric in metrics:
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.type}"]
+            lines += metric.render()
+
+        for collector in collectors:
+            try:
+                collected = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, metric_type, help, samples in collected:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {metric_type}"]
+                lines += [
+                    f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(value)}"
+                    for labels, value in samples
+                ]
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+RATING_SECONDS = registry.histogram(
+    "charla_rating_seconds", "Duration of the word rating of a user message.", ["outcome"])
+MODEL_SECONDS = registry.histogram(
+    "charla_model_seconds", "Duration of agent model calls.", ["agent", "model", "outcome"])
+MODEL_TOKENS = registry.counter(
+    "charla_model_tokens_total", "Model tokens by kind (prompt, cached, output).", ["model", "kind"])
+TOOL_SECONDS = registry.histogram(
+    "charla_tool_seconds", "Duration of agent tool calls (function tools, sub-agents, MCP).",
+    ["agent", "tool", "outcome"])
+DB_QUERY_SECONDS = registry.histogram(
+    "charla_db_query_seconds", "Duration of SQL statements.", ["operation"])
+DB_TRANSACTION_SECONDS = registry.histogram(
+    "charla_db_transaction_seconds", "Duration of database session transactions.", ["outcome"])
+DB_LOCK_ERRORS = registry.counter(
+    "charla_db_lock_errors_total", "SQL statements failed because the database was locked (busy timeout).",
+    ["operation"])
+
+
+class Timing:
+    """Labels of a running `timed` block, can be changed before the block ends."""
+
+    def __init__(self, span: trace.Span, labels: Dict[str, str]):
+        self.span = span
+        self.labels = labels
+
+
+@contextmanager
+def timed(histogram: Histogram, span_name: str, **labels: str) -> Iterator[Timing]:
+    """Records the duration of the block in the histogram and as a span."""
+
+    start = time.perf_counter()
+    with tracer.start_as_current_span(span_name) as span:
+        timing = Timing(span, dict(labels))
+        try:
+            yield timing
+        except BaseException:
+            timing.labels.setdefault("outcome", "error")
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - start, **timing.labels)
+            if span.is_recording():
+                span.set_attributes(timing.labels)
+
+
+def record_model_usage(model: str, response) -> None:
+    """Counts the tokens of a GenerateContentResponse or LlmResponse."""
+
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    MODEL_TOKENS.inc(usage.prompt_token_count or 0, model=model, kind="prompt")
+    MODEL_TOKENS.inc(usage.cached_content_token_count or 0, model=model, kind="cached")
+    MODEL_TOKENS.inc(usage.candidates_token_count or 0, model=model, kind="output")
+
+
+def configure_tracing(service_name: Optional[str] = None) -> bool:
+    """
+    Exports spans with OTLP/HTTP when OTEL_EXPORTER_OTLP_ENDPOINT (or ..._TRACES_ENDPOINT)
+    is set. Requires the optional `otlp` dependencies (`pip install charla_facil[otlp]`).
+
+    Returns:
+        True when an exporter was installed.
+    """
+
+    if not (os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")):
+        return False
+
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning(
+            "OTLP endpoint set but the exporter is missing, install it with `pip install charla_facil[otlp]`.")
+        return False
+
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(resource=Resource.create(
+            {"service.name": service_name or os.getenv("OTEL_SERVICE_NAME", "charla_facil")}))
+        trace.set_tracer_provider(provider)
+
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    logger.info("Exporting traces with OTLP")
+    return True
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class MicroBatchStats:
+    """Snapshot of the micro batcher metrics."""
+    batches: int = 0
+    items: int = 0
+    failed_batches: int = 0
+    max_batch_size: int = 0
+    max_wait_ms: float = 0.0
+    total_wait_ms: float = 0.0
+
+    @property
+    def avg_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
+
+    @property
+    def avg_wait_ms(self) -> float:
+        return self.total_wait_ms / self.items if self.items else 0.0
+
+
+# batch_fn(items) -> one result per item, in the same order
+BatchFunction = Callable[[List[T]], Awaitable[List[R]]]
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Collects concurrent `submit` calls and runs them as a single `batch_fn` call.
+
+    A batch is flushed when it reaches max_batch_size items or max_wait seconds after
+    its first item arrived, whichever comes first, so every item waits at most max_wait
+    before its batch starts. An exception of batch_fn is raised to every caller of the batch.
+    """
+
+    def __init__(self, batch_fn: BatchFunction, max_batch_size: int = 32, max_wait: float = 0.02):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+
+        self._pending: List[Tuple[T, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = MicroBatchStats()
+
+    def stats(self) -> MicroBatchStats:
+        return MicroBatchStats(**vars(self._stats))
+
+    async def submit(self, item: T) -> R:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or the previous event loop is gone (e.g. separate asyncio.run calls)
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+
+        future = loop.create_future()
+        self._pending.append((item, future, time.monotonic()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            self._loop.create_task(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future, float]]) -> None:
+        started = time.monotonic()
+        self._stats.batches += 1
+        self._stats.items += len(batch)
+        self._stats.max_batch_size = max(self._stats.max_batch_size, len(batch))
+        for _, _, submitted_at in batch:
+            wait_ms = (started - submitted_at) * 1000
+            self._stats.total_wait_ms += wait_ms
+            self._stats.max_wait_ms = max(self._stats.max_wait_ms, wait_ms)
+
+        try:
+            results = await self.batch_fn([item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(f"Batch function returned {len(results)} results for {len(batch)} items")
+        except Exception as e:
+            self._stats.failed_batches += 1
+            logger.error(f"Batch of {len(batch)} items failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,369 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from google.adk.tools import BaseTool, ToolContext
+from google.genai import types
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from charla_facil.agents.word_repetition_agent import QuizBatch, word_repetition_agent
+from charla_facil.cache import TTLCache
+from charla_facil.metrics import record_model_usage
+from charla_facil.quiz_builder import is_struggle_request
+from charla_facil.search_cache import normalize_query
+from charla_facil.storage.db import get_async_db_engine
+from charla_facil.storage.orm_models import QuizBankORM
+from charla_facil.tools.practice_words import get_due_practice_words, get_practice_words
+from charla_facil.util import get_user_id
+from charla_facil.word_rating import get_client
+
+logger = logging.getLogger(__name__)
+
+# Bank topic of all "words I'm currently struggling with" requests
+STRUGGLE_TOPIC = "struggle words"
+
+QUIZ_MODEL = word_repetition_agent.model.model
+
+QUIZ_PROMPT = """You are the "Curriculum Specialist," a strict backend agent responsible for generating high-quality Spanish vocabulary exercises.
+
+Generate a `QuizBatch` for the given **Topic**:
+- When a list of **Struggle words** is given, quiz exactly these words (they are the learner's weakest words).
+- Otherwise generate 5-10 relevant words/phrases suitable for a general learner.
+- Ensure Spanish words are natural and include articles where necessary (e.g., "el gato" not just "gato").
+- Ensure English translations are accurate, difficulty is easy, medium or hard.
+- **ONLY** output the JSON object."""
+
+_quiz_config = types.GenerateContentConfig(
+    system_instruction=QUIZ_PROMPT,
+    response_mime_type="application/json",
+    response_schema=QuizBatch,
+)
+
+# generator(topic, struggle words) -> (quiz, tokens spent)
+QuizGenerator = Callable[[str, List[str]], Awaitable[Tuple[QuizBatch, int]]]
+
+
+async def generate_quiz(topic: str, words: List[str]) -> Tuple[QuizBatch, int]:
+    """Generates a quiz with one structured-output model call (no tool calls, words are inline)."""
+
+    contents = f"Topic: {topic}"
+    if words:
+        contents += f"\nStruggle words: {', '.join(words)}"
+
+    response = await get_client().aio.models.generate_content(
+        model=QUIZ_MODEL, contents=contents, config=_quiz_config)
+    record_model_usage(QUIZ_MODEL, response)
+
+    quiz = response.parsed if isinstance(response.parsed, QuizBatch) else QuizBatch.model_validate_json(response.text)
+    usage = response.usage_metadata
+    return quiz, (usage.total_token_count or 0) if usage else 0
+
+
+def topic_key(request: str) -> str:
+    return STRUGGLE_TOPIC if is_struggle_request(request) else normalize_query(request)
+
+
+def struggle_words(user_id: str, count: int = 10) -> List[str]:
+    """Words the agent would quiz: due words first, filled up with the hardest words."""
+
+    words = [w["word"] for w in get_due_practice_words(count, user_id)]
+    if len(words) < 5:
+        words += [w["word"] for w in get_practice_words(count, user_id) if w["word"] not in words]
+    return words[:count]
+
+
+def words_fingerprint(words: List[str]) -> str:
+    """Identifies the struggle list regardless of its order (rankings change on every rating)."""
+    return "\n".join(sorted(set(words)))
+
+
+def similar_fingerprints(banked: str, current: str, min_overlap: float) -> bool:
+    """
+    Whether quizzes of the banked struggle list still fit the current one: a rating moves a
+    word or two in and out of the list, which should not throw the bank away.
+    """
+
+    if banked == current:
+        return True
+    banked_words, current_words = set(banked.split("\n")) - {""}, set(current.split("\n")) - {""}
+    if not banked_words or not current_words:
+        return False
+    return len(banked_words & current_words) / len(banked_words | current_words) >= min_overlap
+
+
+@dataclass
+class QuizBankStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    refills: int = 0
+    generated: int = 0
+    failures: int = 0
+    over_budget: int = 0
+    tokens: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class QuizBank:
+    """
+    Precomputed quizzes of word_repetition_agent per learner and topic (quiz_bank table), used
+    as before_tool_callback of the agent calling it. A request takes the oldest available quiz
+    of its topic (indexed lookup) and marks it consumed, so the learner does not wait for the
+    structured-output generation.
+
+    A bank running low (fewer than low_watermark quizzes left), a changed struggle list and
+    misses schedule a background refill up to size quizzes. A free-form topic is only
+    refilled when it is requested again within repeat_window seconds, one-off topics are
+    left to the agent. Banked struggle quizzes are kept while the struggle list shares at
+    least min_overlap of its words (Jaccard) with the one they were generated from.
+    Refills run at most max_concurrency at a time and stop when token_budget tokens were
+    spent within budget_window seconds. Call `shutdown` on server exit.
+    """
+
+    def __init__(
+        self,
+        tool_name: str,
+        generator: QuizGenerator = generate_quiz,
+        size: int = 3,
+        low_watermark: int = 1,
+        max_concurrency: int = 2,
+        token_budget: int = 200_000,
+        budget_window: float = 3600,
+        repeat_window: float = 86_400,
+        min_overlap: float = 0.75,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.tool_name = tool_name
+        self.generator = generator
+        self.size = size
+        self.low_watermark = low_watermark
+        self.max_concurrency = max(1, max_concurrency)
+        self.token_budget = token_budget
+        self.budget_window = budget_window
+        self.min_overlap = min_overlap
+        self.enabled = enabled
+        self._clock = clock
+        self._window_start = clock()
+        self._window_tokens = 0
+        self._pending: Set[Tuple[str, str]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._requested: TTLCache[Tuple[str, str], bool] = TTLCache(max_size=10_000, ttl=repeat_window, clock=clock)
+        self._stats = QuizBankStats()
+
+    def stats(self) -> QuizBankStats:
+        return QuizBankStats(**vars(self._stats))
+
+    # ---- storage
+
+    def _take(self, session: Session, user_id: str, topic: str, fingerprint: str) -> Tuple[Optional[dict], int, bool]:
+        """Consumes the oldest available quiz. Returns (quiz, quizzes left, stale quizzes dropped)."""
+
+        available = (QuizBankORM.user_id == user_id, QuizBankORM.topic == topic, QuizBankORM.consumed_at.is_(None))
+        stale = self._drop_stale(session, available, fingerprint) > 0
+
+        quiz = None
+        row = session.execute(
+            select(QuizBankORM.id, QuizBankORM.quiz).where(*available).order_by(QuizBankORM.id).limit(1)).first()
+        if row is not None:
+            consumed = session.execute(
+                update(QuizBankORM).where(QuizBankORM.id == row.id, QuizBankORM.consumed_at.is_(None))
+                .values(consumed_at=datetime.now())).rowcount
+            quiz = row.quiz if consumed else None
+
+        left = session.scalar(select(func.count()).select_from(QuizBankORM).where(*available))
+        session.commit()
+        return quiz, left, stale
+
+    def _drop_stale(self, session: Session, available: tuple, fingerprint: str) -> int:
+        """Deletes the available quizzes of a struggle list that changed too much, returns their number."""
+
+        stale = [
+            row.id for row in session.execute(select(QuizBankORM.id, QuizBankORM.fingerprint).where(*available))
+            if not similar_fingerprints(row.fingerprint, fingerprint, self.min_overlap)
+        ]
+        if stale:
+            session.execute(delete(QuizBankORM).where(QuizBankORM.id.in_(stale)))
+        return len(stale)
+
+    def _available(self, session: Session, user_id: str, topic: str, fingerprint: str) -> int:
+        # Consumed quizzes are kept until the next refill of the topic
+        session.execute(delete(QuizBankORM).where(
+            QuizBankORM.user_id == user_id, QuizBankORM.topic == topic, QuizBankORM.consumed_at.is_not(None)))
+        available = (QuizBankORM.user_id == user_id, QuizBankORM.topic == topic, QuizBankORM.consumed_at.is_(None))
+        self._drop_stale(session, available, fingerprint)
+        session.commit()
+        return session.scalar(select(func.count()).select_from(QuizBankORM).where(*available))
+
+    def _store(self, session: Session, user_id: str, topic: str, fingerprint: str, quiz: QuizBatch) -> None:
+        session.add(QuizBankORM(user_id=user_id, topic=topic, fingerprint=fingerprint,
+                                quiz=quiz.model_dump(exclude_none=True)))
+        session.commit()
+
+    async def _run(self, fn, *args):
+        async with AsyncSession(get_async_db_engine()) as session:
+            return await session.run_sync(fn, *args)
+
+    async def _words(self, user_id: str, topic: str) -> Tuple[List[str], str]:
+        if topic != STRUGGLE_TOPIC:
+            return [], ""
+        words = await asyncio.to_thread(struggle_words, user_id)
+        return words, words_fingerprint(words)
+
+    # ---- serving
+
+    async def take(self, user_id: str, request: str) -> Optional[dict]:
+        """Consumes a banked quiz for the request, scheduling a refill when the bank runs low."""
+
+        topic = topic_key(request)
+        _, fingerprint = await self._words(user_id, topic)
+        quiz, left, stale = await self._run(self._take, user_id, topic, fingerprint)
+
+        if stale:
+            self._stats.stale += 1
+        if quiz is None:
+            self._stats.misses += 1
+        else:
+            self._stats.hits += 1
+
+        if quiz is None and topic != STRUGGLE_TOPIC and not self._requested.get((user_id, topic)):
+            # Banked only once the topic comes back
+            self._requested.set((user_id, topic), True)
+        elif left < self.low_watermark or quiz is None:
+            self.schedule(user_id, topic)
+        return quiz
+
+    async def before_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext):
+        """ADK before_tool_callback, returns a banked quiz instead of running the agent."""
+
+        if not self.enabled or tool.name != self.tool_name:
+            return None
+        request = args.get("request")
+        if not isinstance(request, str) or not request.strip():
+            return None
+        try:
+            return await self.take(get_user_id(tool_context), request)
+        except Exception as e:
+            logger.warning(f"Quiz bank lookup failed: {e}")
+            return None
+
+    # ---- refills
+
+    def _budget_left(self) -> bool:
+        now = self._clock()
+        if now - self._window_start >= self.budget_window:
+            self._window_start, self._window_tokens = now, 0
+        return self._window_tokens < self.token_budget
+
+    def schedule(self, user_id: str, topic: str) -> bool:
+        """Starts a background refill of the topic (one at a time per learner and topic)."""
+
+        key = (user_id, topic)
+        if not self.enabled or key in self._pending:
+            return False
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Tasks of another (closed) loop are gone
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._pending.clear()
+            self._tasks.clear()
+
+        self._pending.add(key)
+        task = loop.create_task(self._refill(user_id, topic), name=f"quiz-bank-refill-{topic}")
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _refill(self, user_id: str, topic: str) -> None:
+        try:
+            async with self._semaphore:
+                words, fingerprint = await self._words(user_id, topic)
+                missing = self.size - await self._run(self._available, user_id, topic, fingerprint)
+                if missing > 0:
+                    self._stats.refills += 1
+
+                for _ in range(missing):
+                    if not self._budget_left():
+                        self._stats.over_budget += 1
+                        logger.info("Quiz bank token budget spent, refill postponed.")
+                        break
+                    quiz, tokens = await self.generator(topic, words)
+                    self._window_tokens += tokens
+                    self._stats.tokens += tokens
+                    await self._run(self._store, user_id, topic, fingerprint, quiz)
+                    self._stats.generated += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._stats.failures += 1
+            logger.error(f"Quiz bank refill failed: {e}")
+        finally:
+            self._pending.discard((user_id, topic))
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """Waits for the running refills. Returns True when all finished within timeout."""
+
+        tasks = [t for t in self._tasks if t.get_loop() is asyncio.get_running_loop()]
+        if not tasks:
+            return True
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        return not pending
+
+    async def shutdown(self, timeout: Optional[float] = 10.0) -> None:
+        """Waits for the running refills (up to timeout) and cancels the rest."""
+
+        if not await self.drain(timeout):
+            logger.warning("Quiz bank shutdown timed out, unfinished refills are cancelled.")
+        tasks = [t for t in self._tasks if t.get_loop() is asyncio.get_running_loop()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._pending.clear()
+
+    def collect_metrics(self):
+        """Metrics collector (see MetricsRegistry.register_collector)."""
+
+        stats = self.stats()
+        yield ("charla_quiz_bank_lookups_total", "counter", "Quiz bank lookups by result.", [
+            ({"result": "hit"}, stats.hits),
+            ({"result": "miss"}, stats.misses),
+        ])
+        yield ("charla_quiz_bank_generated_total", "counter", "Quizzes generated by bank refills.",
+               [({}, stats.generated)])
+        yield ("charla_quiz_bank_refills_total", "counter", "Bank refills by outcome.", [
+            ({"outcome": "started"}, stats.refills),
+            ({"outcome": "failed"}, stats.failures),
+            ({"outcome": "over_budget"}, stats.over_budget),
+        ])
+        yield ("charla_quiz_bank_tokens_total", "counter", "Model tokens spent on bank refills.",
+               [({}, stats.tokens)])
+
+
+def create_quiz_bank(tool_name: str) -> QuizBank:
+    """Builds the quiz bank configured from environment variables."""
+
+    return QuizBank(
+        tool_name,
+        size=int(os.getenv("QUIZ_BANK_SIZE", "3")),
+        low_watermark=int(os.getenv("QUIZ_BANK_LOW_WATERMARK", "1")),
+        max_concurrency=int(os.getenv("QUIZ_BANK_CONCURRENCY", "2")),
+        token_budget=int(os.getenv("QUIZ_BANK_TOKEN_BUDGET", "200000")),
+        budget_window=float(os.getenv("QUIZ_BANK_BUDGET_WINDOW", "3600")),
+        repeat_window=float(os.getenv("QUIZ_BANK_REPEAT_WINDOW", "86400")),
+        min_overlap=float(os.getenv("QUIZ_BANK_MIN_OVERLAP", "0.75")),
+        enabled=os.getenv("QUIZ_BANK", "true").lower() in ("1", "true", "yes"),
+    )
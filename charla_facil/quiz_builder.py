@@ -0,0 +1,141 @@
+import logging
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from google.adk.tools import BaseTool, ToolContext
+
+from charla_facil.agents.word_repetition_agent import QuizBatch, QuizItem
+from charla_facil.dictionary import get_dictionary
+from charla_facil.spanish_filter import strip_accents
+from charla_facil.tools.practice_words import get_due_practice_words_async, get_practice_words_async
+
+logger = logging.getLogger(__name__)
+
+# Requests for the learner's own struggle words, matched against lower case text without accents
+_STRUGGLE_REQUEST = re.compile(
+    r"\b(struggl\w*|weak(est)? words?|hard(est)? words?|difficult words?|problem words?|practice words?"
+    r"|my words|due words?|palabras (dificiles|debiles|que me cuestan)|mis palabras|me cuestan?)\b")
+
+# A topic left in the request makes it a free-form topic ("hard words about animals")
+_TOPIC_RESTRICTION = re.compile(
+    r"\b(about|related to|regarding|on|in|for|sobre|relacionad[ao]s? con|de|del|en|para)\s+"
+    r"(?:(?:the|a|an|el|la|los|las)\s+)?(\w+)")
+_NOT_A_TOPIC = {
+    "me", "my", "mi", "mis", "i", "us", "words", "palabras",
+    "today", "now", "this", "past", "last", "hoy", "ahora", "esta", "este",
+}
+
+
+def is_struggle_request(request: str) -> bool:
+    text = strip_accents(request.casefold())
+    if not _STRUGGLE_REQUEST.search(text):
+        return False
+    return all(match.group(2) in _NOT_A_TOPIC for match in _TOPIC_RESTRICTION.finditer(text))
+
+
+@dataclass
+class QuizBuilderStats:
+    local: int = 0
+    fallbacks: int = 0
+
+    @property
+    def local_rate(self) -> float:
+        total = self.local + self.fallbacks
+        return self.local / total if total else 0.0
+
+
+class LocalQuizBuilder:
+    """
+    Builds the "words I'm currently struggling with" quizzes of word_repetition_agent without
+    a model call, used as before_tool_callback of the agent calling it. Follows the agent's
+    workflow: due words first, filled up with the hardest words, translated with the packaged
+    dictionary (see charla_facil.dictionary).
+
+    Free-form topics, learners without practice words and due words missing from the
+    dictionary are left to the agent. Missing fill-up words are skipped as long as min_items
+    words are left.
+    """
+
+    def __init__(self, tool_name: str, min_items: int = 5, max_items: int = 10, enabled: bool = True):
+        self.tool_name = tool_name
+        self.min_items = min_items
+        self.max_items = max_items
+        self.enabled = enabled
+        self._stats = QuizBuilderStats()
+
+    def stats(self) -> QuizBuilderStats:
+        return QuizBuilderStats(**vars(self._stats))
+
+    async def build(self, topic: str, tool_context: Optional[ToolContext] = None) -> Optional[QuizBatch]:
+        """Quiz over the struggle words of the user, None when the agent has to write it."""
+
+        due = await get_due_practice_words_async(self.max_items, tool_context)
+        hardest = []
+        if len(due) < self.min_items:
+            hardest = await get_practice_words_async(self.max_items, tool_context)
+
+        dictionary = get_dictionary()
+        items = {}
+        for word in due:
+            entry = dictionary.entry(word["word"])
+            if entry is None:
+                return None
+            items.setdefault(entry.word, QuizItem(
+                spanish_word=entry.spanish, english_translation=entry.english, difficulty=entry.difficulty))
+
+        candidates = 0
+        for word in hardest:
+            if len(items) >= self.max_items:
+                break
+            candidates += 1
+            entry = dictionary.entry(word["word"])
+            if entry is not None:
+                items.setdefault(entry.word, QuizItem(
+                    spanish_word=entry.spanish, english_translation=entry.english, difficulty=entry.difficulty))
+
+        if not items or len(items) < min(self.min_items, len(due) + candidates):
+            return None
+        return QuizBatch(topic=topic, items=list(items.values())[:self.max_items])
+
+    async def before_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext):
+        """ADK before_tool_callback, returns the locally built quiz instead of running the agent."""
+
+        if not self.enabled or tool.name != self.tool_name:
+            return None
+        request = args.get("request")
+        if not isinstance(request, str) or not is_struggle_request(request):
+            return None
+
+        try:
+            quiz = await self.build(request, tool_context)
+        except Exception as e:
+            logger.warning(f"Local quiz build failed: {e}")
+            quiz = None
+
+        if quiz is None:
+            self._stats.fallbacks += 1
+            return None
+        self._stats.local += 1
+        return quiz.model_dump(exclude_none=True)
+
+    def collect_metrics(self):
+        """Metrics collector (see MetricsRegistry.register_collector)."""
+
+        stats = self.stats()
+        yield ("charla_quiz_requests_total", "counter", "Struggle word quizzes by builder.", [
+            ({"builder": "local"}, stats.local),
+            ({"builder": "agent"}, stats.fallbacks),
+        ])
+
+
+def create_quiz_builder(tool_name: str) -> LocalQuizBuilder:
+    """Builds the local quiz builder configured from environment variables."""
+
+    return LocalQuizBuilder(
+        tool_name,
+        min_items=int(os.getenv("LOCAL_QUIZ_MIN_ITEMS", "5")),
+        max_items=int(os.getenv("LOCAL_QUIZ_MAX_ITEMS", "10")),
+        enabled=os.getenv("LOCAL_QUIZ", "true").lower() in ("1", "true", "yes"),
+    )
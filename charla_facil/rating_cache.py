@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import os
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from charla_facil.cache import TTLCache
+from charla_facil.storage.db import get_async_db_engine, get_db_engine, upsert
+from charla_facil.storage.orm_models import RatingCacheORM
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_message(message: str) -> str:
+    """
+    Case and whitespace insensitive form of a message. Accents and punctuation are kept,
+    since they change the rating (e.g. "cancion" vs "canción").
+    """
+
+    return " ".join(unicodedata.normalize("NFC", message).casefold().split())
+
+
+@dataclass
+class RatingCacheStats:
+    memory_hits: int = 0
+    persistent_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return (self.memory_hits + self.persistent_hits) / lookups if lookups else 0.0
+
+
+class RatingCache:
+    """
+    Content addressed cache of extracted `updates` lists for rate_word_use.
+
+    Keys hash the normalized message together with the model name and a version of the
+    prompt / tool declaration, so a prompt change never serves stale ratings.
+    An optional persistent tier (rating_cache table) survives restarts and is shared
+    between processes.
+    """
+
+    def __init__(self, version: str, max_size: int = 10_000, ttl: float = 7 * 24 * 3600, persistent: bool = False):
+        self.version = version
+        self.ttl = ttl
+        self.persistent = persistent
+        self._memory: TTLCache[str, List[dict]] = TTLCache(max_size=max_size, ttl=ttl)
+        self._stats = RatingCacheStats()
+
+    def key(self, message: str) -> str:
+        payload = f"{self.version}\0{normalize_message(message)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def stats(self) -> RatingCacheStats:
+        return RatingCacheStats(**vars(self._stats))
+
+    def clear(self) -> None:
+        self._memory.clear()
+
+    def _memory_get(self, key: str) -> Optional[List[dict]]:
+        updates = self._memory.get(key)
+        if updates is not None:
+            self._stats.memory_hits += 1
+        return updates
+
+    def _persistent_get(self, session: Session, key: str) -> Optional[List[dict]]:
+        row = session.get(RatingCacheORM, key)
+        if row is None or row.expires_at <= datetime.now():
+            return None
+        return row.updates
+
+    def _persistent_put(self, session: Session, key: str, updates: List[dict]) -> None:
+        now = datetime.now()
+        stmt = upsert(session, RatingCacheORM).values(
+            key=key, updates=updates, expires_at=now + timedelta(seconds=self.ttl))
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[RatingCacheORM.key],
+            set_={"updates": stmt.excluded.updates, "expires_at": stmt.excluded.expires_at},
+        ))
+        session.execute(delete(RatingCacheORM).where(RatingCacheORM.expires_at <= now))
+
+    def _found(self, key: str, updates: Optional[List[dict]]) -> Optional[List[dict]]:
+        if updates is None:
+            self._stats.misses += 1
+            return None
+        self._stats.persistent_hits += 1
+        self._memory.set(key, updates)
+        return updates
+
+    def get(self, message: str) -> Optional[List[dict]]:
+        key = self.key(message)
+        updates = self._memory_get(key)
+        if updates is not None:
+            return updates
+        if not self.persistent:
+            self._stats.misses += 1
+            return None
+
+        with Session(get_db_engine()) as session:
+            return self._found(key, self._persistent_get(session, key))
+
+    async def get_async(self, message: str) -> Optional[List[dict]]:
+        key = self.key(message)
+        updates = self._memory_get(key)
+        if updates is not None:
+            return updates
+        if not self.persistent:
+            self._stats.misses += 1
+            return None
+
+        async with AsyncSession(get_async_db_engine()) as session:
+            return self._found(key, await session.run_sync(self._persistent_get, key))
+
+    def put(self, message: str, updates: List[dict]) -> None:
+        key = self.key(message)
+        self._memory.set(key, updates)
+        if self.persistent:
+            with Session(get_db_engine()) as session:
+                self._persistent_put(session, key, updates)
+                session.commit()
+
+    async def put_async(self, message: str, updates: List[dict]) -> None:
+        key = self.key(message)
+        self._memory.set(key, updates)
+        if self.persistent:
+            async with AsyncSession(get_async_db_engine()) as session:
+                await session.run_sync(self._persistent_put, key, updates)
+                await session.commit()
+
+
+def create_rating_cache(*version_parts: str) -> RatingCache:
+    """Builds the rating cache configured from environment variables."""
+
+    version = hashlib.sha256("\0".join(version_parts).encode("utf-8")).hexdigest()
+    return RatingCache(
+        version,
+        max_size=int(os.getenv("RATING_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("RATING_CACHE_TTL", str(7 * 24 * 3600))),
+        persistent=os.getenv("RATING_CACHE_PERSIST", "false").lower() in ("1", "true", "yes"),
+    )
@@ -0,0 +1,229 @@
+import asyncio
+import inspect
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Awaitable, Callable, Deque, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class QueuePolicy(str, Enum):
+    """What to do with a new rating job when the queue is full."""
+    BLOCK = "block"               # wait (up to block_timeout) for a free slot, then drop the new job
+    DROP_NEWEST = "drop_newest"   # drop the new job
+    DROP_OLDEST = "drop_oldest"   # drop the oldest queued job to make room
+    MERGE = "merge"               # append to a queued job of the same session, else drop the oldest
+
+
+@dataclass
+class RatingJob:
+    key: str
+    user_id: str
+    message: str
+    enqueued_at: float
+
+
+@dataclass
+class RatingPipelineStats:
+    """Snapshot of the rating pipeline metrics."""
+    queue_depth: int = 0
+    in_flight: int = 0
+    enqueued: int = 0
+    processed: int = 0
+    failed: int = 0
+    dropped: int = 0
+    merged: int = 0
+    last_lag_ms: float = 0.0
+    max_lag_ms: float = 0.0
+    total_lag_ms: float = 0.0
+
+    @property
+    def avg_lag_ms(self) -> float:
+        started = self.processed + self.failed
+        return self.total_lag_ms / started if started else 0.0
+
+
+# handler(message, user_id)
+RatingHandler = Callable[[str, str], Union[None, Awaitable[None]]]
+
+
+class RatingPipeline:
+    """
+    In-process queue that runs word rating in background workers, so the agent turn
+    does not wait for the rating LLM call.
+
+    Workers are started lazily in the running event loop on first submit.
+    Sync handlers are executed in a worker thread.
+    """
+
+    def __init__(
+        self,
+        handler: RatingHandler,
+        workers: int = 2,
+        max_queue_size: int = 256,
+        policy: QueuePolicy = QueuePolicy.DROP_OLDEST,
+        block_timeout: float = 0.05,
+    ):
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue_size = max(1, max_queue_size)
+        self.policy = QueuePolicy(policy)
+        self.block_timeout = block_timeout
+
+        self._jobs: Deque[RatingJob] = deque()
+        self._stats = RatingPipelineStats()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Condition] = None
+        self._closed = False
+
+    def stats(self) -> RatingPipelineStats:
+        snapshot = RatingPipelineStats(**vars(self._stats))
+        snapshot.queue_depth = len(self._jobs)
+        return snapshot
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+
+        # First use, or the previous event loop is gone (e.g. separate asyncio.run calls)
+        self._loop = loop
+        self._changed = asyncio.Condition()
+        self._closed = False
+        self._tasks = [
+            loop.create_task(self._worker(), name=f"rating-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def submit(self, key: str, user_id: str, message: str) -> bool:
+        """
+        Enqueues a message for rating and returns immediately (or after block_timeout with the BLOCK policy).
+
+        Returns:
+          True when the message was queued or merged into a queued job, False when it was dropped.
+        """
+
+        if self._closed:
+            logger.warning("Rating pipeline is shutting down, dropping message.")
+            self._stats.dropped += 1
+            return False
+
+        self._ensure_started()
+
+        async with self._changed:
+            if len(self._jobs) >= self.max_queue_size:
+                if self.policy == QueuePolicy.MERGE and self._merge(key, message):
+                    return True
+
+                if self.policy == QueuePolicy.BLOCK:
+                    try:
+                        await asyncio.wait_for(
+                            self._changed.wait_for(
+                                lambda: len(self._jobs) < self.max_queue_size),
+                            timeout=self.block_timeout)
+                    except asyncio.TimeoutError:
+                        self._stats.dropped += 1
+                        logger.warning("Rating queue full, dropping message.")
+                        return False
+                elif self.policy == QueuePolicy.DROP_NEWEST:
+                    self._stats.dropped += 1
+                    logger.warning("Rating queue full, dropping message.")
+                    return False
+                else:
+                    self._jobs.popleft()
+                    self._stats.dropped += 1
+                    logger.warning("Rating queue full, dropped the oldest message.")
+
+            self._jobs.append(RatingJob(key, user_id, message, time.monotonic()))
+            self._stats.enqueued += 1
+            self._changed.notify_all()
+            return True
+
+    def _merge(self, key: str, message: str) -> bool:
+        """Appends the message to the newest queued job of the same session, if any."""
+
+        for job in reversed(self._jobs):
+            if job.key == key:
+                job.message = f"{job.message}\n{message}"
+                self._stats.merged += 1
+                return True
+        return False
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self._jobs)
+                job = self._jobs.popleft()
+                self._stats.in_flight += 1
+                self._changed.notify_all()
+
+            lag_ms = (time.monotonic() - job.enqueued_at) * 1000
+            self._stats.last_lag_ms = lag_ms
+            self._stats.max_lag_ms = max(self._stats.max_lag_ms, lag_ms)
+            self._stats.total_lag_ms += lag_ms
+
+            try:
+                if inspect.iscoroutinefunction(self.handler):
+                    await self.handler(job.message, job.user_id)
+                else:
+                    await asyncio.to_thread(self.handler, job.message, job.user_id)
+                self._stats.processed += 1
+            except Exception as e:
+                self._stats.failed += 1
+                logger.error(f"Rating job failed: {e}")
+            finally:
+                async with self._changed:
+                    self._stats.in_flight -= 1
+                    self._changed.notify_all()
+
+    async def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all queued and in-flight jobs are done.
+
+        Returns:
+          True when the queue was fully drained within timeout.
+        """
+
+        if not self._tasks or self._loop is not asyncio.get_running_loop():
+            return not self._jobs
+
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(
+                        lambda: not self._jobs and not self._stats.in_flight),
+                    timeout=timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+    async def shutdown(self, timeout: Optional[float] = 10.0) -> None:
+        """Stops accepting new jobs, drains the queue (up to timeout) and stops the workers."""
+
+        self._closed = True
+        if not await self.drain(timeout):
+            logger.warning(
+                f"Rating pipeline shutdown timed out, {len(self._jobs)} message(s) not rated.")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._jobs.clear()
+
+
+def create_rating_pipeline(handler: RatingHandler) -> RatingPipeline:
+    """Builds the rating pipeline configured from environment variables."""
+
+    return RatingPipeline(
+        handler,
+        workers=int(os.getenv("RATING_WORKERS", "32")),
+        max_queue_size=int(os.getenv("RATING_QUEUE_SIZE", "256")),
+        policy=QueuePolicy(os.getenv("RATING_QUEUE_POLICY", QueuePolicy.DROP_OLDEST.value)),
+        block_timeout=float(os.getenv("RATING_BLOCK_TIMEOUT", "0.05")),
+    )
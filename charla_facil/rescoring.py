@@ -0,0 +1,400 @@
+"""
+Vectorized (NumPy) re-scoring of practice words.
+
+Runs the same update rule as `fold_word_observations` over arrays of observations, so
+tuned scoring constants can be re-applied to every learner at once. The per-row
+`fold_word_observations` stays the reference implementation.
+
+Requires the optional `numpy` dependency (`pip install charla_facil[rescore]`).
+"""
+
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from charla_facil.storage.db import get_db_engine, upsert
+from charla_facil.storage.orm_models import CompactionStateORM, PracticeWordORM, WordObservationORM
+from charla_facil.storage.word_ranking import struggle_rankings
+from charla_facil.tools import practice_words as scoring
+from charla_facil.tools.practice_words import BatchTimings, _fold_into_snapshot, lock_compaction_mark
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_US_PER_DAY = 86_400 * 1_000_000
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            "Re-scoring requires numpy, install it with `pip install charla_facil[rescore]`.")
+
+
+@dataclass
+class RescoredWords:
+    """Folded state of every (user_id, word) pair, one array element per pair."""
+    user_id: "np.ndarray"
+    word: "np.ndarray"
+    familiarity_level: "np.ndarray"
+    correct_streak_count: "np.ndarray"
+    update_count: "np.ndarray"
+    last_used: "np.ndarray"
+    next_due_at: "np.ndarray"
+
+    def __len__(self) -> int:
+        return len(self.word)
+
+    def __getitem__(self, index: slice) -> "RescoredWords":
+        return RescoredWords(**{field.name: getattr(self, field.name)[index] for field in fields(self)})
+
+    @classmethod
+    def concatenate(cls, parts: List["RescoredWords"]) -> "RescoredWords":
+        if not parts:
+            return rescore_observations([], [], [], [])
+        return cls(**{field.name: np.concatenate([getattr(part, field.name) for part in parts])
+                      for field in fields(cls)})
+
+    def rows(self, start: int = 0, stop: Optional[int] = None) -> Iterator[dict]:
+        columns = zip(
+            self.user_id[start:stop].tolist(),
+            self.word[start:stop].tolist(),
+            self.familiarity_level[start:stop].tolist(),
+            self.correct_streak_count[start:stop].tolist(),
+            self.update_count[start:stop].tolist(),
+            self.last_used[start:stop].tolist(),
+            self.next_due_at[start:stop].tolist(),
+        )
+        for user_id, word, familiarity, streak, update_count, last_used, next_due_at in columns:
+            yield {
+                "user_id": user_id,
+                "word": word,
+                "familiarity_level": familiarity,
+                "correct_streak_count": streak,
+                "update_count": update_count,
+                "last_used": last_used,
+                "next_due_at": next_due_at,
+            }
+
+
+def _review_interval_us(familiarity, streak):
+    ease = scoring.MIN_EASE + (scoring.MAX_EASE - scoring.MIN_EASE) * familiarity / 100
+    days = scoring.FIRST_INTERVAL_DAYS * (familiarity / 100) * ease ** np.minimum(streak, 50)
+    interval = np.rint(np.minimum(days, scoring.MAX_INTERVAL.days) * _US_PER_DAY).astype(np.int64)
+    return np.maximum(interval, scoring.MIN_INTERVAL // timedelta(microseconds=1))
+
+
+def _review_interval_us_scalar(familiarity: float, streak: int) -> int:
+    """Same arithmetic as _review_interval_us for a single word (identical results)."""
+    ease = scoring.MIN_EASE + (scoring.MAX_EASE - scoring.MIN_EASE) * familiarity / 100
+    days = scoring.FIRST_INTERVAL_DAYS * (familiarity / 100) * ease ** min(streak, 50)
+    interval = int(round(min(days, scoring.MAX_INTERVAL.days) * _US_PER_DAY))
+    return max(interval, scoring.MIN_INTERVAL // timedelta(microseconds=1))
+
+
+def _factorize(values):
+    """Hash based np.unique(..., return_inverse=True), much faster than sorting Python strings."""
+    values = values.tolist()
+    codes = {value: code for code, value in enumerate(dict.fromkeys(values))}
+    index = np.fromiter(map(codes.__getitem__, values), dtype=np.int64, count=len(values))
+    return np.array(list(codes), dtype=object), index
+
+
+# Steps with fewer active words than this are folded word by word: below it, the fixed cost
+# of the array operations of a step is higher than the per-word cost of plain Python
+VECTOR_MIN_PAIRS = 32
+
+
+def rescore_observations(user_ids, words, correctness, observed_at) -> RescoredWords:
+    """
+    Folds all observations with the current scoring constants.
+
+    On one core, 1M observations fold at about 2M/s for one learner's log in id order and
+    1M/s for unordered observations of many learners, where the (pair, time) sort dominates.
+    Further speed-ups would need a compiled fold loop, the repo does not ship one.
+
+    Args:
+        user_ids: Learner of each observation (array, or a single id for all of them).
+        words: Normalized word of each observation.
+        correctness: Rating (0-4) of each observation.
+        observed_at: Timestamp of each observation (datetimes or datetime64).
+    """
+
+    _require_numpy()
+    start = time.perf_counter()
+
+    words = np.asarray(words, dtype=object)
+    user_ids = np.asarray(user_ids, dtype=object)
+    correctness = np.asarray(correctness, dtype=np.int64)
+    observed_at = np.asarray(observed_at, dtype="datetime64[us]").astype(np.int64)
+    if not len(words):
+        empty = np.array([], dtype=np.int64)
+        return RescoredWords(
+            user_id=np.array([], dtype=object), word=words, familiarity_level=empty,
+            correct_streak_count=empty, update_count=empty,
+            last_used=empty.astype("datetime64[us]"), next_due_at=empty.astype("datetime64[us]"))
+
+    if user_ids.ndim == 0:  # a single learner (rescore_from_log)
+        unique_users = user_ids.reshape(1)
+        user_index = np.zeros(len(words), dtype=np.int64)
+    else:
+        unique_users, user_index = _factorize(np.broadcast_to(user_ids, words.shape))
+    unique_words, word_index = _factorize(words)
+    pair = user_index * len(unique_words) + word_index
+
+    # Chronological order within each (user, word) pair, stable for equal timestamps. The log
+    # read in id order is usually chronological already: then grouping the pairs is enough
+    if np.all(observed_at[1:] >= observed_at[:-1]):
+        order = np.argsort(pair, kind="stable")
+    else:
+        order = np.lexsort((observed_at, pair))
+    pair = pair[order]
+    correctness = correctness[order]
+    observed_at = observed_at[order]
+
+    is_start = np.r_[True, pair[1:] != pair[:-1]]
+    pair_index = np.cumsum(is_start) - 1
+    group_start = np.flatnonzero(is_start)
+    unique_pairs = pair[group_start]
+    group_size = np.diff(np.r_[group_start, len(pair_index)])
+    step = np.arange(len(pair_index)) - np.repeat(group_start, group_size)
+
+    target_by_correctness = np.array(
+        [scoring.TARGET_BY_CORRECTNESS[c] for c in range(5)], dtype=np.float64)
+    base_lr_by_correctness = np.array(
+        [scoring.BASE_LR_BY_CORRECTNESS[c] for c in range(5)], dtype=np.float64)
+    initial_by_correctness = np.array(
+        [scoring.initial_familiarity(c) for c in range(5)], dtype=np.float64)
+
+    # Pairs with the most observations first, so the pairs that still have a k-th observation
+    # are a prefix of the state arrays. Observations are ordered step-major with the pairs in
+    # the same order: every step works on slices (views), without gathers or scatters.
+    rank = np.argsort(-group_size, kind="stable")
+    position = np.empty_like(rank)
+    position[rank] = np.arange(len(rank))
+    # The pairs with a k-th observation are exactly positions 0.. of step k: no sort needed
+    step_end = np.cumsum(np.bincount(step))
+    by_step = np.empty_like(order)
+    by_step[np.r_[0, step_end[:-1]][step] + position[pair_index]] = np.arange(len(order))
+    observed_at = observed_at[by_step]
+    correctness = correctness[by_step]
+
+    # Terms that only depend on the rating
+    is_good = correctness >= 3
+    target = target_by_correctness[correctness]
+    base_lr = base_lr_by_correctness[correctness]
+
+    # First observation of every pair (step 0)
+    familiarity = initial_by_correctness[correctness[:step_end[0]]]
+    streak = np.zeros(len(unique_pairs), dtype=np.int64)
+    last_used = observed_at[:step_end[0]].copy()
+    next_due_at = last_used + _review_interval_us(familiarity, streak)
+
+    # Step k applies the k-th observation of every pair that has one, all pairs at once
+    k = 1
+    while k < len(step_end) and step_end[k] - step_end[k - 1] >= VECTOR_MIN_PAIRS:
+        now = observed_at[step_end[k - 1]:step_end[k]]
+        good = is_good[step_end[k - 1]:step_end[k]]
+        active = len(now)
+
+        # Forgetting curve (decay_familiarity)
+        old = familiarity[:active]
+        overdue = now - next_due_at[:active]
+        interval = next_due_at[:active] - last_used[:active]
+        decays = (overdue > 0) & (interval > 0)
+        ratio = np.divide(overdue, interval, out=np.zeros(active), where=decays)
+        old = np.where(decays, np.rint(old * 0.5 ** ratio), old)
+
+        # Learning rate and streak (apply_word_observation)
+        new_streak = np.where(good, streak[:active] + 1, 0)
+        bonus = np.minimum(scoring.STREAK_MAX_BONUS, scoring.STREAK_STEP * (new_streak - 1))
+        lr = base_lr[step_end[k - 1]:step_end[k]]
+        lr = np.where(good, lr * (1.0 + bonus), lr)
+
+        goal = target[step_end[k - 1]:step_end[k]]
+        new = old + lr * (goal - old)
+        new = np.where(np.abs(new - old) < 1.0, goal, new)
+        new = np.rint(np.clip(new, 0, 100))
+
+        familiarity[:active] = new
+        streak[:active] = new_streak
+        last_used[:active] = now
+        next_due_at[:active] = now + _review_interval_us(new, new_streak)
+        k += 1
+
+    # Long tail: the few words with more observations, folded one by one
+    if k < len(step_end):
+        tail = step_end[k - 1]
+        step_start = (np.r_[0, step_end] - tail).tolist()
+        sizes = group_size[rank].tolist()
+        now_list = observed_at[tail:].tolist()
+        good_list = is_good[tail:].tolist()
+        target_list = target[tail:].tolist()
+        base_lr_list = base_lr[tail:].tolist()
+        for i in range(step_end[k] - step_end[k - 1]):
+            f = float(familiarity[i])
+            st = int(streak[i])
+            used = int(last_used[i])
+            due = int(next_due_at[i])
+            for j in range(k, sizes[i]):
+                o = step_start[j] + i
+                now = now_list[o]
+                overdue = now - due
+                interval = due - used
+                if overdue > 0 and interval > 0:
+                    f = float(round(f * 0.5 ** (overdue / interval)))
+                if good_list[o]:
+                    st += 1
+                    bonus = min(scoring.STREAK_MAX_BONUS, scoring.STREAK_STEP * (st - 1))
+                    lr = base_lr_list[o] * (1.0 + bonus)
+                else:
+                    st = 0
+                    lr = base_lr_list[o]
+                goal = target_list[o]
+                new = f + lr * (goal - f)
+                if abs(new - f) < 1.0:
+                    new = goal
+                f = float(round(min(max(new, 0), 100)))
+                used = now
+                due = now + _review_interval_us_scalar(f, st)
+            familiarity[i] = f
+            streak[i] = st
+            last_used[i] = used
+            next_due_at[i] = due
+
+    # Back to pair order
+    familiarity = familiarity[position]
+    streak = streak[position]
+    last_used = last_used[position]
+    next_due_at = next_due_at[position]
+
+    logger.info(
+        f"Re-scored {len(pair_index)} observations of {len(unique_pairs)} words "
+        f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    return RescoredWords(
+        user_id=unique_users[unique_pairs // len(unique_words)],
+        word=unique_words[unique_pairs % len(unique_words)],
+        familiarity_level=familiarity.astype(np.int64),
+        correct_streak_count=streak,
+        update_count=group_size.astype(np.int64),
+        last_used=last_used.astype("datetime64[us]"),
+        next_due_at=next_due_at.astype("datetime64[us]"),
+    )
+
+
+def _upsert_rescored_words(session: Session, rescored: RescoredWords, chunk_size: int) -> None:
+    for start in range(0, len(rescored), chunk_size):
+        rows = list(rescored.rows(start, start + chunk_size))
+        stmt = upsert(session, PracticeWordORM)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[PracticeWordORM.user_id, PracticeWordORM.word],
+            set_={
+                field: getattr(stmt.excluded, field)
+                for field in ("familiarity_level", "correct_streak_count",
+                              "update_count", "last_used", "next_due_at")
+            },
+        )
+        session.execute(stmt, rows)
+
+
+def write_rescored_words(rescored: RescoredWords, chunk_size: int = 5000) -> None:
+    """
+    Replaces the stored state of the re-scored words, one transaction per chunk.
+    """
+
+    with Session(get_db_engine()) as session:
+        for start in range(0, len(rescored), chunk_size):
+            _upsert_rescored_words(session, rescored[start:start + chunk_size], chunk_size)
+            session.commit()
+
+    for user_id in set(rescored.user_id.tolist()):
+        struggle_rankings.invalidate(user_id)
+
+
+def _rescore_user(session: Session, user_id: str, chunk_size: int) -> RescoredWords:
+    """
+    Re-scores the learner in the caller's transaction. The compaction mark stays locked until
+    it ends, so no rating is logged or compacted meanwhile, and moves to the last re-scored
+    observation: every logged rating is applied exactly once.
+
+    Words whose snapshot holds more ratings than the log has compacted were rated before the
+    log existed (migrated databases). The log cannot rebuild them, they keep their snapshot
+    and only get their pending observations folded in, like a compaction would.
+    """
+
+    high_water_mark = lock_compaction_mark(session, user_id)
+    observations = session.execute(
+        select(
+            WordObservationORM.id,
+            WordObservationORM.word,
+            WordObservationORM.correctness,
+            WordObservationORM.observed_at,
+        )
+        .where(WordObservationORM.user_id == user_id, WordObservationORM.correctness.between(0, 4))
+        .order_by(WordObservationORM.id)
+    ).all()
+
+    compacted = Counter(word for observation_id, word, _, _ in observations if observation_id <= high_water_mark)
+    stored_counts = session.execute(
+        select(PracticeWordORM.word, PracticeWordORM.update_count)
+        .where(PracticeWordORM.user_id == user_id)
+    )
+    pre_log = {word for word, update_count in stored_counts if update_count > compacted[word]}
+
+    words, correctness, observed_at = [], [], []
+    pending: Dict[str, List[Tuple[int, datetime]]] = {}
+    for observation_id, word, rating, at in observations:
+        if word not in pre_log:
+            words.append(word)
+            correctness.append(rating)
+            observed_at.append(at)
+        elif observation_id > high_water_mark:
+            pending.setdefault(word, []).append((rating, at))
+
+    rescored = rescore_observations(user_id, words, correctness, observed_at)
+    if observations:
+        _upsert_rescored_words(session, rescored, chunk_size)
+        if pending:
+            _fold_into_snapshot(session, user_id, pending, BatchTimings())
+        session.execute(
+            update(CompactionStateORM)
+            .where(CompactionStateORM.user_id == user_id)
+            .values(last_observation_id=observations[-1].id))
+    if pre_log:
+        logger.info(f"Kept the snapshot of {len(pre_log)} words of {user_id} rated before the log")
+    return rescored
+
+
+def rescore_from_log(user_id: Optional[str] = None, chunk_size: int = 5000) -> RescoredWords:
+    """
+    Re-scores practice words (of one learner, or everyone) from the full word_observation history,
+    one learner per transaction.
+    """
+
+    _require_numpy()
+
+    with Session(get_db_engine()) as session:
+        if user_id is not None:
+            user_ids = [user_id]
+        else:
+            user_ids = session.scalars(
+                select(WordObservationORM.user_id).distinct().order_by(WordObservationORM.user_id)).all()
+
+    parts = []
+    for learner in user_ids:
+        with Session(get_db_engine()) as session:
+            parts.append(_rescore_user(session, learner, chunk_size))
+            session.commit()
+        struggle_rankings.invalidate(learner)
+
+    return RescoredWords.concatenate(parts)
@@ -0,0 +1,262 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from google.adk.tools import BaseTool, ToolContext
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from charla_facil.cache import TTLCache
+from charla_facil.spanish_filter import strip_accents
+from charla_facil.storage.db import get_async_db_engine, upsert
+from charla_facil.storage.orm_models import SearchCacheORM
+
+logger = logging.getLogger(__name__)
+
+NEWS = "news"
+SCHEDULE = "schedule"
+CULTURE = "culture"
+REFUSAL = "refusal"
+
+DEFAULT_TTLS = {
+    NEWS: 3600,
+    SCHEDULE: 24 * 3600,
+    CULTURE: 30 * 24 * 3600,
+    REFUSAL: 7 * 24 * 3600,
+}
+
+# Matched against normalized queries (lower case, no accents)
+_NEWS_TERMS = re.compile(
+    r"\b(noticias?|news|hoy|today|tonight|actualidad|actual|ultima hora|latest|current|esta semana|this week"
+    r"|este mes|this month|elecciones?|elections?|resultados?|clima|weather|pronostico)\b")
+_SCHEDULE_TERMS = re.compile(
+    r"\b(horarios?|hours|abre|abren|abierto|abierta|cierra|cierran|open|opening|closing|precios?|prices?"
+    r"|entradas|tickets?|billetes|cuesta|cost)\b")
+_YEAR = re.compile(r"\b(20\d\d)\b")
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case, accent, punctuation and whitespace insensitive form of a search request,
+    so "¿Qué es La Tomatina?" and "que es la tomatina" share a cache entry.
+    """
+
+    text = strip_accents(query.casefold())
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def classify_query(normalized: str, now: Optional[datetime] = None) -> str:
+    """News / current events, schedules (opening hours, prices) or cultural facts."""
+
+    if _NEWS_TERMS.search(normalized):
+        return NEWS
+    year = _YEAR.search(normalized)
+    if year and int(year.group(1)) >= (now or datetime.now()).year:
+        return NEWS
+    if _SCHEDULE_TERMS.search(normalized):
+        return SCHEDULE
+    return CULTURE
+
+
+def is_refusal(response: Any) -> bool:
+    text = response if isinstance(response, str) else json.dumps(response, ensure_ascii=False)
+    return "refusal:" in text.casefold()
+
+
+def _cacheable(response: Any) -> bool:
+    if not response:
+        return False
+    if isinstance(response, dict) and "error" in response:
+        # Tool errors are retried, refusals are final
+        return is_refusal(response)
+    return True
+
+
+@dataclass
+class SearchCacheStats:
+    memory_hits: int = 0
+    persistent_hits: int = 0
+    misses: int = 0
+    refusal_hits: int = 0
+    stores: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return (self.memory_hits + self.persistent_hits) / lookups if lookups else 0.0
+
+
+class SearchResultCache:
+    """
+    Cache of safe_web_search_agent results, used as before / after tool callbacks of the agent
+    calling it. Hits are returned without running the search agent (no model or search call).
+
+    Entries are keyed on the normalized request and a version of the search agent (model and
+    prompt). The TTL depends on the query: short for news, a day for opening hours and prices,
+    long for cultural facts. Refusals are cached too, so repeated off-topic requests are cheap.
+    An optional persistent tier (search_cache table) survives restarts.
+    """
+
+    def __init__(
+        self,
+        tool_name: str,
+        version: str,
+        max_size: int = 2000,
+        ttls: Optional[Dict[str, float]] = None,
+        persistent: bool = False,
+        enabled: bool = True,
+    ):
+        self.tool_name = tool_name
+        self.version = version
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.persistent = persistent
+        self.enabled = enabled
+        self._memory: TTLCache[str, Tuple[str, Any]] = TTLCache(max_size=max_size)
+        # Function calls answered from the cache, not stored again after the call
+        self._served: TTLCache[str, bool] = TTLCache(max_size=10_000, ttl=600)
+        self._stats = SearchCacheStats()
+
+    def key(self, query: str) -> str:
+        payload = f"{self.version}\0{normalize_query(query)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def stats(self) -> SearchCacheStats:
+        return SearchCacheStats(**vars(self._stats))
+
+    def clear(self) -> None:
+        self._memory.clear()
+
+    def _hit(self, category: str, response: Any, persistent: bool) -> Any:
+        if persistent:
+            self._stats.persistent_hits += 1
+        else:
+            self._stats.memory_hits += 1
+        if category == REFUSAL:
+            self._stats.refusal_hits += 1
+        return response
+
+    def _persistent_get(self, session: Session, key: str) -> Optional[Tuple[str, Any, float]]:
+        row = session.get(SearchCacheORM, key)
+        now = datetime.now()
+        if row is None or row.expires_at <= now:
+            return None
+        return row.category, row.response, (row.expires_at - now).total_seconds()
+
+    def _persistent_put(self, session: Session, key: str, query: str, category: str, response: Any) -> None:
+        now = datetime.now()
+        stmt = upsert(session, SearchCacheORM).values(
+            key=key, query=query, category=category, response=response,
+            expires_at=now + timedelta(seconds=self.ttls[category]))
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[SearchCacheORM.key],
+            set_={name: getattr(stmt.excluded, name) for name in ("query", "category", "response", "expires_at")},
+        ))
+        session.execute(delete(SearchCacheORM).where(SearchCacheORM.expires_at <= now))
+
+    async def get_async(self, query: str) -> Optional[Any]:
+        key = self.key(query)
+        entry = self._memory.get(key)
+        if entry is not None:
+            return self._hit(*entry, persistent=False)
+        if not self.persistent:
+            self._stats.misses += 1
+            return None
+
+        async with AsyncSession(get_async_db_engine()) as session:
+            found = await session.run_sync(self._persistent_get, key)
+        if found is None:
+            self._stats.misses += 1
+            return None
+        category, response, remaining = found
+        self._memory.set(key, (category, response), ttl=remaining)
+        return self._hit(category, response, persistent=True)
+
+    async def put_async(self, query: str, response: Any) -> Optional[str]:
+        """Stores a search result, returns its category (None when not cacheable)."""
+
+        if not _cacheable(response):
+            return None
+        category = REFUSAL if is_refusal(response) else classify_query(normalize_query(query))
+        key = self.key(query)
+        self._memory.set(key, (category, response), ttl=self.ttls[category])
+        self._stats.stores += 1
+
+        if self.persistent:
+            async with AsyncSession(get_async_db_engine()) as session:
+                await session.run_sync(self._persistent_put, key, query, category, response)
+                await session.commit()
+        return category
+
+    def _query(self, tool: BaseTool, args: Dict[str, Any]) -> Optional[str]:
+        if not self.enabled or tool.name != self.tool_name:
+            return None
+        query = args.get("request")
+        return query if isinstance(query, str) and query.strip() else None
+
+    async def before_tool_callback(self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext):
+        """ADK before_tool_callback, returns the cached result instead of running the search agent."""
+
+        query = self._query(tool, args)
+        if query is None:
+            return None
+        try:
+            response = await self.get_async(query)
+        except Exception as e:
+            logger.warning(f"Search cache lookup failed: {e}")
+            return None
+        if response is not None:
+            self._served.set(tool_context.function_call_id, True)
+        return response
+
+    async def after_tool_callback(
+        self, tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+    ) -> None:
+        """ADK after_tool_callback, stores the search agent result."""
+
+        query = self._query(tool, args)
+        if query is None:
+            return None
+        if self._served.get(tool_context.function_call_id):
+            self._served.invalidate(tool_context.function_call_id)
+            return None
+        try:
+            await self.put_async(query, tool_response)
+        except Exception as e:
+            logger.warning(f"Search cache store failed: {e}")
+        return None
+
+    def collect_metrics(self):
+        """Metrics collector (see MetricsRegistry.register_collector)."""
+
+        stats = self.stats()
+        yield ("charla_search_cache_lookups_total", "counter", "Web search cache lookups by result.", [
+            ({"result": "memory_hit"}, stats.memory_hits),
+            ({"result": "persistent_hit"}, stats.persistent_hits),
+            ({"result": "miss"}, stats.misses),
+        ])
+        yield ("charla_search_cache_refusal_hits_total", "counter", "Cached refusals served.",
+               [({}, stats.refusal_hits)])
+
+
+def create_search_cache(tool_name: str, *version_parts: str) -> SearchResultCache:
+    """Builds the search result cache configured from environment variables."""
+
+    version = hashlib.sha256("\0".join(version_parts).encode("utf-8")).hexdigest()
+    return SearchResultCache(
+        tool_name,
+        version,
+        max_size=int(os.getenv("SEARCH_CACHE_SIZE", "2000")),
+        ttls={
+            category: float(os.getenv(f"SEARCH_CACHE_TTL_{category.upper()}", str(ttl)))
+            for category, ttl in DEFAULT_TTLS.items()
+        },
+        persistent=os.getenv("SEARCH_CACHE_PERSIST", "false").lower() in ("1", "true", "yes"),
+        enabled=os.getenv("SEARCH_CACHE", "true").lower() in ("1", "true", "yes"),
+    )
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.tools import BaseTool, ToolContext
+
+from charla_facil.tools.practice_words import get_practice_words_async
+from charla_facil.tools.user_info import UserProfile, get_user_info_async, save_user_info
+
+logger = logging.getLogger(__name__)
+
+# Session state keys, filled before the first model call of a session (the struggle
+# words are refreshed on every turn)
+PROFILE_STATE_KEY = "user_profile"
+PRACTICE_WORDS_STATE_KEY = "practice_words"
+
+BOOTSTRAP_ENABLED = os.getenv("SESSION_BOOTSTRAP", "true").lower() in ("1", "true", "yes")
+BOOTSTRAP_EVENTS = int(os.getenv("SESSION_BOOTSTRAP_EVENTS", "10"))
+BOOTSTRAP_WORDS = int(os.getenv("SESSION_BOOTSTRAP_WORDS", "10"))
+
+# Dynamic instruction of the tutor, sent after the (cached) static prompt.
+# Placeholders are filled from session state by ADK, empty when not loaded.
+session_instruction = f"""### 📋 SESSION CONTEXT (preloaded)
+**User profile:** {{{PROFILE_STATE_KEY}?}}
+**Struggle words (hardest first, familiarity 0-100):** {{{PRACTICE_WORDS_STATE_KEY}?}}
+"""
+
+
+def format_profile(profile: UserProfile) -> str:
+    return profile.model_dump_json(exclude_none=True)
+
+
+def format_practice_words(words: List[Dict[str, Any]]) -> str:
+    if not words:
+        return "none yet"
+    return ", ".join(f"{w['word']} ({w['familiarity_level']})" for w in words)
+
+
+async def _refresh_practice_words(callback_context: CallbackContext) -> None:
+    try:
+        # Served from the struggle ranking cache, updated by every rating
+        words = format_practice_words(await get_practice_words_async(BOOTSTRAP_WORDS, callback_context))
+    except Exception as e:
+        logger.warning(f"Preloaded struggle words refresh failed: {e}")
+        return
+    if callback_context.state.get(PRACTICE_WORDS_STATE_KEY) != words:
+        callback_context.state[PRACTICE_WORDS_STATE_KEY] = words
+
+
+async def bootstrap_session_callback(callback_context: CallbackContext) -> None:
+    """
+    ADK before_agent_callback, loads the user profile and struggle words in parallel into
+    session state on the first turn, so the model does not spend round trips on tool calls
+    before greeting. On failure the state is left empty and the model calls the tools.
+
+    Later turns only refresh the struggle words, which change with the ratings of the
+    previous messages.
+    """
+
+    if not BOOTSTRAP_ENABLED:
+        return None
+    if PROFILE_STATE_KEY in callback_context.state:
+        await _refresh_practice_words(callback_context)
+        return None
+
+    try:
+        profile, words = await asyncio.gather(
+            get_user_info_async(BOOTSTRAP_EVENTS, callback_context),
+            get_practice_words_async(BOOTSTRAP_WORDS, callback_context),
+        )
+    except Exception as e:
+        logger.warning(f"Session bootstrap failed: {e}")
+        return None
+
+    callback_context.state[PROFILE_STATE_KEY] = format_profile(profile)
+    callback_context.state[PRACTICE_WORDS_STATE_KEY] = format_practice_words(words)
+    return None
+
+
+async def refresh_profile_callback(
+    tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext, tool_response: Any
+) -> None:
+    """ADK after_tool_callback, keeps the preloaded profile current after `save_user_info`."""
+
+    if tool.name != save_user_info.__name__ or PROFILE_STATE_KEY not in tool_context.state:
+        return None
+
+    try:
+        # Served from the profile cache, updated by the save
+        profile = await get_user_info_async(BOOTSTRAP_EVENTS, tool_context)
+    except Exception as e:
+        logger.warning(f"Preloaded profile refresh failed: {e}")
+        return None
+    tool_context.state[PROFILE_STATE_KEY] = format_profile(profile)
+    return None
@@ -0,0 +1,126 @@
+import logging
+import os
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from importlib import resources
+from typing import FrozenSet, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Characters that (for a Spanish learner writing in English or Spanish) only show up in Spanish
+SPANISH_CHARS = frozenset("ñáéíóúü¿¡")
+
+# Endings of inflected / derived words missing from the lexicon (checked without accents)
+SPANISH_SUFFIXES = ("cion", "ciones", "mente", "iendo", "amos", "emos", "imos",
+                    "aron", "ieron", "aban", "ibamos", "idad", "idades", "ito", "ita")
+
+MIN_SUFFIX_TOKEN_LENGTH = 6
+
+_URL_RE = re.compile(r"(?:https?://|www\.)\S+|\S+@\S+\.\S+", re.IGNORECASE)
+_TOKEN_RE = re.compile(r"[^\W\d_]+")
+
+
+def strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def load_lexicon(path: Optional[str] = None) -> FrozenSet[str]:
+    """
+    Loads a word list (one word per line, `#` comments) as accent-stripped lowercase words.
+    Defaults to the lexicon packaged in `charla_facil/data`.
+    """
+
+    if path is None:
+        text = resources.files("charla_facil").joinpath("data", "spanish_lexicon.txt").read_text("utf-8")
+    else:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+
+    return frozenset(
+        strip_accents(line.strip().casefold())
+        for line in text.splitlines()
+        if line.strip() and not line.lstrip().startswith("#")
+    )
+
+
+@dataclass
+class SpanishFilterStats:
+    checked: int = 0
+    skipped: int = 0
+
+    @property
+    def skip_rate(self) -> float:
+        return self.skipped / self.checked if self.checked else 0.0
+
+
+class SpanishFilter:
+    """
+    Local check whether a message contains any Spanish worth grading.
+
+    A token counts as Spanish when it has Spanish-only characters (ñ, accents, ¿ ¡), is in
+    the lexicon, or ends with a typical Spanish suffix. URLs, e-mails, numbers and emoji
+    are ignored. Messages with fewer than `min_tokens` Spanish tokens are skipped.
+    """
+
+    def __init__(self, lexicon: Iterable[str], min_tokens: int = 1, enabled: bool = True):
+        self.lexicon = frozenset(lexicon)
+        self.min_tokens = min_tokens
+        self.enabled = enabled
+        self._stats = SpanishFilterStats()
+        self._lock = threading.Lock()
+
+    def is_spanish_token(self, token: str) -> bool:
+        if any(c in SPANISH_CHARS for c in token):
+            return True
+        if len(token) < 2:
+            return False
+
+        plain = token if token.isascii() else strip_accents(token)
+        if plain in self.lexicon:
+            return True
+        return len(plain) >= MIN_SUFFIX_TOKEN_LENGTH and plain.endswith(SPANISH_SUFFIXES)
+
+    def spanish_tokens(self, message: str) -> int:
+        text = _URL_RE.sub(" ", message.casefold())
+        if any(c in text for c in "¿¡"):
+            return max(1, self.min_tokens)
+
+        found = 0
+        for token in _TOKEN_RE.findall(text):
+            if self.is_spanish_token(token):
+                found += 1
+                if found >= self.min_tokens:
+                    break
+        return found
+
+    def should_rate(self, message: str) -> bool:
+        """Returns False when the message can be skipped without calling the rating model."""
+
+        if not self.enabled:
+            return True
+
+        rate = self.spanish_tokens(message) >= self.min_tokens
+        with self._lock:
+            self._stats.checked += 1
+            if not rate:
+                self._stats.skipped += 1
+        if not rate:
+            logger.debug("Skipping rating of a message without Spanish words")
+        return rate
+
+    def stats(self) -> SpanishFilterStats:
+        with self._lock:
+            return SpanishFilterStats(**vars(self._stats))
+
+
+def create_spanish_filter() -> SpanishFilter:
+    """Builds the Spanish pre-filter configured from environment variables."""
+
+    return SpanishFilter(
+        load_lexicon(os.getenv("SPANISH_FILTER_LEXICON") or None),
+        min_tokens=int(os.getenv("SPANISH_FILTER_MIN_TOKENS", "1")),
+        enabled=os.getenv("SPANISH_FILTER", "true").lower() in ("1", "true", "yes"),
+    )
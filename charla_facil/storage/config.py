@@ -0,0 +1,168 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# Async drivers used when DB_ASYNC_URL is not set (psycopg 3 has sync and async modes)
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+psycopg"}
+_SYNC_DRIVERS = {"postgresql": "postgresql+psycopg"}
+
+_BEGIN_MODES = ("deferred", "immediate")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+@dataclass
+class DatabaseConfig:
+    """
+    Database connection settings. SQLite is the tested backend; other SQLAlchemy URLs
+    (e.g. PostgreSQL, which has its own upsert statements) are not covered by the test suite.
+
+    SQLite connections get `sqlite_pragmas` on connect (WAL journal, NORMAL sync, busy timeout,
+    memory mapped I/O and page cache size), so concurrent writers wait for the lock instead of
+    failing with "database is locked". `sqlite_begin="immediate"` takes the write lock when a
+    transaction starts, which avoids failed read -> write lock upgrades under heavy writes.
+    Pool settings left as None keep the SQLAlchemy defaults of the dialect.
+    """
+
+    url: str = "sqlite:///default.db"
+    async_url: Optional[str] = None
+    echo: bool = False
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    pool_timeout: Optional[int] = None
+    pool_recycle: Optional[int] = None
+    pool_pre_ping: Optional[bool] = None
+    sqlite_pragmas: Dict[str, str] = field(default_factory=lambda: {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": "5000",
+        "mmap_size": "268435456",
+        "cache_size": "-65536",
+    })
+    sqlite_begin: str = "deferred"
+
+    @classmethod
+    def from_env(cls) -> "DatabaseConfig":
+        """
+        DB_URL (or DB_PATH for a SQLite file), DB_ASYNC_URL, DB_ECHO, DB_POOL_SIZE,
+        DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING and the
+        SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE,
+        SQLITE_CACHE_SIZE, SQLITE_BEGIN environment variables.
+        """
+
+        pragmas = cls().sqlite_pragmas
+        for pragma, variable in (
+            ("journal_mode", "SQLITE_JOURNAL_MODE"),
+            ("synchronous", "SQLITE_SYNCHRONOUS"),
+            ("busy_timeout", "SQLITE_BUSY_TIMEOUT_MS"),
+            ("mmap_size", "SQLITE_MMAP_SIZE"),
+            ("cache_size", "SQLITE_CACHE_SIZE"),
+        ):
+            value = os.getenv(variable)
+            if value is not None:
+                # An empty value keeps the SQLite default
+                if value:
+                    pragmas[pragma] = value
+                else:
+                    pragmas.pop(pragma)
+
+        pre_ping = os.getenv("DB_POOL_PRE_PING")
+        return cls(
+            url=os.getenv("DB_URL") or f"sqlite:///{os.getenv('DB_PATH', 'default.db')}",
+            async_url=os.getenv("DB_ASYNC_URL") or None,
+            echo=_env_bool("DB_ECHO", False),
+            pool_size=_env_int("DB_POOL_SIZE"),
+            max_overflow=_env_int("DB_MAX_OVERFLOW"),
+            pool_timeout=_env_int("DB_POOL_TIMEOUT"),
+            pool_recycle=_env_int("DB_POOL_RECYCLE"),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", False) if pre_ping else None,
+            sqlite_pragmas=pragmas,
+            sqlite_begin=os.getenv("SQLITE_BEGIN", "deferred").lower(),
+        )
+
+    def __post_init__(self):
+        if self.sqlite_begin not in _BEGIN_MODES:
+            raise ValueError(f"SQLITE_BEGIN must be one of {_BEGIN_MODES}, got {self.sqlite_begin!r}")
+
+    @property
+    def backend(self) -> str:
+        return make_url(self.url).get_backend_name()
+
+    @property
+    def is_memory(self) -> bool:
+        return self.backend == "sqlite" and make_url(self.url).database in (None, "", ":memory:")
+
+    def sync_url(self) -> str:
+        url = make_url(self.url)
+        if url.drivername in _SYNC_DRIVERS:
+            url = url.set(drivername=_SYNC_DRIVERS[url.drivername])
+        return url.render_as_string(hide_password=False)
+
+    def get_async_url(self) -> str:
+        if self.async_url:
+            return self.async_url
+        url = make_url(self.url)
+        driver = _ASYNC_DRIVERS.get(url.get_backend_name())
+        if driver is None:
+            raise ValueError(f"No async driver known for {url.drivername}, set DB_ASYNC_URL.")
+        return url.set(drivername=driver).render_as_string(hide_password=False)
+
+    def engine_kwargs(self) -> dict:
+        kwargs = {"echo": self.echo}
+        # In-memory SQLite uses a single connection pool without sizing
+        if not self.is_memory:
+            for name in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle"):
+                value = getattr(self, name)
+                if value is not None:
+                    kwargs[name] = value
+        if self.pool_pre_ping is not None:
+            kwargs["pool_pre_ping"] = self.pool_pre_ping
+        elif self.backend != "sqlite":
+            # Server connections can be dropped while idle in the pool
+            kwargs["pool_pre_ping"] = True
+        return kwargs
+
+    def configure(self, engine: Engine) -> Engine:
+        """Registers the connect-time SQLite settings on a (sync or async.sync_engine) engine."""
+
+        if engine.dialect.name != "sqlite":
+            return engine
+
+        pragmas = dict(self.sqlite_pragmas)
+        if self.is_memory:
+            # WAL and mmap do not apply to in-memory databases
+            pragmas.pop("journal_mode", None)
+            pragmas.pop("mmap_size", None)
+        immediate = self.sqlite_begin == "immediate"
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            if immediate:
+                # Transactions are started by the "begin" listener below
+                dbapi_connection.isolation_level = None
+            cursor = dbapi_connection.cursor()
+            try:
+                for pragma, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {pragma}={value}")
+            finally:
+                cursor.close()
+
+        if immediate:
+            @event.listens_for(engine, "begin")
+            def _on_begin(connection):
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+        return engine
@@ -1,23 +1,79 @@
-import os
-from sqlalchemy import select, create_engine
-from sqlalchemy.orm import Session
+import threading
 
-from charla_facil.storage.orm_models import Base, UserProfileORM
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
 
-DB_PATH = os.getenv("DB_PATH", "default.db")
-_db = create_engine(f"sqlite:///{DB_PATH}", echo=False)
+from charla_facil.instrumentation import instrument_sqlalchemy
+from charla_facil.storage.config import DatabaseConfig
+from charla_facil.storage.migrations import upgrade_schema
+from charla_facil.storage.orm_models import Base
 
-# Create schema if missing
-if not os.path.exists(DB_PATH):
-    Base.metadata.create_all(_db)
+# Statement and transaction timings of every engine (see /metrics)
+instrument_sqlalchemy()
 
+# DB_URL / DB_PATH, pool and SQLite pragma settings (see DatabaseConfig)
+config = DatabaseConfig.from_env()
 
-# Ensure a single profile row exists for default user
-with Session(_db) as session:
-    if not session.scalar(select(UserProfileORM)):
-        session.add(UserProfileORM(id=1))
-        session.commit()
+_db = None
+_async_db = None
+_lock = threading.Lock()
 
 
 def get_db_engine():
+    """
+    Engine of the configured database, created on first use. Tables of an older schema
+    are upgraded (see storage.migrations), missing tables are created.
+    """
+
+    global _db
+    if _db is None:
+        with _lock:
+            if _db is None:
+                engine = config.configure(create_engine(config.sync_url(), **config.engine_kwargs()))
+                upgrade_schema(engine)
+                Base.metadata.create_all(engine)
+                _db = engine
     return _db
+
+
+def get_async_db_engine():
+    """
+    Async engine (aiosqlite, psycopg) over the same database, created on first use.
+    """
+
+    global _async_db
+    if _async_db is None:
+        # Schema is created with the sync engine
+        get_db_engine()
+        with _lock:
+            if _async_db is None:
+                engine = create_async_engine(config.get_async_url(), **config.engine_kwargs())
+                config.configure(engine.sync_engine)
+                _async_db = engine
+    return _async_db
+
+
+async def dispose_engines() -> None:
+    """Closes the pooled connections (server shutdown), engines are recreated on next use."""
+
+    global _db, _async_db
+    with _lock:
+        db, async_db = _db, _async_db
+        _db = _async_db = None
+    if async_db is not None:
+        await async_db.dispose()
+    if db is not None:
+        db.dispose()
+
+
+def upsert(session: Session, model):
+    """
+    Returns a dialect specific INSERT statement for the given model, so callers can
+    use native `ON CONFLICT DO UPDATE / DO NOTHING` clauses.
+    """
+
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
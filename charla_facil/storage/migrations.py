@@ -0,0 +1,157 @@
+"""
+In-place upgrades of databases created with an earlier version of the schema.
+
+`Base.metadata.create_all` only adds missing tables, so changed tables are rebuilt or
+altered here. Every step inspects the live schema first, which makes the upgrade
+idempotent; it runs when the engine is created (see get_db_engine).
+"""
+
+import logging
+from typing import Dict, List
+
+from sqlalchemy import Integer, bindparam, inspect, select, text, tuple_, update
+from sqlalchemy.engine import Connection, Engine
+
+from charla_facil.storage.orm_models import Base, PracticeWordORM
+from charla_facil.util import DEFAULT_USER_ID
+
+logger = logging.getLogger(__name__)
+
+# Profile row seeded by the single-user schema, owned by DEFAULT_USER_ID after the upgrade
+LEGACY_PROFILE_ID = 1
+
+
+def _tables(connection: Connection) -> set:
+    return set(inspect(connection).get_table_names())
+
+
+def _columns(connection: Connection, table: str) -> Dict[str, dict]:
+    return {column["name"]: column for column in inspect(connection).get_columns(table)}
+
+
+def _rebuild(connection: Connection, tables: List[str], copies: List[str], **params) -> None:
+    """
+    Renames the tables, creates them with the current schema and copies the rows over
+    with the given INSERT ... SELECT statements (reading from `<table>_old`).
+    """
+
+    for table in tables:
+        connection.execute(text(f"ALTER TABLE {table} RENAME TO {table}_old"))
+    for table in tables:
+        Base.metadata.tables[table].create(connection)
+    for copy in copies:
+        connection.execute(text(copy), params)
+    # Children first, they reference the old parent tables
+    for table in reversed(tables):
+        connection.execute(text(f"DROP TABLE {table}_old"))
+
+
+def _scope_to_user_id(connection: Connection) -> bool:
+    """profiles keyed by the ADK user id, practice words by (user_id, word)"""
+
+    tables = _tables(connection)
+    upgraded = False
+
+    if "user_profile" in tables and isinstance(_columns(connection, "user_profile")["id"]["type"], Integer):
+        def owner(column):
+            return f"CASE WHEN {column} = :legacy_id THEN :user_id ELSE CAST({column} AS VARCHAR) END"
+
+        rebuilt = [t for t in ("user_profile", "user_interest", "user_event") if t in tables]
+        copies = {
+            "user_profile": (
+                f"INSERT INTO user_profile (id, cefr_level, name, nationality, age, place_of_living) "
+                f"SELECT {owner('id')}, cefr_level, name, nationality, age, place_of_living FROM user_profile_old"),
+            "user_interest": (
+                f"INSERT INTO user_interest (id, user_id, interest) "
+                f"SELECT id, {owner('user_id')}, interest FROM user_interest_old WHERE user_id IS NOT NULL"),
+            "user_event": (
+                f"INSERT INTO user_event (id, user_id, name, date) "
+                f"SELECT id, {owner('user_id')}, name, date FROM user_event_old WHERE user_id IS NOT NULL"),
+        }
+        _rebuild(connection, rebuilt, [copies[t] for t in rebuilt],
+                 legacy_id=LEGACY_PROFILE_ID, user_id=DEFAULT_USER_ID)
+        upgraded = True
+
+    if "practice_word" in tables and "user_id" not in _columns(connection, "practice_word"):
+        # No schedule yet, the words are due right away
+        _rebuild(connection, ["practice_word"], [
+            "INSERT INTO practice_word (user_id, word, familiarity_level, last_used, "
+            "correct_streak_count, update_count, next_due_at) "
+            "SELECT :user_id, word, familiarity_level, last_used, correct_streak_count, update_count, last_used "
+            "FROM practice_word_old"
+        ], user_id=DEFAULT_USER_ID)
+        upgraded = True
+
+    return upgraded
+
+
+def _schedule_practice_words(connection: Connection) -> bool:
+    """practice words scheduled with an indexed next_due_at column"""
+
+    if "practice_word" not in _tables(connection) or "next_due_at" in _columns(connection, "practice_word"):
+        return False
+
+    from charla_facil.tools.practice_words import review_interval
+
+    table = PracticeWordORM.__table__
+    column_type = table.c.next_due_at.type.compile(connection.dialect)
+    # Nullable in the altered table, every write sets it
+    connection.execute(text(f"ALTER TABLE practice_word ADD COLUMN next_due_at {column_type}"))
+
+    # Same schedule as the next write would compute from the stored state, in key order chunks
+    schedule = (
+        update(table)
+        .where(table.c.user_id == bindparam("b_user_id"), table.c.word == bindparam("b_word"))
+        .values(next_due_at=bindparam("b_next_due_at"))
+    )
+    last_key = None
+    while True:
+        query = select(table.c.user_id, table.c.word, table.c.familiarity_level,
+                       table.c.correct_streak_count, table.c.last_used)
+        if last_key is not None:
+            query = query.where(tuple_(table.c.user_id, table.c.word) > last_key)
+        chunk = connection.execute(query.order_by(table.c.user_id, table.c.word).limit(5000)).all()
+        if not chunk:
+            break
+        connection.execute(schedule, [
+            {"b_user_id": user_id, "b_word": word,
+             "b_next_due_at": last_used + review_interval(familiarity, streak)}
+            for user_id, word, familiarity, streak, last_used in chunk
+        ])
+        last_key = tuple(chunk[-1][:2])
+
+    # The struggle index covers next_due_at now
+    for index in table.indexes:
+        if index.name in ("ix_practice_word_struggle", "ix_practice_word_due"):
+            index.drop(connection, checkfirst=True)
+            index.create(connection)
+    return True
+
+
+def _compaction_mark_per_user(connection: Connection) -> bool:
+    """compaction high-water marks kept per learner"""
+
+    tables = _tables(connection)
+    if "compaction_state" not in tables or "user_id" in _columns(connection, "compaction_state"):
+        return False
+
+    # Everything up to the global mark is folded, so is every learner's log up to it
+    _rebuild(connection, ["compaction_state"], [
+        "INSERT INTO compaction_state (user_id, last_observation_id) "
+        "SELECT o.user_id, MAX(o.id) FROM word_observation o, compaction_state_old c "
+        "WHERE c.name = :name AND o.id <= c.last_observation_id GROUP BY o.user_id"
+    ] if "word_observation" in tables else [], name="practice_word")
+    return True
+
+
+# Applied in order, each returns whether it changed the schema
+UPGRADES = [_scope_to_user_id, _schedule_practice_words, _compaction_mark_per_user]
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Brings the tables of an existing database up to the current schema (single transaction)."""
+
+    with engine.begin() as connection:
+        for upgrade in UPGRADES:
+            if upgrade(connection):
+                logger.warning(f"Upgraded the database schema: {upgrade.__doc__}")
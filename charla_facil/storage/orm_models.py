@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import CheckConstraint, DateTime, UniqueConstraint, Column, Integer, String, ForeignKey
+from sqlalchemy import CheckConstraint, DateTime, Index, JSON, UniqueConstraint, Column, Integer, String, ForeignKey
 from sqlalchemy.orm import declarative_base, relationship
 
 
@@ -14,7 +14,8 @@ Base = declarative_base()
 class UserProfileORM(Base):
     __tablename__ = "user_profile"
 
-    id = Column(Integer, primary_key=True)
+    # ADK user id
+    id = Column(String, primary_key=True)
     cefr_level = Column(String, nullable=True)
     name = Column(String, nullable=True)
     nationality = Column(String, nullable=True)
@@ -22,7 +23,7 @@ class UserProfileORM(Base):
     place_of_living = Column(String, nullable=True)
 
     # Relationships (interests + events)
-    interests = relationship("UserInterestORM", cascade="all, delete-orphan")
+    interests = relationship("UserInterestORM", cascade="all, delete-orphan", order_by="UserInterestORM.id")
     events = relationship("UserEventORM", cascade="all, delete-orphan")
 
 
@@ -30,7 +31,7 @@ class UserInterestORM(Base):
     __tablename__ = "user_interest"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("user_profile.id"))
+    user_id = Column(String, ForeignKey("user_profile.id"), nullable=False, index=True)
     interest = Column(String, nullable=False)
 
 
@@ -38,12 +39,14 @@ class UserEventORM(Base):
     __tablename__ = "user_event"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("user_profile.id"))
+    user_id = Column(String, ForeignKey("user_profile.id"), nullable=False)
     name = Column(String, nullable=False)
     date = Column(String, nullable=False)
 
     __table_args__ = (
         UniqueConstraint("user_id", "name", "date", name="uq_user_event"),
+        # Matches the "most recent events first" query of get_user_info
+        Index("ix_user_event_recent", "user_id", "date", "id"),
     )
 
 
@@ -55,13 +58,95 @@ class UserEventORM(Base):
 class PracticeWordORM(Base):
     __tablename__ = "practice_word"
 
+    user_id = Column(String, primary_key=True)
     word = Column(String, primary_key=True)
     familiarity_level = Column(Integer, nullable=False, default=0)
     last_used = Column(DateTime, nullable=False, default=datetime.now)
     correct_streak_count = Column(Integer, nullable=False, default=0)
     update_count = Column(Integer, nullable=False, default=0)
+    # Spaced repetition schedule (see review_interval in tools/practice_words.py)
+    next_due_at = Column(DateTime, nullable=False, default=datetime.now)
 
     __table_args__ = (
         CheckConstraint('familiarity_level >= 0 AND familiarity_level <= 100',
                         name='ck_familiarity_level_range'),
+        # Covering index for the get_practice_words "struggle" ordering (index-only scan per user)
+        Index("ix_practice_word_struggle", "user_id", "familiarity_level",
+              "update_count", "last_used", "word", "correct_streak_count", "next_due_at"),
+        # "Due now" range scans of get_due_practice_words
+        Index("ix_practice_word_due", "user_id", "next_due_at"),
+    )
+
+
+# ============================================================
+#  Word Observation Log Models
+# ============================================================
+
+
+class WordObservationORM(Base):
+    """Append-only log of every word rating, folded into practice_word by compaction."""
+    __tablename__ = "word_observation"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String, nullable=False)
+    word = Column(String, nullable=False)
+    correctness = Column(Integer, nullable=False)
+    source = Column(String, nullable=False, default="chat")
+    observed_at = Column(DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (
+        # Per learner history (analytics, re-scoring)
+        Index("ix_word_observation_user", "user_id", "id"),
+    )
+
+
+class CompactionStateORM(Base):
+    """Per learner high-water mark (last folded word_observation.id) of the log compaction."""
+    __tablename__ = "compaction_state"
+
+    user_id = Column(String, primary_key=True)
+    last_observation_id = Column(Integer, nullable=False, default=0)
+
+
+# ============================================================
+#  Cache Models
+# ============================================================
+
+
+class RatingCacheORM(Base):
+    """Persistent tier of the rate_word_use result cache."""
+    __tablename__ = "rating_cache"
+
+    key = Column(String, primary_key=True)
+    updates = Column(JSON, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class SearchCacheORM(Base):
+    """Persistent tier of the safe_web_search_agent result cache."""
+    __tablename__ = "search_cache"
+
+    key = Column(String, primary_key=True)
+    query = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    response = Column(JSON, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+
+class QuizBankORM(Base):
+    """Precomputed QuizBatch objects per learner and topic, consumed once."""
+    __tablename__ = "quiz_bank"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String, nullable=False)
+    topic = Column(String, nullable=False)
+    # Struggle words the quiz was generated from (empty for other topics)
+    fingerprint = Column(String, nullable=False, default="")
+    quiz = Column(JSON, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    consumed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Oldest available quiz of a learner and topic
+        Index("ix_quiz_bank_available", "user_id", "topic", "consumed_at", "id"),
     )
@@ -0,0 +1,180 @@
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from charla_facil.cache import TTLCache
+
+# Fields of a ranked practice word (same as PracticeWordSchema)
+RANKED_FIELDS = ("word", "familiarity_level", "last_used",
+                 "correct_streak_count", "update_count", "next_due_at")
+
+
+def struggle_key(row: dict) -> Tuple:
+    """Sort key of the "hardest first" ordering used by get_practice_words."""
+    return (row["familiarity_level"], row["update_count"], row["last_used"], row["word"])
+
+
+class StruggleRanking:
+    """
+    Practice words of a single learner kept sorted by struggle key.
+    Top-N lookups are a slice, updates are O(log n) searches plus a list insert.
+    """
+
+    def __init__(self, rows: Iterable[dict] = ()):
+        self._rows: Dict[str, dict] = {}
+        for row in rows:
+            self._rows[row["word"]] = {f: row[f] for f in RANKED_FIELDS}
+        self._keys: List[Tuple] = sorted(struggle_key(r) for r in self._rows.values())
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def top(self, count: int) -> List[dict]:
+        return [dict(self._rows[key[-1]]) for key in self._keys[:max(0, count)]]
+
+    def upsert(self, row: dict) -> None:
+        old = self._rows.get(row["word"])
+        if old is not None:
+            del self._keys[bisect_left(self._keys, struggle_key(old))]
+
+        new = {f: row[f] for f in RANKED_FIELDS}
+        self._rows[new["word"]] = new
+        insort(self._keys, struggle_key(new))
+
+    def remove(self, word: str) -> None:
+        old = self._rows.pop(word, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, struggle_key(old))]
+
+
+# Write counters are striped by user id, a collision only drops a warm-up
+_WRITE_STRIPES = 1024
+
+
+class StruggleRankingCache:
+    """
+    Per-learner StruggleRanking instances with LRU eviction.
+
+    Memory is bounded by the total number of cached words (max_words). Rankings older
+    than ttl seconds are reloaded, so writes made by other processes are picked up.
+    Learners with more than max_words words are remembered for ttl seconds and not loaded.
+
+    Rankings are loaded off the request path (begin_warm / finish_warm): the write counter
+    taken when a load starts is compared when it finishes, so a load that raced a write
+    is dropped instead of caching a stale ranking.
+    """
+
+    def __init__(self, max_words: int = 200_000, ttl: Optional[float] = 300.0):
+        self.max_words = max_words
+        self.ttl = ttl
+        self._rankings: "OrderedDict[str, StruggleRanking]" = OrderedDict()
+        self._words = 0
+        self._writes = [0] * _WRITE_STRIPES
+        self._warming: set = set()
+        self._oversized: TTLCache[str, bool] = TTLCache(max_size=10_000, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[StruggleRanking]:
+        with self._lock:
+            ranking = self._rankings.get(user_id)
+            if ranking is None:
+                return None
+            if self.ttl is not None and time.monotonic() - ranking.loaded_at > self.ttl:
+                self._drop(user_id)
+                return None
+            self._rankings.move_to_end(user_id)
+            return ranking
+
+    def begin_warm(self, user_id: str) -> Optional[int]:
+        """
+        Marks a ranking load of the user as started.
+
+        Returns:
+            The write counter to pass to finish_warm, None when the ranking is cached,
+            already loading or too large to cache.
+        """
+
+        if self.get(user_id) is not None or self._oversized.get(user_id):
+            return None
+        with self._lock:
+            if user_id in self._warming:
+                return None
+            self._warming.add(user_id)
+            return self._writes[self._stripe(user_id)]
+
+    def finish_warm(self, user_id: str, rows: Optional[List[dict]], writes: int) -> None:
+        """Caches the loaded rows (None when the load failed) unless a write happened meanwhile."""
+
+        try:
+            if rows is None:
+                return
+            if len(rows) > self.max_words:
+                # Too large to keep in memory, reads go to the database
+                self._oversized.set(user_id, True)
+                return
+            with self._lock:
+                stale = writes != self._writes[self._stripe(user_id)]
+            if not stale:
+                self.put(user_id, StruggleRanking(rows))
+        finally:
+            with self._lock:
+                self._warming.discard(user_id)
+
+    def put(self, user_id: str, ranking: StruggleRanking) -> None:
+        with self._lock:
+            self._drop(user_id)
+            if len(ranking) > self.max_words:
+                # Too large to keep in memory, reads go to the database
+                self._oversized.set(user_id, True)
+                return
+
+            self._rankings[user_id] = ranking
+            self._words += len(ranking)
+            while self._words > self.max_words:
+                self._drop(next(iter(self._rankings)))
+
+    def apply(self, user_id: str, rows: Iterable[dict]) -> None:
+        """Applies committed writes to the cached ranking of the user (if loaded)."""
+
+        with self._lock:
+            self._writes[self._stripe(user_id)] += 1
+            ranking = self._rankings.get(user_id)
+            if ranking is None:
+                return
+            before = len(ranking)
+            for row in rows:
+                ranking.upsert(row)
+            self._words += len(ranking) - before
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._writes[self._stripe(user_id)] += 1
+            self._drop(user_id)
+        self._oversized.invalidate(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            # Loads in flight are dropped
+            self._writes = [count + 1 for count in self._writes]
+            self._rankings.clear()
+            self._words = 0
+        self._oversized.clear()
+
+    @staticmethod
+    def _stripe(user_id: str) -> int:
+        return hash(user_id) % _WRITE_STRIPES
+
+    def _drop(self, user_id: str) -> None:
+        ranking = self._rankings.pop(user_id, None)
+        if ranking is not None:
+            self._words -= len(ranking)
+
+
+struggle_rankings = StruggleRankingCache(
+    max_words=int(os.getenv("STRUGGLE_CACHE_MAX_WORDS", "200000")),
+    ttl=float(os.getenv("STRUGGLE_CACHE_TTL", "300")),
+)
@@ -1,10 +1,25 @@
-from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
-from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
-from mcp import StdioServerParameters
+import asyncio
+import logging
+import os
 from pathlib import Path
 
-google_calendar_mcp = McpToolset(
-    connection_params=StdioConnectionParams(
+from charla_facil.metrics import registry
+from charla_facil.tools.mcp.lazy_toolset import LazyToolset
+
+logger = logging.getLogger(__name__)
+
+# Pre-started server processes (0 = one process started on the first tool call, not pooled)
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "1"))
+
+
+def _create_google_calendar_mcp():
+    from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+    from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+    from mcp import StdioServerParameters
+
+    from charla_facil.tools.mcp.process_pool import PooledMcpToolset
+
+    connection_params = StdioConnectionParams(
         server_params=StdioServerParameters(
             command="npx",
             args=[
@@ -17,4 +32,49 @@ google_calendar_mcp = McpToolset(
         ),
         timeout=30,
     )
-)
+
+    if MCP_POOL_SIZE > 0:
+        return PooledMcpToolset(
+            connection_params=connection_params,
+            pool_size=MCP_POOL_SIZE,
+            health_interval=float(os.getenv("MCP_HEALTH_INTERVAL", "30")),
+        )
+    return McpToolset(connection_params=connection_params)
+
+
+# MCP libraries are imported and the server configured on the first turn (or by `warm_up`)
+google_calendar_mcp = LazyToolset(_create_google_calendar_mcp)
+
+
+async def warm_up() -> None:
+    """
+    Starts the calendar MCP server processes ahead of the first tool call (server startup),
+    unless MCP_POOL_WARM=false. Failures are logged, the pool retries on the first call.
+    """
+
+    if MCP_POOL_SIZE <= 0 or os.getenv("MCP_POOL_WARM", "true").lower() not in ("1", "true", "yes"):
+        return
+    try:
+        # npx resolution and Node startup take seconds, the import of the MCP client is blocking
+        toolset = await asyncio.to_thread(google_calendar_mcp.get_toolset)
+        await toolset.start()
+        logger.info(f"Calendar MCP pool ready: {toolset.pool.stats()}")
+    except Exception as e:
+        logger.warning(f"Calendar MCP warm-up failed: {e}")
+
+
+def _collect_mcp_metrics():
+    if not google_calendar_mcp.initialized or not hasattr(google_calendar_mcp.get_toolset(), "pool"):
+        return
+    stats = google_calendar_mcp.get_toolset().pool.stats()
+    yield ("charla_mcp_pool_ready", "gauge", "Calendar MCP server processes ready.",
+           [({}, stats.ready)])
+    yield ("charla_mcp_pool_events_total", "counter", "Calendar MCP process pool events.", [
+        ({"event": "start"}, stats.starts),
+        ({"event": "restart"}, stats.restarts),
+        ({"event": "failure"}, stats.failures),
+        ({"event": "session"}, stats.sessions),
+    ])
+
+
+registry.register_collector(_collect_mcp_metrics)
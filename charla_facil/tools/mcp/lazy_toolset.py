@@ -0,0 +1,52 @@
+import threading
+from typing import Callable, List, Optional
+
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools import BaseTool
+from google.adk.tools.base_toolset import BaseToolset
+
+
+class LazyToolset(BaseToolset):
+    """
+    Toolset created by `factory` when its tools are first requested, so the (MCP) client
+    libraries are imported and the toolset configured on the first turn instead of at startup.
+    """
+
+    def __init__(self, factory: Callable[[], BaseToolset]):
+        super().__init__()
+        self._factory = factory
+        self._toolset: Optional[BaseToolset] = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._toolset is not None
+
+    def get_toolset(self) -> BaseToolset:
+        if self._toolset is None:
+            with self._lock:
+                if self._toolset is None:
+                    self._toolset = self._factory()
+        return self._toolset
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> List[BaseTool]:
+        return await self.get_toolset().get_tools_with_prefix(readonly_context)
+
+    async def process_llm_request(self, *, tool_context, llm_request) -> None:
+        await self.get_toolset().process_llm_request(tool_context=tool_context, llm_request=llm_request)
+
+    def __getstate__(self):
+        # Pickled (deployment) toolsets are created again on first use
+        state = self.__dict__.copy()
+        state["_toolset"] = None
+        state.pop("_lock", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    async def close(self) -> None:
+        # Never started toolsets have nothing to release
+        if self._toolset is not None:
+            await self._toolset.close()
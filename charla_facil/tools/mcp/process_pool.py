@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import sys
+from dataclasses import dataclass
+from typing import List, Optional
+
+from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class McpPoolStats:
+    size: int = 0
+    ready: int = 0
+    sessions: int = 0
+    starts: int = 0
+    restarts: int = 0
+    failures: int = 0
+
+
+class _Member:
+    """One server process with its initialized client session."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.session: Optional[ClientSession] = None
+        self.task: Optional[asyncio.Task] = None
+        self.ready = asyncio.Event()
+        self.stop = asyncio.Event()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self.task is not None and not self.task.done()
+
+
+class McpProcessPool:
+    """
+    Keeps `size` stdio MCP server processes started, each with an initialized client session.
+    Sessions are handed out round-robin (an MCP session handles concurrent requests), members
+    are pinged every health_interval seconds and restarted when they died or stopped answering.
+
+    The pool is bound to the event loop it was started on; used from another loop it starts
+    new processes. Call `close` on shutdown to terminate them.
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        size: int = 1,
+        timeout: float = 30,
+        health_interval: float = 30,
+        errlog=None,
+    ):
+        if size < 1:
+            raise ValueError("MCP pool size must be at least 1")
+        self.server_params = server_params
+        self.size = size
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.errlog = errlog
+        self._members: List[_Member] = []
+        self._next = 0
+        self._health_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._stats = McpPoolStats(size=size)
+
+    def stats(self) -> McpPoolStats:
+        return McpPoolStats(**{**vars(self._stats), "ready": sum(1 for m in self._members if m.alive)})
+
+    async def _run_member(self, member: _Member) -> None:
+        # The stdio transport and session must be entered and exited in the same task
+        try:
+            async with stdio_client(self.server_params, errlog=self.errlog or sys.stderr) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await asyncio.wait_for(session.initialize(), self.timeout)
+                    member.session = session
+                    member.ready.set()
+                    await member.stop.wait()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._stats.failures += 1
+            logger.warning(f"MCP server process {member.index} failed: {e}")
+        finally:
+            member.session = None
+            member.ready.set()
+
+    def _spawn(self, index: int) -> _Member:
+        member = _Member(index)
+        member.task = asyncio.get_running_loop().create_task(
+            self._run_member(member), name=f"mcp-pool-{index}")
+        self._stats.starts += 1
+        return member
+
+    async def _stop_member(self, member: _Member) -> None:
+        member.stop.set()
+        if member.task is None or member.task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(member.task), self.timeout)
+        except (asyncio.TimeoutError, Exception):
+            member.task.cancel()
+            try:
+                await member.task
+            except BaseException:
+                pass
+
+    async def _wait_ready(self, members: List[_Member]) -> None:
+        try:
+            await asyncio.wait_for(asyncio.gather(*(m.ready.wait() for m in members)), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"MCP server processes not ready after {self.timeout}s")
+
+    def _bound(self) -> bool:
+        return self._loop is asyncio.get_running_loop() and bool(self._members)
+
+    async def start(self) -> None:
+        """Starts the server processes (if not running yet) and waits until they are ready."""
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Processes and tasks of another (closed) loop cannot be reused
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._members = []
+            self._health_task = None
+
+        async with self._lock:
+            if not self._members:
+                self._members = [self._spawn(i) for i in range(self.size)]
+                await self._wait_ready(self._members)
+                if self.health_interval > 0:
+                    self._health_task = loop.create_task(self._health_loop(), name="mcp-pool-health")
+
+    async def session(self) -> ClientSession:
+        """An initialized session of one of the processes (round-robin over healthy ones)."""
+
+        if not self._bound():
+            await self.start()
+
+        for _ in range(2):
+            for _ in range(len(self._members)):
+                member = self._members[self._next % len(self._members)]
+                self._next += 1
+                if member.alive:
+                    self._stats.sessions += 1
+                    return member.session
+            # Nothing healthy, restart the dead processes once before giving up
+            await self.check_health()
+
+        raise ConnectionError(f"No MCP server process available ({self.server_params.command})")
+
+    async def _healthy(self, member: _Member) -> bool:
+        if not member.alive:
+            return False
+        try:
+            await asyncio.wait_for(member.session.send_ping(), self.timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"MCP server process {member.index} did not answer the ping: {e}")
+            return False
+
+    async def check_health(self) -> int:
+        """Pings all processes and restarts the unhealthy ones. Returns the number of restarts."""
+
+        if not self._bound():
+            await self.start()
+            return 0
+
+        # One check at a time (health loop and callers without a healthy process)
+        async with self._lock:
+            members = list(self._members)
+            healthy = await asyncio.gather(*(self._healthy(m) for m in members))
+            restarted = []
+            for member, ok in zip(members, healthy):
+                if ok or member not in self._members:
+                    continue
+                await self._stop_member(member)
+                replacement = self._spawn(member.index)
+                self._members[self._members.index(member)] = replacement
+                restarted.append(replacement)
+                self._stats.restarts += 1
+
+            if restarted:
+                logger.info(f"Restarted {len(restarted)} MCP server processes")
+                await self._wait_ready(restarted)
+        return len(restarted)
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP pool health check failed: {e}")
+
+    async def close(self) -> None:
+        """Terminates all server processes."""
+
+        if self._loop is not asyncio.get_running_loop():
+            self._members = []
+            return
+
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except BaseException:
+                pass
+            self._health_task = None
+
+        members, self._members = self._members, []
+        await asyncio.gather(*(self._stop_member(m) for m in members))
+
+
+class PooledSessionManager:
+    """MCPSessionManager replacement handing out sessions of a process pool."""
+
+    def __init__(self, pool: McpProcessPool):
+        self.pool = pool
+
+    async def create_session(self, headers=None) -> ClientSession:
+        return await self.pool.session()
+
+    def _get_session_context(self, headers=None):
+        return None
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+
+class PooledMcpToolset(McpToolset):
+    """McpToolset over a warm pool of stdio server processes (see McpProcessPool)."""
+
+    def __init__(self, *, connection_params: StdioConnectionParams, pool_size: int = 1,
+                 health_interval: float = 30, **kwargs):
+        super().__init__(connection_params=connection_params, **kwargs)
+        self.pool = McpProcessPool(
+            connection_params.server_params,
+            size=pool_size,
+            timeout=connection_params.timeout,
+            health_interval=health_interval,
+        )
+        self._mcp_session_manager = PooledSessionManager(self.pool)
+
+    async def start(self) -> None:
+        """Starts the server processes ahead of the first tool call."""
+
+        await self.pool.start()
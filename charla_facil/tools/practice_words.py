@@ -1,12 +1,25 @@
-from enum import IntEnum
-from typing import List
-from pydantic import BaseModel, ConfigDict, Field
-from datetime import datetime
-from sqlalchemy import asc, select
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from enum import Enum, IntEnum
+from typing import Dict, List, Optional, Tuple
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from datetime import datetime, timedelta
+from sqlalchemy import Column, MetaData, String, Table, asc, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from google.adk.tools import ToolContext
 
-from charla_facil.storage.db import get_db_engine
-from charla_facil.storage.orm_models import PracticeWordORM
+from charla_facil.lemma_index import get_lemma_index
+from charla_facil.storage.db import get_async_db_engine, get_db_engine, upsert
+from charla_facil.storage.orm_models import CompactionStateORM, PracticeWordORM, WordObservationORM
+from charla_facil.storage.word_ranking import RANKED_FIELDS, struggle_rankings
+from charla_facil.util import DEFAULT_USER_ID, get_user_id
+
+logger = logging.getLogger(__name__)
 
 
 class WordCorrectness(IntEnum):
@@ -53,6 +66,40 @@ STREAK_STEP = 0.12     # +12% lr per additional consecutive good use
 STREAK_MAX_BONUS = 0.60
 
 
+# Spaced repetition (SM-2 style) configuration.
+# Interval = FIRST_INTERVAL_DAYS * familiarity/100 * ease ** streak, where the ease factor
+# grows linearly with familiarity from MIN_EASE to MAX_EASE.
+FIRST_INTERVAL_DAYS = 1.0
+MIN_EASE = 1.3
+MAX_EASE = 2.5
+MIN_INTERVAL = timedelta(minutes=10)
+MAX_INTERVAL = timedelta(days=180)
+
+
+def review_interval(familiarity_level: int, correct_streak_count: int) -> timedelta:
+    """
+    Compute how long a word can rest before it should be practiced again.
+    """
+
+    ease = MIN_EASE + (MAX_EASE - MIN_EASE) * familiarity_level / 100
+    days = FIRST_INTERVAL_DAYS * (familiarity_level / 100) * ease ** min(correct_streak_count, 50)
+    return max(MIN_INTERVAL, timedelta(days=min(days, MAX_INTERVAL.days)))
+
+
+def decay_familiarity(familiarity_level: int, last_used: datetime, next_due_at: datetime, now: datetime) -> int:
+    """
+    Forgetting curve: familiarity is kept until the word is due, after that it halves
+    with every elapsed review interval.
+    """
+
+    overdue = (now - next_due_at).total_seconds()
+    interval = (next_due_at - last_used).total_seconds()
+    if overdue <= 0 or interval <= 0:
+        return familiarity_level
+
+    return int(round(familiarity_level * 0.5 ** (overdue / interval)))
+
+
 class WordUpdate(BaseModel):
     word: str = Field(
         ...,
@@ -60,6 +107,8 @@ class WordUpdate(BaseModel):
     )
     correctness: int = Field(
         ...,
+        ge=0,
+        le=4,
         description=(
             "How accurately the user used the word. "
             "0 = did not know it, "
@@ -71,7 +120,517 @@ class WordUpdate(BaseModel):
     )
 
 
-def update_practice_words(updates: List[WordUpdate]) -> None:
+def apply_word_observation(familiarity_level: int, correct_streak_count: int, correctness: int) -> Tuple[int, int]:
+    """
+    Applies a single observation to an already known word.
+
+    Returns:
+        Tuple of new (familiarity_level, correct_streak_count).
+    """
+
+    is_good = correctness >= 3
+    target = TARGET_BY_CORRECTNESS[correctness]
+    base_lr = BASE_LR_BY_CORRECTNESS[correctness]
+
+    if is_good:
+        correct_streak_count = correct_streak_count + 1
+        bonus = min(STREAK_MAX_BONUS, STREAK_STEP * (correct_streak_count - 1))
+        lr = base_lr * (1.0 + bonus)
+    else:
+        correct_streak_count = 0
+        lr = base_lr
+
+    old = familiarity_level
+    new = old + lr * (target - old)
+
+    if abs(new - old) < 1.0:
+        new = target
+
+    return int(round(max(0, min(100, new)))), correct_streak_count
+
+
+def fold_word_observations(state: Optional[dict], observations: List[Tuple[int, datetime]]) -> dict:
+    """
+    Reference implementation of the update rule, applies the (correctness, observed_at)
+    observations of a single word in chronological order.
+
+    Args:
+        state: Stored fields of the word (familiarity_level, correct_streak_count, update_count,
+               last_used, next_due_at) or None for a word that was never observed.
+
+    Returns:
+        The new stored fields of the word.
+    """
+
+    observations = iter(observations)
+    if state is None:
+        correctness, last_used = next(observations)
+        familiarity = initial_familiarity(correctness)
+        streak = 0
+        update_count = 1
+        next_due_at = last_used + review_interval(familiarity, streak)
+    else:
+        familiarity = state["familiarity_level"]
+        streak = state["correct_streak_count"]
+        update_count = state["update_count"]
+        last_used = state["last_used"]
+        next_due_at = state["next_due_at"]
+
+    for correctness, observed_at in observations:
+        familiarity = decay_familiarity(familiarity, last_used, next_due_at, observed_at)
+        familiarity, streak = apply_word_observation(familiarity, streak, correctness)
+        update_count += 1
+        last_used = observed_at
+        next_due_at = observed_at + review_interval(familiarity, streak)
+
+    return {
+        "familiarity_level": familiarity,
+        "correct_streak_count": streak,
+        "update_count": update_count,
+        "last_used": last_used,
+        "next_due_at": next_due_at,
+    }
+
+
+class ObservationSource(str, Enum):
+    """Where a word rating came from."""
+    CHAT = "chat"
+    QUIZ = "quiz"
+
+
+def normalize_word(word: str) -> str:
+    """Lowercase lemma of the word, inflected forms are mapped with the lemma index."""
+    return get_lemma_index().lemmatize(word.lower().strip())
+
+
+def merge_word_updates(updates: List[WordUpdate]) -> Dict[str, List[int]]:
+    """
+    Normalizes words and groups the correctness ratings of duplicated words,
+    preserving the order in which they were observed. Invalid ratings (e.g. a correctness
+    outside 0-4 from the model) are dropped, the rest of the batch is kept.
+    """
+
+    merged: Dict[str, List[int]] = {}
+    for update in updates:
+        try:
+            item = update if isinstance(update, WordUpdate) else WordUpdate.model_validate(update)
+        except ValidationError as e:
+            logger.warning(f"Dropped invalid word rating {update!r}: {e.errors()[0]['msg']}")
+            continue
+        merged.setdefault(normalize_word(item.word), []).append(item.correctness)
+    return merged
+
+
+@dataclass
+class BatchTimings:
+    """Wall clock timings (in milliseconds) of a single `update_practice_words` batch."""
+    words: int = 0
+    unique_words: int = 0
+    log_ms: float = 0.0
+    load_ms: float = 0.0
+    fold_ms: float = 0.0
+    write_ms: float = 0.0
+
+    @property
+    def total_ms(self) -> float:
+        return self.log_ms + self.load_ms + self.fold_ms + self.write_ms
+
+
+# Max number of bound parameters used in a single `IN (...)` lookup
+LOAD_CHUNK_SIZE = 500
+
+# "inline": observations are folded into the practice_word snapshot in the same transaction.
+# "deferred": writes only append to the log, the snapshot is compacted at most every
+#             OBSERVATION_COMPACTION_INTERVAL seconds (reads may lag behind by that much).
+COMPACTION_MODE = os.getenv("OBSERVATION_COMPACTION", "inline")
+COMPACTION_INTERVAL = float(os.getenv("OBSERVATION_COMPACTION_INTERVAL", "5"))
+COMPACTION_BATCH_SIZE = 10_000
+
+_last_compaction = 0.0
+_pending_users: set = set()
+
+
+def _load_practice_words(session: Session, user_id: str, words: List[str]) -> Dict[str, PracticeWordORM]:
+    existing = {}
+    for i in range(0, len(words), LOAD_CHUNK_SIZE):
+        chunk = words[i:i + LOAD_CHUNK_SIZE]
+        rows = session.scalars(
+            select(PracticeWordORM).where(
+                PracticeWordORM.user_id == user_id,
+                PracticeWordORM.word.in_(chunk),
+            ))
+        existing.update({row.word: row for row in rows})
+    return existing
+
+
+def _fold_into_snapshot(
+    session: Session,
+    user_id: str,
+    observations: Dict[str, List[Tuple[int, datetime]]],
+    timings: BatchTimings,
+) -> List[dict]:
+    """
+    Loads all affected rows with a single `IN (...)` query, folds the observations in memory
+    and writes the result back with one `INSERT ... ON CONFLICT DO UPDATE` statement.
+    """
+
+    start = time.perf_counter()
+    existing = _load_practice_words(session, user_id, list(observations.keys()))
+    loaded = time.perf_counter()
+    timings.load_ms += (loaded - start) * 1000
+
+    rows = []
+    for word, word_observations in observations.items():
+        saved_word = existing.get(word)
+        state = None
+        if saved_word:
+            state = {
+                "familiarity_level": saved_word.familiarity_level,
+                "correct_streak_count": saved_word.correct_streak_count,
+                "update_count": saved_word.update_count,
+                "last_used": saved_word.last_used,
+                "next_due_at": saved_word.next_due_at,
+            }
+
+        folded_word = fold_word_observations(state, word_observations)
+        rows.append({"user_id": user_id, "word": word, **folded_word})
+    folded = time.perf_counter()
+    timings.fold_ms += (folded - loaded) * 1000
+
+    stmt = upsert(session, PracticeWordORM)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PracticeWordORM.user_id, PracticeWordORM.word],
+        set_={
+            "familiarity_level": stmt.excluded.familiarity_level,
+            "correct_streak_count": stmt.excluded.correct_streak_count,
+            "update_count": stmt.excluded.update_count,
+            "last_used": stmt.excluded.last_used,
+            "next_due_at": stmt.excluded.next_due_at,
+        },
+    )
+    session.execute(stmt, rows)
+    timings.write_ms += (time.perf_counter() - folded) * 1000
+
+    return rows
+
+
+def record_word_observations(
+    session: Session,
+    updates: List[WordUpdate],
+    user_id: str = DEFAULT_USER_ID,
+    source: ObservationSource = ObservationSource.CHAT,
+) -> int:
+    """
+    Appends the ratings to the word_observation log (pure inserts, no reads).
+    The caller owns the transaction and holds the compaction mark of the learner
+    (lock_compaction_mark).
+
+    Returns:
+        Number of recorded observations.
+    """
+
+    observed_at = datetime.now()
+    rows = [
+        {
+            "user_id": user_id,
+            "word": word,
+            "correctness": correctness,
+            "source": ObservationSource(source).value,
+            "observed_at": observed_at,
+        }
+        for word, ratings in merge_word_updates(updates).items()
+        for correctness in ratings
+    ]
+    if rows:
+        session.execute(insert(WordObservationORM), rows)
+    return len(rows)
+
+
+def lock_compaction_mark(session: Session, user_id: str) -> int:
+    """
+    Returns the compaction high-water mark of the learner and locks it (SELECT ... FOR UPDATE)
+    until the caller's transaction ends.
+
+    Writers take the lock before logging, so the log ids of one learner are committed in
+    id order and a compaction never skips an observation committed later with a lower id.
+    Learners never wait for each other.
+    """
+
+    stmt = upsert(session, CompactionStateORM).values(user_id=user_id, last_observation_id=0)
+    session.execute(stmt.on_conflict_do_nothing(index_elements=[CompactionStateORM.user_id]))
+    return session.scalar(
+        select(CompactionStateORM.last_observation_id)
+        .where(CompactionStateORM.user_id == user_id)
+        .with_for_update())
+
+
+def compact_word_observations(
+    session: Session,
+    user_id: str,
+    batch_size: int = COMPACTION_BATCH_SIZE,
+    timings: Optional[BatchTimings] = None,
+) -> List[dict]:
+    """
+    Folds the observations of the learner logged after their compaction high-water mark into
+    the practice_word snapshot and moves the mark forward. The caller owns the transaction,
+    the mark stays locked until it ends (see lock_compaction_mark).
+
+    Returns:
+        The written snapshot rows.
+    """
+
+    timings = timings or BatchTimings()
+    high_water_mark = lock_compaction_mark(session, user_id)
+
+    observations = session.execute(
+        select(
+            WordObservationORM.id,
+            WordObservationORM.word,
+            WordObservationORM.correctness,
+            WordObservationORM.observed_at,
+        )
+        .where(WordObservationORM.user_id == user_id, WordObservationORM.id > high_water_mark)
+        .order_by(WordObservationORM.id)
+        .limit(batch_size)
+    ).all()
+    if not observations:
+        return []
+
+    by_word: Dict[str, List[Tuple[int, datetime]]] = {}
+    for observation_id, word, correctness, observed_at in observations:
+        # Rows logged before ratings were validated must not block the learner's log
+        if correctness not in TARGET_BY_CORRECTNESS:
+            logger.warning(f"Skipped word observation {observation_id} with correctness {correctness}")
+            continue
+        by_word.setdefault(word, []).append((correctness, observed_at))
+
+    written = _fold_into_snapshot(session, user_id, by_word, timings) if by_word else []
+
+    session.execute(
+        update(CompactionStateORM)
+        .where(CompactionStateORM.user_id == user_id)
+        .values(last_observation_id=observations[-1].id)
+    )
+    return written
+
+
+def write_practice_words(
+    session: Session,
+    updates: List[WordUpdate],
+    user_id: str = DEFAULT_USER_ID,
+    source: ObservationSource = ObservationSource.CHAT,
+) -> Tuple[Dict[str, List[dict]], BatchTimings]:
+    """
+    Write engine behind `update_practice_words`.
+
+    Appends the ratings to the observation log and, in the inline compaction mode, folds
+    them into the practice_word snapshot. The caller owns the transaction (commit / rollback).
+
+    Returns:
+        The written snapshot rows (per user) and the batch timings.
+    """
+
+    timings = BatchTimings(words=len(updates))
+    timings.unique_words = len(merge_word_updates(updates))
+
+    start = time.perf_counter()
+    lock_compaction_mark(session, user_id)
+    recorded = record_word_observations(session, updates, user_id, source)
+    timings.log_ms = (time.perf_counter() - start) * 1000
+
+    if not recorded:
+        return {}, timings
+    if COMPACTION_MODE != "inline":
+        _pending_users.add(user_id)
+        return {}, timings
+
+    return {user_id: compact_word_observations(session, user_id, timings=timings)}, timings
+
+
+def _compaction_due() -> bool:
+    global _last_compaction
+    if COMPACTION_MODE == "inline" or time.monotonic() - _last_compaction < COMPACTION_INTERVAL:
+        return False
+    _last_compaction = time.monotonic()
+    return True
+
+
+def _take_pending_users() -> List[str]:
+    """Learners with observations logged by this process since the last deferred compaction."""
+
+    global _pending_users
+    users, _pending_users = _pending_users, set()
+    return sorted(users)
+
+
+def _users_with_pending_observations(session: Session) -> List[str]:
+    return session.scalars(
+        select(WordObservationORM.user_id)
+        .outerjoin(CompactionStateORM, CompactionStateORM.user_id == WordObservationORM.user_id)
+        .where(WordObservationORM.id > func.coalesce(CompactionStateORM.last_observation_id, 0))
+        .group_by(WordObservationORM.user_id)
+        .order_by(WordObservationORM.user_id)
+    ).all()
+
+
+def _apply_to_rankings(written: Dict[str, List[dict]]) -> None:
+    for user_id, rows in written.items():
+        struggle_rankings.apply(user_id, rows)
+
+
+def compact_pending_observations(
+    batch_size: int = COMPACTION_BATCH_SIZE,
+    user_ids: Optional[List[str]] = None,
+) -> int:
+    """
+    Folds all pending observations into the snapshot (one transaction per learner and batch).
+
+    Args:
+        batch_size: Max number of observations folded per transaction.
+        user_ids: Learners to compact, by default everyone with pending observations.
+
+    Returns:
+        Number of snapshot rows written.
+    """
+
+    if user_ids is None:
+        with Session(get_db_engine()) as session:
+            user_ids = _users_with_pending_observations(session)
+
+    total = 0
+    for user_id in user_ids:
+        while True:
+            with Session(get_db_engine()) as session:
+                written = compact_word_observations(session, user_id, batch_size)
+                session.commit()
+            if not written:
+                break
+            _apply_to_rankings({user_id: written})
+            total += len(written)
+    return total
+
+
+# Inflected forms of the stored words -> lemma, filled by merge_lemma_duplicates
+_lemma_map = Table(
+    "lemma_map",
+    MetaData(),
+    Column("form", String, primary_key=True),
+    Column("lemma", String, nullable=False),
+    prefixes=["TEMPORARY"],
+)
+
+
+def _merge_user_lemmas(session: Session, user_id: str) -> List[dict]:
+    """Merges the inflected forms of one learner with set-based statements (see merge_lemma_duplicates)."""
+
+    word = PracticeWordORM.__table__
+    forms = select(_lemma_map.c.form)
+    lemmas = session.scalars(
+        select(_lemma_map.c.lemma)
+        .join(word, word.c.word == _lemma_map.c.form)
+        .where(word.c.user_id == user_id)
+        .distinct()
+    ).all()
+
+    # Every row of a merged lemma (its forms and the lemma row itself), ranked by recency
+    lemma = func.coalesce(_lemma_map.c.lemma, word.c.word)
+    grouped = (
+        select(
+            word.c.user_id,
+            lemma.label("word"),
+            word.c.familiarity_level,
+            word.c.correct_streak_count,
+            func.sum(word.c.update_count).over(partition_by=lemma).label("update_count"),
+            word.c.last_used,
+            word.c.next_due_at,
+            func.row_number().over(partition_by=lemma, order_by=word.c.last_used.desc()).label("recency"),
+        )
+        .select_from(word.outerjoin(_lemma_map, _lemma_map.c.form == word.c.word))
+        .where(word.c.user_id == user_id, lemma.in_(lemmas))
+        .subquery()
+    )
+    fields = ["user_id", "word", "familiarity_level", "correct_streak_count",
+              "update_count", "last_used", "next_due_at"]
+
+    stmt = upsert(session, PracticeWordORM).from_select(
+        fields, select(*(grouped.c[field] for field in fields)).where(grouped.c.recency == 1))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PracticeWordORM.user_id, PracticeWordORM.word],
+        set_={field: getattr(stmt.excluded, field) for field in fields[2:]},
+    )
+    session.execute(stmt)
+
+    session.execute(
+        delete(PracticeWordORM)
+        .where(PracticeWordORM.user_id == user_id, PracticeWordORM.word.in_(forms)))
+    session.execute(
+        update(WordObservationORM)
+        .where(WordObservationORM.user_id == user_id, WordObservationORM.word.in_(forms))
+        .values(word=select(_lemma_map.c.lemma)
+                .where(_lemma_map.c.form == WordObservationORM.word)
+                .scalar_subquery()))
+
+    rows = session.execute(
+        select(*(getattr(PracticeWordORM, field) for field in fields))
+        .where(PracticeWordORM.user_id == user_id, PracticeWordORM.word.in_(lemmas))
+        .order_by(PracticeWordORM.word))
+    return [row._asdict() for row in rows]
+
+
+def merge_lemma_duplicates(session: Session, user_id: Optional[str] = None) -> Dict[str, List[dict]]:
+    """
+    Merges practice words stored under an inflected form ("casas", "fui") into the row of
+    their lemma and renames their logged observations. The caller owns the transaction.
+
+    Only the distinct stored words are lemmatized in Python, the rows are merged with
+    set-based statements, one learner at a time. The merged row keeps the scheduling state
+    of the most recently used form, sums the update counts and takes the latest last_used.
+
+    Returns:
+        The merged lemma rows, per user.
+    """
+
+    query = select(PracticeWordORM.word).distinct()
+    if user_id is not None:
+        query = query.where(PracticeWordORM.user_id == user_id)
+    lemma_map = [
+        {"form": form, "lemma": lemma}
+        for form in session.scalars(query)
+        if (lemma := normalize_word(form)) != form
+    ]
+    if not lemma_map:
+        return {}
+
+    connection = session.connection()
+    _lemma_map.create(connection)
+    try:
+        session.execute(insert(_lemma_map), lemma_map)
+
+        query = (
+            select(PracticeWordORM.user_id)
+            .join(_lemma_map, _lemma_map.c.form == PracticeWordORM.word)
+            .distinct()
+            .order_by(PracticeWordORM.user_id)
+        )
+        if user_id is not None:
+            query = query.where(PracticeWordORM.user_id == user_id)
+
+        merged = {
+            merged_user_id: _merge_user_lemmas(session, merged_user_id)
+            for merged_user_id in session.scalars(query).all()
+        }
+    finally:
+        _lemma_map.drop(connection)
+
+    session.expire_all()
+    return merged
+
+
+def update_practice_words(
+    updates: List[WordUpdate],
+    user_id: str = DEFAULT_USER_ID,
+    source: ObservationSource = ObservationSource.CHAT,
+) -> None:
     """
     The core feedback loop. Updates the database with the user's proficiency on specific words used in the current message.
 
@@ -87,48 +646,58 @@ def update_practice_words(updates: List[WordUpdate]) -> None:
 
     Args:
         updates: A list of WordUpdate objects containing the word and a correctness rating.
+        user_id: Learner the ratings belong to.
+        source: Where the ratings come from (chat / quiz).
 
     """
 
-    for update in updates:
-        item = WordUpdate(**update)
-        correctness = item.correctness
-        word = item.word.lower().strip()
-        current_time = datetime.now()
+    with Session(get_db_engine()) as session:
+        written, timings = write_practice_words(session, updates, user_id, source)
+        start = time.perf_counter()
+        session.commit()
+        timings.write_ms += (time.perf_counter() - start) * 1000
 
-        with Session(get_db_engine()) as session:
-            saved_word = session.get(PracticeWordORM, word)
+    _apply_to_rankings(written)
+    _log_timings(timings)
 
-            if saved_word:
-                is_good = correctness >= 3
-                target = TARGET_BY_CORRECTNESS[correctness]
-                base_lr = BASE_LR_BY_CORRECTNESS[correctness]
+    if _compaction_due():
+        compact_pending_observations(user_ids=_take_pending_users())
 
-                if is_good:
-                    saved_word.correct_streak_count = saved_word.correct_streak_count + 1
-                    bonus = min(STREAK_MAX_BONUS, STREAK_STEP *
-                                (saved_word.correct_streak_count - 1))
-                    lr = base_lr * (1.0 + bonus)
-                else:
-                    saved_word.correct_streak_count = 0
-                    lr = base_lr
 
-                old = saved_word.familiarity_level
-                new = old + lr * (target - old)
+async def update_practice_words_async(
+    updates: List[WordUpdate],
+    user_id: str = DEFAULT_USER_ID,
+    source: ObservationSource = ObservationSource.CHAT,
+) -> None:
+    """
+    Async version of `update_practice_words`.
+    """
 
-                if abs(new - old) < 1.0:
-                    new = target
+    async with AsyncSession(get_async_db_engine()) as session:
+        written, timings = await session.run_sync(write_practice_words, updates, user_id, source)
+        start = time.perf_counter()
+        await session.commit()
+        timings.write_ms += (time.perf_counter() - start) * 1000
 
-                saved_word.familiarity_level = int(
-                    round(max(0, min(100, new)))
-                )
+    _apply_to_rankings(written)
+    _log_timings(timings)
 
-                session.add(saved_word)
-            else:
-                session.add(PracticeWordORM(
-                    word=word, familiarity_level=initial_familiarity(correctness), last_used=current_time))
+    if _compaction_due():
+        for pending_user_id in _take_pending_users():
+            while True:
+                async with AsyncSession(get_async_db_engine()) as session:
+                    written = await session.run_sync(compact_word_observations, pending_user_id)
+                    await session.commit()
+                if not written:
+                    break
+                _apply_to_rankings({pending_user_id: written})
 
-            session.commit()
+
+def _log_timings(timings: BatchTimings) -> None:
+    logger.debug(
+        f"update_practice_words: {timings.words} words ({timings.unique_words} unique) "
+        f"log={timings.log_ms:.2f}ms load={timings.load_ms:.2f}ms fold={timings.fold_ms:.2f}ms "
+        f"write={timings.write_ms:.2f}ms total={timings.total_ms:.2f}ms")
 
 
 class PracticeWordSchema(BaseModel):
@@ -164,9 +733,87 @@ class PracticeWordSchema(BaseModel):
         ge=0,
         description="Total number of times this word has been updated/practiced."
     )
+    next_due_at: datetime = Field(
+        ...,
+        description="When the word is due for the next spaced repetition practice."
+    )
+
+
+# Full rankings are loaded in the background, cold reads use the indexed top-N query
+_warmup_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="struggle-ranking")
+_warmups: set = set()
+
+
+def _ranking_query(user_id: str):
+    return (
+        select(*(getattr(PracticeWordORM, field) for field in RANKED_FIELDS))
+        .where(PracticeWordORM.user_id == user_id)
+        .limit(struggle_rankings.max_words + 1)
+    )
+
+
+def _load_ranking(user_id: str, writes: int) -> None:
+    rows = None
+    try:
+        with Session(get_db_engine()) as session:
+            rows = [row._asdict() for row in session.execute(_ranking_query(user_id))]
+    except Exception as e:
+        logger.warning(f"Loading the struggle ranking of {user_id} failed: {e}")
+    finally:
+        struggle_rankings.finish_warm(user_id, rows, writes)
+
+
+async def _load_ranking_async(user_id: str, writes: int) -> None:
+    rows = None
+    try:
+        async with AsyncSession(get_async_db_engine()) as session:
+            rows = [row._asdict() for row in await session.execute(_ranking_query(user_id))]
+    except Exception as e:
+        logger.warning(f"Loading the struggle ranking of {user_id} failed: {e}")
+    finally:
+        struggle_rankings.finish_warm(user_id, rows, writes)
+
+
+def _warm_ranking(user_id: str) -> None:
+    """Starts loading the ranking of the user, on the running event loop or in a worker thread."""
+
+    writes = struggle_rankings.begin_warm(user_id)
+    if writes is None:
+        return
+    try:
+        warmup = asyncio.get_running_loop().create_task(_load_ranking_async(user_id, writes))
+    except RuntimeError:
+        warmup = _warmup_executor.submit(_load_ranking, user_id, writes)
+    _warmups.add(warmup)
+    warmup.add_done_callback(_warmups.discard)
+
+
+async def wait_for_warmups() -> None:
+    """Waits for the ranking loads started so far (tests, benchmarks)."""
+
+    warmups = list(_warmups)
+    tasks = [w for w in warmups if isinstance(w, asyncio.Task)]
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.to_thread(wait, [w for w in warmups if not isinstance(w, asyncio.Task)])
+
+
+def _query_practice_words(session: Session, user_id: str, count: int) -> List[dict]:
+    words_query = (
+        select(PracticeWordORM)
+        .where(PracticeWordORM.user_id == user_id)
+        .order_by(
+            asc(PracticeWordORM.familiarity_level),
+            asc(PracticeWordORM.update_count),
+            asc(PracticeWordORM.last_used),
+        )
+        .limit(count)
+    )
 
+    words = session.scalars(words_query).all()
+    return [PracticeWordSchema.model_validate(w).model_dump() for w in words]
 
-def get_practice_words(count: int = 10) -> List[PracticeWordSchema]:
+
+def get_practice_words(count: int = 10, user_id: str = DEFAULT_USER_ID) -> List[PracticeWordSchema]:
     """
     Retrieves a list of Spanish words the user has historically struggled with, sorted by "struggle level" (hardest first).
 
@@ -176,16 +823,77 @@ def get_practice_words(count: int = 10) -> List[PracticeWordSchema]:
         A list of dictionaries containing word details.
     """
 
+    ranking = struggle_rankings.get(user_id)
+    if ranking is not None:
+        return ranking.top(count)
+
+    with Session(get_db_engine()) as session:
+        words = _query_practice_words(session, user_id, count)
+    _warm_ranking(user_id)
+    return words
+
+
+async def get_practice_words_async(count: int = 10, tool_context: ToolContext = None) -> List[PracticeWordSchema]:
+    """
+    Retrieves a list of Spanish words the user has historically struggled with, sorted by "struggle level" (hardest first).
+
+    Usage: Use this to find words to quiz the user on, or to weave difficult words into conversation for spaced repetition.
+
+    Returns:
+        A list of dictionaries containing word details.
+    """
+
+    user_id = get_user_id(tool_context)
+    ranking = struggle_rankings.get(user_id)
+    if ranking is not None:
+        return ranking.top(count)
+
+    async with AsyncSession(get_async_db_engine()) as session:
+        words = await session.run_sync(_query_practice_words, user_id, count)
+    _warm_ranking(user_id)
+    return words
+
+
+def _select_due_practice_words(session: Session, user_id: str, count: int, now: datetime) -> List[dict]:
+    # Range scan on ix_practice_word_due, most overdue first
     words_query = (
         select(PracticeWordORM)
-        .order_by(
-            asc(PracticeWordORM.familiarity_level),
-            asc(PracticeWordORM.update_count),
-            asc(PracticeWordORM.last_used),
+        .where(
+            PracticeWordORM.user_id == user_id,
+            PracticeWordORM.next_due_at <= now,
         )
+        .order_by(asc(PracticeWordORM.next_due_at))
         .limit(count)
     )
 
+    words = session.scalars(words_query).all()
+    return [PracticeWordSchema.model_validate(w).model_dump() for w in words]
+
+
+def get_due_practice_words(count: int = 10, user_id: str = DEFAULT_USER_ID, now: Optional[datetime] = None) -> List[PracticeWordSchema]:
+    """
+    Retrieves Spanish words that are due for spaced repetition practice (most overdue first).
+
+    Usage: Use this to pick words for a review quiz.
+
+    Returns:
+        A list of dictionaries containing word details.
+    """
+
     with Session(get_db_engine()) as session:
-        words = session.scalars(words_query).all()
-        return [PracticeWordSchema.model_validate(w).model_dump() for w in words]
+        return _select_due_practice_words(session, user_id, count, now or datetime.now())
+
+
+async def get_due_practice_words_async(count: int = 10, tool_context: ToolContext = None) -> List[PracticeWordSchema]:
+    """
+    Retrieves Spanish words that are due for spaced repetition practice (most overdue first).
+
+    Usage: Use this to pick words for a review quiz.
+
+    Returns:
+        A list of dictionaries containing word details.
+    """
+
+    async with AsyncSession(get_async_db_engine()) as session:
+        return await session.run_sync(
+            _select_due_practice_words, get_user_id(tool_context), count, datetime.now())
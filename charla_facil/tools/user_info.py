@@ -1,10 +1,17 @@
-from typing import List, Optional
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field, ValidationError
-from sqlalchemy import select
+from sqlalchemy import String, cast, func, null, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from google.adk.tools import ToolContext
 
-from charla_facil.storage.db import get_db_engine
+from charla_facil.cache import CacheStats, TTLCache
+from charla_facil.storage.db import get_async_db_engine, get_db_engine, upsert
 from charla_facil.storage.orm_models import UserProfileORM, UserEventORM, UserInterestORM
+from charla_facil.util import DEFAULT_USER_ID, get_user_id
 
 # ============================================================
 #  Pydantic Models
@@ -52,121 +59,366 @@ class SaveUserResult(BaseModel):
 
 
 # ============================================================
-#  Tools
+#  Profile cache
 # ============================================================
 
 
-def save_user_info(update_data: UserInfoUpdate) -> SaveUserResult:
-    """
-    Persists user details to the database.
-    It handles partial updates (you can send just the fields that changed).
+@dataclass
+class _CachedProfile:
+    # recent_events holds the newest events of the user, newest first
+    profile: UserProfile
+    # recent_events holds all events of the user
+    complete: bool
 
-    Usage: Call this whenever the user mentions new personal details (e.g., "I moved to Madrid", "I like tennis", "I am level A2")
+    def serves(self, max_events: Optional[int]) -> bool:
+        return self.complete or (max_events is not None and max_events <= len(self.profile.recent_events))
 
-    Important: When adding history, only add new events.
 
-    Returns:
-      SaveUserResult with fields changed.
+class ProfileCache:
+    """
+    Per-learner UserProfile with the newest events, filled by get_user_info and updated by
+    save_user_info after commit (write-through), so repeated reads cost no database I/O.
+
+    Size is bounded (LRU) and entries expire after ttl seconds, so writes made by other
+    processes are picked up.
     """
 
+    def __init__(self, max_size: int = 1000, ttl: Optional[float] = 300.0, events: int = 10):
+        self.events = events
+        self._entries: TTLCache[str, _CachedProfile] = TTLCache(max_size=max_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def writes(self) -> int:
+        """Write counter, taken before a load and passed to `put` to detect concurrent saves."""
+        return self._writes
+
+    def get(self, user_id: str, max_events: Optional[int]) -> Optional[UserProfile]:
+        entry = self._entries.get(user_id)
+        if entry is None or not entry.serves(max_events):
+            return None
+        profile = entry.profile.model_copy(deep=True)
+        if max_events is not None:
+            profile.recent_events = profile.recent_events[:max_events]
+        return profile
+
+    def put(self, user_id: str, profile: UserProfile, complete: bool, writes: int) -> None:
+        with self._lock:
+            # A save committed while loading, the loaded profile may be stale
+            if writes != self._writes:
+                return
+            self._entries.set(user_id, _CachedProfile(profile.model_copy(deep=True), complete))
+
+    def apply(self, user_id: str, changes: Dict[str, Any], new_events: List[UserHistoryEvent]) -> None:
+        """
+        Applies a committed save to the cached profile of the user (if cached): changed
+        attributes (interests as stored) and the inserted events, oldest row first.
+        """
+
+        with self._lock:
+            self._writes += 1
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+
+            profile = entry.profile.model_copy(deep=True)
+            for field, value in changes.items():
+                setattr(profile, field, list(value) if field == "interests" else value)
+            if profile.interests == []:
+                profile.interests = None
+
+            events = profile.recent_events
+            for ev in new_events:
+                # Same order as the events query: newest date first, then the newest row
+                position = next((i for i, cached in enumerate(events) if cached.date <= ev.date), len(events))
+                if position == len(events) and not entry.complete:
+                    # Older than the cached events, not part of them
+                    continue
+                events.insert(position, UserHistoryEvent(name=ev.name, date=ev.date))
+
+            self._entries.set(user_id, _CachedProfile(profile, entry.complete))
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._writes += 1
+            self._entries.invalidate(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._writes += 1
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        return self._entries.stats()
+
+
+profile_cache = ProfileCache(
+    max_size=int(os.getenv("PROFILE_CACHE_SIZE", "1000")),
+    ttl=float(os.getenv("PROFILE_CACHE_TTL", "300")),
+    events=int(os.getenv("PROFILE_CACHE_EVENTS", "10")),
+)
+
+
+# ============================================================
+#  Tools
+# ============================================================
+
+
+def _parse_update(update_data) -> UserInfoUpdate | SaveUserResult:
     # Convert ADK dict inputs → Pydantic
     if isinstance(update_data, dict):
         try:
-            model = UserInfoUpdate(**update_data)
+            return UserInfoUpdate(**update_data)
         except ValidationError as e:
             return SaveUserResult(
                 status="error",
                 updated_fields=[],
                 message=f"Validation failed: {e}"
             )
-    else:
-        model = update_data
+    return update_data
+
+
+def _save_interests(profile: UserProfileORM, interests: List[str]) -> Tuple[List[str], List[str]]:
+    """Deletes / inserts only the interest rows that changed. Returns (added, removed)."""
+
+    wanted = list(dict.fromkeys(interests))
+    kept = set()
+    removed = []
+    for row in list(profile.interests):
+        if row.interest in wanted and row.interest not in kept:
+            kept.add(row.interest)
+        else:
+            # Dropped interest or a duplicate row
+            profile.interests.remove(row)
+            removed.append(row.interest)
+
+    added = [item for item in wanted if item not in kept]
+    for item in added:
+        profile.interests.append(UserInterestORM(interest=item))
+    return added, removed
 
+
+def _save_events(session: Session, user_id: str, events: List[UserHistoryEvent]) -> List[UserHistoryEvent]:
+    """Inserts events that are not stored yet, returns the inserted ones (oldest row first)."""
+
+    stmt = (
+        upsert(session, UserEventORM)
+        .values([{"user_id": user_id, "name": ev.name, "date": ev.date} for ev in events])
+        .on_conflict_do_nothing(index_elements=["user_id", "name", "date"])
+        .returning(UserEventORM.id, UserEventORM.name, UserEventORM.date)
+    )
+    rows = sorted(session.execute(stmt).all())
+    return [UserHistoryEvent(name=row.name, date=row.date) for row in rows]
+
+
+def _save_user_info(session: Session, model: UserInfoUpdate, user_id: str) -> SaveUserResult:
     updated_fields = []
+    changes = {}
+    notes = []
 
-    with Session(get_db_engine()) as session:
-        profile = session.scalar(
-            select(UserProfileORM).where(UserProfileORM.id == 1))
-
-        for field in BaseUserAttributes.model_fields.keys():
-            value = getattr(model, field)
-            if value is not None:
-                if field == "interests":
-                    # Replace interests table
-                    profile.interests.clear()
-                    for item in value:
-                        profile.interests.append(
-                            UserInterestORM(interest=item))
-                else:
-                    setattr(profile, field, value)
-
-                updated_fields.append(field)
-
-        if model.new_events:
-            for ev in model.new_events:
-                profile.events.append(
-                    UserEventORM(
-                        name=ev.name,
-                        date=ev.date
-                    )
-                )
+    # Profile row is created on the first save of a new user
+    profile = session.get(UserProfileORM, user_id)
+    if profile is None:
+        profile = UserProfileORM(id=user_id)
+        session.add(profile)
+
+    for field in BaseUserAttributes.model_fields.keys():
+        value = getattr(model, field)
+        if value is None:
+            continue
+        if field == "interests":
+            added, removed = _save_interests(profile, value)
+            if not (added or removed):
+                continue
+            changes[field] = [row.interest for row in profile.interests]
+            notes.append(f"interests +{len(added)} -{len(removed)}")
+        elif getattr(profile, field) != value:
+            setattr(profile, field, value)
+            changes[field] = value
+        else:
+            continue
+        updated_fields.append(field)
+
+    new_events = []
+    if model.new_events:
+        # Events reference the profile row
+        session.flush()
+        new_events = _save_events(session, user_id, model.new_events)
+        if new_events:
             updated_fields.append("new_events")
+        skipped = len(model.new_events) - len(new_events)
+        notes.append(f"{len(new_events)} events added" + (f", {skipped} already stored" if skipped else ""))
 
-        session.add(profile)
-        session.commit()
+    session.commit()
+    profile_cache.apply(user_id, changes, new_events)
 
+    message = f"Successfully updated {len(updated_fields)} fields."
+    if notes:
+        message += f" ({'; '.join(notes)})"
     return SaveUserResult(
         status="success",
         updated_fields=updated_fields,
-        message=f"Successfully updated {len(updated_fields)} fields."
+        message=message
     )
 
 
-def get_user_info(max_events: int = 10) -> UserProfile:
+def _user_info_query(user_id: str, limit: Optional[int]):
+    """
+    Profile, interests and the `limit` latest events in one round trip. Interests and events
+    are separate rows of a UNION ALL joined to the profile, so they do not multiply each other.
+    """
+
+    recency = func.row_number().over(order_by=(UserEventORM.date.desc(), UserEventORM.id.desc()))
+    events = (
+        select(UserEventORM.user_id, UserEventORM.name, UserEventORM.date, recency.label("position"))
+        .where(UserEventORM.user_id == user_id)
+        .subquery()
+    )
+    recent_events = select(
+        events.c.user_id,
+        cast(null(), String).label("interest"),
+        events.c.name,
+        events.c.date,
+        events.c.position,
+    )
+    # Apply LIMIT at the SQL level
+    if limit is not None:
+        recent_events = recent_events.where(events.c.position <= limit)
+
+    interests = select(
+        UserInterestORM.user_id,
+        UserInterestORM.interest,
+        cast(null(), String).label("name"),
+        cast(null(), String).label("date"),
+        UserInterestORM.id.label("position"),
+    ).where(UserInterestORM.user_id == user_id)
+
+    details = union_all(interests, recent_events).subquery()
+    return (
+        select(UserProfileORM, details.c.interest, details.c.name, details.c.date)
+        .outerjoin(details, details.c.user_id == UserProfileORM.id)
+        .where(UserProfileORM.id == user_id)
+        .order_by(details.c.position)
+    )
+
+
+def _load_user_info(session: Session, max_events: Optional[int], user_id: str) -> UserProfile:
+    cached = profile_cache.get(user_id, max_events)
+    if cached is not None:
+        return cached
+
+    writes = profile_cache.writes()
+    # Load the cached number of events at least, so smaller reads are served from memory
+    limit = None if max_events is None else max(max_events, profile_cache.events)
+
+    rows = session.execute(_user_info_query(user_id, limit)).all()
+    if not rows:
+        profile_cache.put(user_id, UserProfile(), complete=True, writes=writes)
+        return UserProfile()
+
+    profile = rows[0].UserProfileORM
+    interests = [row.interest for row in rows if row.interest is not None]
+    recent_events = [
+        UserHistoryEvent(name=row.name, date=row.date)
+        for row in rows
+        if row.name is not None
+    ]
+
+    result = UserProfile(
+        name=profile.name,
+        cefr_level=profile.cefr_level,
+        nationality=profile.nationality,
+        age=profile.age,
+        place_of_living=profile.place_of_living,
+        interests=interests if interests else None,
+        recent_events=recent_events
+    )
+    profile_cache.put(user_id, result, complete=limit is None or len(recent_events) < limit, writes=writes)
+
+    if max_events is not None:
+        result.recent_events = result.recent_events[:max_events]
+    return result
+
+
+def save_user_info(update_data: UserInfoUpdate, user_id: str = DEFAULT_USER_ID) -> SaveUserResult:
+    """
+    Persists user details to the database.
+    It handles partial updates (you can send just the fields that changed).
+
+    Usage: Call this whenever the user mentions new personal details (e.g., "I moved to Madrid", "I like tennis", "I am level A2")
+
+    Important: When adding history, only add new events (events already stored are skipped).
+
+    Returns:
+      SaveUserResult with fields changed.
+    """
+
+    model = _parse_update(update_data)
+    if isinstance(model, SaveUserResult):
+        return model
+
+    with Session(get_db_engine()) as session:
+        return _save_user_info(session, model, user_id)
+
+
+async def save_user_info_async(update_data: UserInfoUpdate, tool_context: ToolContext = None) -> SaveUserResult:
+    """
+    Persists user details to the database.
+    It handles partial updates (you can send just the fields that changed).
+
+    Usage: Call this whenever the user mentions new personal details (e.g., "I moved to Madrid", "I like tennis", "I am level A2")
+
+    Important: When adding history, only add new events (events already stored are skipped).
+
+    Returns:
+      SaveUserResult with fields changed.
+    """
+
+    model = _parse_update(update_data)
+    if isinstance(model, SaveUserResult):
+        return model
+
+    async with AsyncSession(get_async_db_engine()) as session:
+        return await session.run_sync(_save_user_info, model, get_user_id(tool_context))
+
+
+def get_user_info(max_events: int = 10, user_id: str = DEFAULT_USER_ID) -> UserProfile:
     """
     Retrieves the user's profile including name, age, nationality, CEFR level, interests, and recent conversation history events.
 
-    Usage: Call this at the very beginning of every session to personalize the conversation or when in need to recall personal information about the user.
+    Usage: Call this when the user profile is not in the session context yet, or when in need to recall personal information about the user.
 
     Arguments:
       max_events (int): Maximum number of recent events to include in the result.
                         Defaults to 10. If set to None, returns ALL events.
+      user_id (str): Learner whose profile is returned.
 
     Returns:
       UserProfile model
     """
 
     with Session(get_db_engine()) as session:
-        profile = session.scalar(
-            select(UserProfileORM).where(UserProfileORM.id == 1))
+        return _load_user_info(session, max_events, user_id)
 
-        # Load interests
-        interests = [row.interest for row in profile.interests]
 
-        # Load events (ALL events kept in DB)
-        events_query = (
-            select(UserEventORM)
-            .where(UserEventORM.user_id == profile.id)
-            .order_by(UserEventORM.date.desc(), UserEventORM.id.desc())
-        )
+async def get_user_info_async(max_events: int = 10, tool_context: ToolContext = None) -> UserProfile:
+    """
+    Retrieves the user's profile including name, age, nationality, CEFR level, interests, and recent conversation history events.
 
-        # Apply LIMIT at the SQL level
-        if max_events is not None:
-            events_query = events_query.limit(max_events)
-
-        selected_events = session.scalars(events_query).all()
-
-        recent_events = [
-            UserHistoryEvent(name=e.name, date=e.date)
-            for e in selected_events
-        ]
-
-        return UserProfile(
-            name=profile.name,
-            cefr_level=profile.cefr_level,
-            nationality=profile.nationality,
-            age=profile.age,
-            place_of_living=profile.place_of_living,
-            interests=interests if interests else None,
-            recent_events=recent_events
-        )
+    Usage: Call this when the user profile is not in the session context yet, or when in need to recall personal information about the user.
+
+    Arguments:
+      max_events (int): Maximum number of recent events to include in the result.
+                        Defaults to 10. If set to None, returns ALL events.
+
+    Returns:
+      UserProfile model
+    """
+
+    user_id = get_user_id(tool_context)
+    cached = profile_cache.get(user_id, max_events)
+    if cached is not None:
+        return cached
+
+    async with AsyncSession(get_async_db_engine()) as session:
+        return await session.run_sync(_load_user_info, max_events, user_id)
@@ -1,8 +1,80 @@
+import asyncio
+import functools
+import logging
+import os
+import threading
 from google.genai import types
 
+logger = logging.getLogger(__name__)
+
 retry_config = types.HttpRetryOptions(
     attempts=5,  # Maximum retry attempts
     exp_base=7,  # Delay multiplier
     initial_delay=1,
     http_status_codes=[429, 500, 503, 504],  # Retry on these HTTP errors
-)
\ No newline at end of file
+)
+
+# User id used outside of ADK sessions (scripts, tests)
+DEFAULT_USER_ID = os.getenv("DEFAULT_USER_ID", "user")
+
+
+def get_user_id(context=None) -> str:
+    """
+    Returns the ADK user id of the current session (tool or callback context),
+    or DEFAULT_USER_ID when called outside of an agent session.
+    """
+
+    if context is not None:
+        return context.user_id
+    return DEFAULT_USER_ID
+
+
+def as_tool(func, name: str):
+    """
+    Wraps an async tool function so it is declared to the model under `name`, which keeps
+    the `_async` suffix of the implementation out of the tool names the prompt refers to.
+    """
+
+    @functools.wraps(func)
+    async def tool(*args, **kwargs):
+        return await func(*args, **kwargs)
+
+    tool.__name__ = tool.__qualname__ = name
+    return tool
+
+
+_vertexai_initialized = False
+_vertexai_lock = threading.Lock()
+
+
+def init_vertexai() -> bool:
+    """
+    Initializes Vertex AI when GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_LOCATION are set (cloud
+    deployment). The vertexai package is imported only then, it is the slowest import by far.
+
+    Returns:
+        True when running with Vertex AI.
+    """
+
+    global _vertexai_initialized
+    project = os.getenv("GOOGLE_CLOUD_PROJECT")
+    location = os.getenv("GOOGLE_CLOUD_LOCATION")
+    if not (project and location):
+        return False
+
+    if not _vertexai_initialized:
+        with _vertexai_lock:
+            if not _vertexai_initialized:
+                import vertexai
+
+                vertexai.init(project=project, location=location)
+                _vertexai_initialized = True
+                logger.info("Vertex AI initialized")
+    return True
+
+
+async def init_vertexai_callback(callback_context) -> None:
+    """before_agent_callback initializing Vertex AI on the first turn (off the event loop)."""
+
+    if not _vertexai_initialized:
+        await asyncio.to_thread(init_vertexai)
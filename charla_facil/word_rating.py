@@ -1,22 +1,35 @@
+import json
 import logging
+import os
+import threading
+from typing import List, Optional
+
 from google.genai import types
 from google import genai
 from google.adk.agents.callback_context import CallbackContext
 
-from charla_facil.tools.practice_words import update_practice_words
-from charla_facil.util import retry_config
+from charla_facil.context_cache import create_context_cache
+from charla_facil.metrics import RATING_SECONDS, record_model_usage, registry, timed
+from charla_facil.micro_batch import MicroBatcher
+from charla_facil.rating_cache import create_rating_cache
+from charla_facil.rating_pipeline import create_rating_pipeline
+from charla_facil.spanish_filter import create_spanish_filter
+from charla_facil.tools.practice_words import WordUpdate, update_practice_words, update_practice_words_async
+from charla_facil.util import DEFAULT_USER_ID, get_user_id, retry_config
 
 logger = logging.getLogger(__name__)
 
-_system_prompt = """You are a rigorous Linguistic Data Extractor. Your **only** function is to analyze Spanish language usage, extract words, grade them against a strict rubric, and execute the `update_practice_words` tool.
+_UPDATE_PRACTICE_WORDS_BATCH = "update_practice_words_batch"
+
+_role_prompt = """You are a rigorous Linguistic Data Extractor. Your **only** function is to analyze Spanish language usage, extract words, grade them against a strict rubric, and execute the `{tool}` tool.
 
 ### 🔨 OPERATIONAL RULES (NON-NEGOTIABLE)
 
 **1. EXECUTION MANDATE**
-   - You MUST call `update_practice_words` exactly once per turn.
-   - If no Spanish words or English fallbacks are present, call the function with an empty list `[]`.
-   - **NO TEXT OUTPUT:** Do not generate conversational text. Return ONLY the function call.
+"""
 
+# Extraction and grading rules, shared by the single message and the batch prompts
+_rating_rules = """
 **2. EXTRACTION & NORMALIZATION**
    - **Verbs:** Convert ALL conjugated verbs to their **Infinitive** form (e.g., "fui" -> "ir", "jugando" -> "jugar", "me lavo" -> "lavar").
    - **Nouns/Adjectives:** Convert to **Singular, Masculine** (unless the word is inherently feminine like "mujer"). (e.g., "casas" -> "casa", "rojas" -> "rojo").
@@ -37,57 +50,306 @@ _system_prompt = """You are a rigorous Linguistic Data Extractor. Your **only**
     * Action: `[{"word": "gato", "correctness": 4}, {"word": "ser", "correctness": 4}, {"word": "rojo", "correctness": 2}]` (Agreement error on 'rojo')
 """
 
-try:
-    _client = genai.Client(http_options={"retry_options": retry_config})
-except Exception as e:
-    logger.error(
-        f"Error initializing client: Ensure GEMINI_API_KEY environment variable is set.")
-    logger.error(f"Details: {e}")
-    exit()
+_system_prompt = _role_prompt.replace("{tool}", update_practice_words.__name__) + """   - You MUST call `update_practice_words` exactly once per turn.
+   - If no Spanish words or English fallbacks are present, call the function with an empty list `[]`.
+   - **NO TEXT OUTPUT:** Do not generate conversational text. Return ONLY the function call.
+""" + _rating_rules
+
+_batch_system_prompt = _role_prompt.replace("{tool}", _UPDATE_PRACTICE_WORDS_BATCH) + """   - The input is a JSON list of independent messages from different students: `[{"message_id": 0, "message": "..."}, ...]`.
+   - Grade every message on its own, exactly as if it were the only message.
+   - You MUST call `update_practice_words_batch` exactly once per turn, with one entry per `message_id` (use an empty `updates` list for messages without Spanish words).
+   - **NO TEXT OUTPUT:** Do not generate conversational text. Return ONLY the function call.
+""" + _rating_rules
+
+_client: Optional[genai.Client] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> genai.Client:
+    """
+    Gemini client, created on first use. Raises when no credentials are configured
+    (GOOGLE_API_KEY or Vertex AI), rating then fails and is logged per message.
+    """
+
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                try:
+                    _client = genai.Client(http_options={"retry_options": retry_config})
+                except Exception as e:
+                    logger.error(
+                        f"Error initializing client: Ensure GEMINI_API_KEY environment variable is set. Details: {e}")
+                    raise
+    return _client
+
 
+# Declaration only (no automatic function calling), the updates are applied by this module.
+_update_practice_words_declaration = types.FunctionDeclaration(
+    name=update_practice_words.__name__,
+    description=update_practice_words.__doc__,
+    parameters_json_schema={
+        "type": "object",
+        "properties": {
+            "updates": {
+                "type": "array",
+                "items": WordUpdate.model_json_schema(),
+            },
+        },
+        "required": ["updates"],
+    },
+)
 
-def rate_word_use(user_message: str) -> None:
+_config = types.GenerateContentConfig(
+    system_instruction=_system_prompt,
+    tool_config=types.ToolConfig(
+        function_calling_config=types.FunctionCallingConfig(mode='ANY')
+    ),
+    tools=[types.Tool(function_declarations=[_update_practice_words_declaration])],
+)
+
+_update_practice_words_batch_declaration = types.FunctionDeclaration(
+    name=_UPDATE_PRACTICE_WORDS_BATCH,
+    description="Updates the word ratings of several independent messages at once.",
+    parameters_json_schema={
+        "type": "object",
+        "properties": {
+            "ratings": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "message_id": {"type": "integer"},
+                        "updates": {
+                            "type": "array",
+                            "items": WordUpdate.model_json_schema(),
+                        },
+                    },
+                    "required": ["message_id", "updates"],
+                },
+            },
+        },
+        "required": ["ratings"],
+    },
+)
+
+_batch_config = types.GenerateContentConfig(
+    system_instruction=_batch_system_prompt,
+    tool_config=types.ToolConfig(
+        function_calling_config=types.FunctionCallingConfig(mode='ANY')
+    ),
+    tools=[types.Tool(function_declarations=[_update_practice_words_batch_declaration])],
+)
+
+RATING_MODEL = "gemini-2.5-flash"
+
+# Cached ratings are invalidated by any change of the model, prompts or declarations
+rating_cache = create_rating_cache(
+    RATING_MODEL,
+    _system_prompt,
+    _update_practice_words_declaration.model_dump_json(),
+    _batch_system_prompt,
+    _update_practice_words_batch_declaration.model_dump_json(),
+)
+
+# Static system prompts and tool declarations are sent as Gemini cached content
+rating_context_cache = create_context_cache(get_client)
+
+# Messages without any Spanish (English only, emoji, links) are not sent to the model
+spanish_filter = create_spanish_filter()
+
+
+def _extract_updates(response: types.GenerateContentResponse) -> list | None:
+    if response.function_calls:
+        function_call = response.function_calls[0]
+
+        if function_call.name == update_practice_words.__name__:
+            return function_call.args['updates']
+
+        logger.warning(
+            f"Model requested unknown function: {function_call.name}")
+    else:
+        logger.warning(
+            "Model did not return a function call. Analysis skipped.")
+
+    return None
+
+
+def rate_word_use(user_message: str, user_id: str = DEFAULT_USER_ID) -> None:
     """
     Analyzes the user's message and updates the word ratings.
     """
 
-    if not user_message or not user_message.strip():
-        return
+    with timed(RATING_SECONDS, "rate_word_use", outcome="skipped") as timing:
+        if not user_message or not user_message.strip():
+            return
+        if not spanish_filter.should_rate(user_message):
+            return
 
-    config = types.GenerateContentConfig(
-        system_instruction=_system_prompt,
-        tool_config=types.ToolConfig(
-            function_calling_config=types.FunctionCallingConfig(mode='ANY')
-        ),
-        tools=[update_practice_words],
-    )
+        try:
+            updates = rating_cache.get(user_message)
+            if updates is not None:
+                update_practice_words(updates, user_id)
+                timing.labels["outcome"] = "cached"
+                return
 
-    try:
-        response = _client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=user_message,
-            config=config,
+            response = get_client().models.generate_content(
+                model=RATING_MODEL,
+                contents=user_message,
+                config=rating_context_cache.cached_config(RATING_MODEL, _config),
+            )
+            rating_context_cache.record_usage(response)
+            record_model_usage(RATING_MODEL, response)
+
+            updates = _extract_updates(response)
+            timing.labels["outcome"] = "unrated"
+            if updates is not None:
+                rating_cache.put(user_message, updates)
+                update_practice_words(updates, user_id)
+                timing.labels["outcome"] = "rated"
+                logger.info(
+                    f"rate_word_use executed successfully for words: {updates}")
+        except Exception as e:
+            timing.labels["outcome"] = "failed"
+            logger.error(f"Linguistic analysis failed with Gemini API: {e}")
+
+
+def _extract_batch_updates(response: types.GenerateContentResponse, count: int) -> List[Optional[list]]:
+    updates: List[Optional[list]] = [None] * count
+    for function_call in response.function_calls or []:
+        if function_call.name != _UPDATE_PRACTICE_WORDS_BATCH:
+            logger.warning(
+                f"Model requested unknown function: {function_call.name}")
+            continue
+        for rating in function_call.args.get("ratings", []):
+            message_id = rating.get("message_id")
+            if isinstance(message_id, int) and 0 <= message_id < count:
+                updates[message_id] = rating.get("updates", [])
+
+    missing = updates.count(None)
+    if missing:
+        logger.warning(f"Model did not rate {missing} of {count} batched messages.")
+    return updates
+
+
+async def _rate_messages(user_messages: List[str]) -> List[Optional[list]]:
+    """
+    Rates a batch of messages with a single model call (the plain prompt for a single message).
+    """
+
+    if len(user_messages) == 1:
+        response = await get_client().aio.models.generate_content(
+            model=RATING_MODEL,
+            contents=user_messages[0],
+            config=await rating_context_cache.cached_config_async(RATING_MODEL, _config),
         )
+        rating_context_cache.record_usage(response)
+        record_model_usage(RATING_MODEL, response)
+        return [_extract_updates(response)]
+
+    response = await get_client().aio.models.generate_content(
+        model=RATING_MODEL,
+        contents=json.dumps(
+            [{"message_id": i, "message": m} for i, m in enumerate(user_messages)],
+            ensure_ascii=False),
+        config=await rating_context_cache.cached_config_async(RATING_MODEL, _batch_config),
+    )
+    rating_context_cache.record_usage(response)
+    record_model_usage(RATING_MODEL, response)
+    return _extract_batch_updates(response, len(user_messages))
 
-        if response.function_calls:
-            function_call = response.function_calls[0]
 
-            if function_call.name == update_practice_words.__name__:
-                updates = function_call.args['updates']
-                update_practice_words(updates)
+# Concurrent rating requests (across sessions) share one model call
+rating_batcher = MicroBatcher(
+    _rate_messages,
+    max_batch_size=int(os.getenv("RATING_BATCH_SIZE", "32")),
+    max_wait=float(os.getenv("RATING_BATCH_WAIT_MS", "20")) / 1000,
+)
+
+
+async def rate_word_use_async(user_message: str, user_id: str = DEFAULT_USER_ID) -> None:
+    """
+    Async version of `rate_word_use`, uses the async Gemini client and DB engine.
+    Model calls are micro-batched with the concurrent requests of other sessions.
+    """
+
+    with timed(RATING_SECONDS, "rate_word_use", outcome="skipped") as timing:
+        if not user_message or not user_message.strip():
+            return
+        if not spanish_filter.should_rate(user_message):
+            return
+
+        try:
+            updates = await rating_cache.get_async(user_message)
+            if updates is not None:
+                await update_practice_words_async(updates, user_id)
+                timing.labels["outcome"] = "cached"
+                return
+
+            updates = await rating_batcher.submit(user_message)
+            timing.labels["outcome"] = "unrated"
+            if updates is not None:
+                await rating_cache.put_async(user_message, updates)
+                await update_practice_words_async(updates, user_id)
+                timing.labels["outcome"] = "rated"
                 logger.info(
                     f"rate_word_use executed successfully for words: {updates}")
-            else:
-                logger.warning(
-                    f"Model requested unknown function: {function_call.name}")
-        else:
-            logger.warning(
-                "Model did not return a function call. Analysis skipped.")
-    except Exception as e:
-        logger.error(f"Linguistic analysis failed with Gemini API: {e}")
+        except Exception as e:
+            timing.labels["outcome"] = "failed"
+            logger.error(f"Linguistic analysis failed with Gemini API: {e}")
 
 
-def rate_word_use_callback(callback_context: CallbackContext):
+rating_pipeline = create_rating_pipeline(rate_word_use_async)
+
+
+async def rate_word_use_callback(callback_context: CallbackContext):
+    """
+    Queues the user message for rating in the background, so the agent can start answering right away.
+    """
+
     user_message = callback_context.user_content
-    if user_message and user_message.parts:
-        rate_word_use(user_message.parts[0].text)
+    if user_message and user_message.parts and user_message.parts[0].text:
+        session_id = callback_context.session.id
+        await rating_pipeline.submit(
+            session_id, get_user_id(callback_context), user_message.parts[0].text)
+
+
+def _collect_rating_metrics():
+    """Stats of the rating components, reported at scrape time."""
+
+    pipeline = rating_pipeline.stats()
+    cache = rating_cache.stats()
+    batcher = rating_batcher.stats()
+    context = rating_context_cache.stats()
+    spanish = spanish_filter.stats()
+
+    yield ("charla_rating_queue_depth", "gauge", "Messages waiting for rating.",
+           [({}, pipeline.queue_depth)])
+    yield ("charla_rating_in_flight", "gauge", "Messages being rated.",
+           [({}, pipeline.in_flight)])
+    yield ("charla_rating_jobs_total", "counter", "Rating jobs by outcome.", [
+        ({"outcome": "processed"}, pipeline.processed),
+        ({"outcome": "failed"}, pipeline.failed),
+        ({"outcome": "dropped"}, pipeline.dropped),
+        ({"outcome": "merged"}, pipeline.merged),
+    ])
+    yield ("charla_rating_cache_lookups_total", "counter", "Rating cache lookups by result.", [
+        ({"result": "memory_hit"}, cache.memory_hits),
+        ({"result": "persistent_hit"}, cache.persistent_hits),
+        ({"result": "miss"}, cache.misses),
+    ])
+    yield ("charla_spanish_filter_messages_total", "counter", "Messages checked by the Spanish pre-filter.", [
+        ({"result": "rated"}, spanish.checked - spanish.skipped),
+        ({"result": "skipped"}, spanish.skipped),
+    ])
+    yield ("charla_rating_batches_total", "counter", "Rating model calls (batches).",
+           [({}, batcher.batches)])
+    yield ("charla_rating_batched_messages_total", "counter", "Messages rated through batches.",
+           [({}, batcher.items)])
+    yield ("charla_context_cache_requests_total", "counter", "Rating requests by prompt mode.", [
+        ({"mode": "cached"}, context.cached_requests),
+        ({"mode": "inline"}, context.inline_requests),
+    ])
+
+
+registry.register_collector(_collect_rating_metrics)
@@ -0,0 +1,34 @@
+from benchmarks.harness import compare, format_comparison, measure
+from benchmarks.run import run_suite
+from charla_facil import word_rating
+from charla_facil.storage import db
+
+
+def test_measure():
+    calls = []
+    result = measure(lambda: calls.append(1), repeats=5, warmup=2)
+    assert len(calls) == 7
+    assert result.runs == 5
+    assert result.min_ms <= result.median_ms <= result.max_ms
+
+
+def test_compare():
+    baseline = {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}, "c": {"median_ms": 10.0},
+                "gone": {"median_ms": 1.0}}
+    current = {"a": {"median_ms": 11.0}, "b": {"median_ms": 13.0}, "c": {"median_ms": 7.0},
+               "added": {"median_ms": 1.0}}
+    statuses = {c.name: c.status for c in compare(current, baseline, tolerance=0.25)}
+    assert statuses == {"a": "ok", "b": "regressed", "c": "improved", "gone": "missing", "added": "new"}
+    assert "regressed" in format_comparison(compare(current, baseline))
+
+
+def test_run_suite_smoke():
+    config, engine, client = db.config, db._db, word_rating._client
+
+    results = run_suite(sizes=[50], events=20, repeats=1, warmup=0)
+
+    assert "update_practice_words[batch=10][rows=50]" in results
+    assert "rate_word_use[stub_model][rows=50]" in results
+    assert all(r.runs >= 1 for r in results.values())
+    # Globals patched by the suite are restored
+    assert (db.config, db._db, word_rating._client) == (config, engine, client)
@@ -0,0 +1,134 @@
+import asyncio
+from types import SimpleNamespace
+
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from charla_facil.context_cache import ContextCache
+
+CONFIG = types.GenerateContentConfig(
+    system_instruction="You are a Spanish tutor.",
+    temperature=0.2,
+)
+
+
+class FakeCaches:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.created = []
+        self.updated = []
+
+    def create(self, model, config):
+        if self.fail:
+            raise RuntimeError("Cached content is too small")
+        self.created.append((model, config))
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    def update(self, name, config):
+        self.updated.append((name, config.ttl))
+
+
+class FakeAsyncCaches:
+    def __init__(self, caches):
+        self.caches = caches
+
+    async def create(self, model, config):
+        return self.caches.create(model, config)
+
+    async def update(self, name, config):
+        return self.caches.update(name, config)
+
+
+def fake_client(fail=False):
+    caches = FakeCaches(fail)
+    return SimpleNamespace(caches=caches, aio=SimpleNamespace(caches=FakeAsyncCaches(caches))), caches
+
+
+def test_static_fields_are_replaced_by_cached_content():
+    client, caches = fake_client()
+    cache = ContextCache(lambda: client)
+
+    first = cache.cached_config("gemini-2.5-flash", CONFIG)
+    second = cache.cached_config("gemini-2.5-flash", CONFIG)
+
+    assert first.cached_content == second.cached_content == "cachedContents/1"
+    assert first.system_instruction is None
+    assert first.temperature == 0.2
+    assert CONFIG.system_instruction == "You are a Spanish tutor."
+    assert len(caches.created) == 1
+    assert caches.created[0][1].system_instruction == "You are a Spanish tutor."
+
+    other = cache.cached_config("gemini-2.5-pro", CONFIG)
+    assert other.cached_content == "cachedContents/2"
+    assert cache.stats().cached_requests == 3
+
+
+def test_cache_is_refreshed_before_expiry():
+    client, caches = fake_client()
+    now = [0.0]
+    cache = ContextCache(lambda: client, ttl=100, refresh_margin=10, clock=lambda: now[0])
+
+    cache.cached_config("gemini-2.5-flash", CONFIG)
+    now[0] = 85
+    cache.cached_config("gemini-2.5-flash", CONFIG)
+    assert caches.updated == []
+
+    now[0] = 95
+    assert cache.cached_config("gemini-2.5-flash", CONFIG).cached_content == "cachedContents/1"
+    assert caches.updated == [("cachedContents/1", "100s")]
+    assert (cache.stats().creations, cache.stats().refreshes) == (1, 1)
+
+
+def test_unavailable_caching_falls_back_to_inline_prompt():
+    client, caches = fake_client(fail=True)
+    now = [0.0]
+    cache = ContextCache(lambda: client, retry_after=60, clock=lambda: now[0])
+
+    assert cache.cached_config("gemini-2.5-flash", CONFIG) is CONFIG
+    caches.fail = False
+    assert cache.cached_config("gemini-2.5-flash", CONFIG) is CONFIG  # waits before retrying
+
+    now[0] = 61
+    assert cache.cached_config("gemini-2.5-flash", CONFIG).cached_content == "cachedContents/1"
+
+    stats = cache.stats()
+    assert (stats.failures, stats.inline_requests, stats.cached_requests) == (1, 2, 1)
+
+
+def test_disabled_cache_returns_config_unchanged():
+    client, caches = fake_client()
+    cache = ContextCache(lambda: client, enabled=False)
+
+    assert cache.cached_config("gemini-2.5-flash", CONFIG) is CONFIG
+    assert caches.created == []
+
+
+def test_concurrent_async_requests_create_one_cache():
+    client, caches = fake_client()
+    cache = ContextCache(lambda: client)
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.cached_config_async("gemini-2.5-flash", CONFIG) for _ in range(5)))
+
+    configs = asyncio.run(run())
+
+    assert {c.cached_content for c in configs} == {"cachedContents/1"}
+    assert len(caches.created) == 1
+
+
+def test_adk_callbacks_use_cache_and_record_usage():
+    client, caches = fake_client()
+    cache = ContextCache(lambda: client)
+    request = LlmRequest(model="gemini-2.5-flash", config=CONFIG.model_copy())
+
+    asyncio.run(cache.before_model_callback(None, request))
+    asyncio.run(cache.after_model_callback(None, SimpleNamespace(usage_metadata=types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=1200, cached_content_token_count=1000))))
+
+    assert request.config.cached_content == "cachedContents/1"
+    assert request.config.system_instruction is None
+
+    stats = cache.stats()
+    assert (stats.cached_tokens, stats.uncached_tokens) == (1000, 200)
+    assert stats.cached_token_ratio == 1000 / 1200
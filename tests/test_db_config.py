@@ -0,0 +1,114 @@
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from charla_facil.storage import db
+from charla_facil.storage.config import DatabaseConfig
+
+
+def _engine(config: DatabaseConfig):
+    return config.configure(create_engine(config.sync_url(), **config.engine_kwargs()))
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("DB_PATH", "learners.db")
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "10000")
+    monkeypatch.setenv("SQLITE_MMAP_SIZE", "")
+    config = DatabaseConfig.from_env()
+
+    assert config.url == "sqlite:///learners.db"
+    assert config.get_async_url() == "sqlite+aiosqlite:///learners.db"
+    assert config.engine_kwargs() == {"echo": False, "pool_size": 20}
+    assert config.sqlite_pragmas["busy_timeout"] == "10000"
+    assert "mmap_size" not in config.sqlite_pragmas
+
+    monkeypatch.setenv("DB_URL", "postgresql://charla:secret@db:5432/charla")
+    config = DatabaseConfig.from_env()
+    assert config.backend == "postgresql"
+    assert config.sync_url() == "postgresql+psycopg://charla:secret@db:5432/charla"
+    assert config.get_async_url() == "postgresql+psycopg://charla:secret@db:5432/charla"
+    assert config.engine_kwargs()["pool_pre_ping"] is True
+
+
+def test_invalid_begin_mode():
+    with pytest.raises(ValueError):
+        DatabaseConfig(sqlite_begin="exclusive")
+
+
+def test_sqlite_pragmas_applied(tmp_path):
+    engine = _engine(DatabaseConfig(url=f"sqlite:///{tmp_path / 'tuned.db'}"))
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -65536
+    engine.dispose()
+
+
+def test_async_engine_pragmas(tmp_path):
+    config = DatabaseConfig(url=f"sqlite:///{tmp_path / 'tuned.db'}")
+
+    async def run():
+        engine = create_async_engine(config.get_async_url(), **config.engine_kwargs())
+        config.configure(engine.sync_engine)
+        async with engine.connect() as conn:
+            journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        await engine.dispose()
+        return journal_mode
+
+    assert asyncio.run(run()) == "wal"
+
+
+def test_concurrent_writers_wait_for_the_lock(tmp_path):
+    engine = _engine(DatabaseConfig(url=f"sqlite:///{tmp_path / 'writers.db'}", sqlite_begin="immediate"))
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)"))
+        conn.execute(text("INSERT INTO counter VALUES (1, 0)"))
+
+    errors = []
+
+    def writer():
+        try:
+            for _ in range(20):
+                with engine.begin() as conn:
+                    value = conn.execute(text("SELECT value FROM counter WHERE id = 1")).scalar()
+                    conn.execute(text("UPDATE counter SET value = :v WHERE id = 1"), {"v": value + 1})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT value FROM counter")).scalar() == 160
+    engine.dispose()
+
+
+def test_engines_are_created_lazily(tmp_path, monkeypatch):
+    path = tmp_path / "lazy.db"
+    monkeypatch.setattr(db, "config", DatabaseConfig(url=f"sqlite:///{path}"))
+    monkeypatch.setattr(db, "_db", None)
+    monkeypatch.setattr(db, "_async_db", None)
+    assert not path.exists()
+
+    engine = db.get_db_engine()
+    assert db.get_db_engine() is engine
+    assert path.exists()
+    with engine.connect() as conn:
+        tables = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars().all()
+    assert "practice_word" in tables
+
+    async def run():
+        assert db.get_async_db_engine() is db.get_async_db_engine()
+        await db.dispose_engines()
+
+    asyncio.run(run())
+    assert db._db is None and db._async_db is None
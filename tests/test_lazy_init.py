@@ -0,0 +1,106 @@
+import asyncio
+import os
+import pickle
+import threading
+
+from charla_facil import util, word_rating
+from charla_facil.import_profile import by_package, format_report, parse_importtime, profile_imports
+from charla_facil.tools.mcp.lazy_toolset import LazyToolset
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   google.genai.types
+import time:        50 |        150 | google.genai
+import time:        20 |         20 |     sqlalchemy.orm
+import time:        30 |         50 |   sqlalchemy
+import time:         5 |        205 | charla_facil.agent
+"""
+
+
+def test_parse_importtime():
+    costs = parse_importtime(IMPORTTIME)
+
+    assert [c.module for c in costs] == [
+        "google.genai.types", "google.genai", "sqlalchemy.orm", "sqlalchemy", "charla_facil.agent"]
+    assert (costs[0].self_us, costs[0].cumulative_us, costs[0].depth) == (100, 100, 1)
+    assert costs[-1].depth == 0
+    assert by_package(costs) == {"google.genai": 150, "sqlalchemy": 50, "charla_facil": 5}
+    assert "charla_facil.agent" in format_report(costs)
+
+
+def test_agent_import_is_lazy():
+    env = {**os.environ, "GOOGLE_CLOUD_PROJECT": "project", "GOOGLE_CLOUD_LOCATION": "europe-west1"}
+    modules = {cost.module for cost in profile_imports("charla_facil.agent", env=env)}
+
+    assert "charla_facil.agent" in modules
+    assert "vertexai" not in modules
+    assert "google.adk.tools.mcp_tool.mcp_toolset" not in modules
+
+
+def test_client_created_once_on_first_use(monkeypatch):
+    created = []
+
+    class FakeClient:
+        def __init__(self, **kwargs):
+            created.append(self)
+
+    monkeypatch.setattr(word_rating, "_client", None)
+    monkeypatch.setattr(word_rating.genai, "Client", FakeClient)
+
+    threads = [threading.Thread(target=word_rating.get_client) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert word_rating.get_client() is created[0]
+
+
+def test_vertexai_skipped_without_cloud_config(monkeypatch):
+    monkeypatch.delenv("GOOGLE_CLOUD_PROJECT", raising=False)
+    monkeypatch.delenv("GOOGLE_CLOUD_LOCATION", raising=False)
+    assert util.init_vertexai() is False
+
+
+def test_lazy_toolset_created_on_first_use():
+    created = []
+
+    class FakeToolset:
+        closed = False
+
+        async def get_tools_with_prefix(self, readonly_context=None):
+            return ["tool"]
+
+        async def close(self):
+            self.closed = True
+
+    def factory():
+        created.append(FakeToolset())
+        return created[-1]
+
+    async def run():
+        toolset = LazyToolset(factory)
+        await toolset.close()
+        assert created == [] and not toolset.initialized
+
+        assert await toolset.get_tools() == ["tool"]
+        assert await toolset.get_tools() == ["tool"]
+        await toolset.close()
+
+    asyncio.run(run())
+    assert len(created) == 1
+    assert created[0].closed
+
+
+def test_lazy_toolset_pickles_without_its_toolset():
+    toolset = LazyToolset(_toolset_factory)
+    toolset.get_toolset()
+
+    restored = pickle.loads(pickle.dumps(toolset))
+
+    assert not restored.initialized
+    assert restored.get_toolset() == "toolset"
+
+
+def _toolset_factory():
+    return "toolset"
@@ -0,0 +1,51 @@
+import pytest
+
+from charla_facil.lemma_index import LemmaIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "lemmas.tsv"
+    LemmaIndex.build([
+        ("fui", "ir"), ("casas", "casa"), ("Árboles", "árbol"), ("casa", "casa"),
+        ("fui", "ser"), ("abrimos", "abrir"), ("zapatos", "zapato"),
+        ("niña", "niño"), ("niñas", "niño"), ("gusto", "gustar"), ("gustos", "gustar"), ("gustas", "gustar"),
+    ], str(path), lemmas=["niña"], homographs=["gusto"])
+    index = LemmaIndex(str(path))
+    yield index
+    index.close()
+
+
+def test_build_sorts_and_deduplicates(index):
+    assert list(index) == sorted(list(index), key=lambda p: "\t".join(p).encode())
+    assert dict(index) == {
+        "abrimos": "abrir", "casas": "casa", "gustas": "gustar", "niñas": "niña",
+        "zapatos": "zapato", "árboles": "árbol"}
+
+
+@pytest.mark.parametrize("form, lemma", [
+    ("abrimos", "abrir"),  # first line
+    ("árboles", "árbol"),  # last line (non ASCII sorts last)
+    ("niñas", "niña"),
+    ("casas", "casa"),
+])
+def test_lookup(index, form, lemma):
+    assert index.lookup(form) == lemma
+
+
+@pytest.mark.parametrize("form", ["", "a", "casa", "cas", "casass", "zzz", "fui", "niña", "gusto", "gustos"])
+def test_lookup_missing(index, form):
+    assert index.lookup(form) is None
+    assert index.lemmatize(form) == form
+
+
+@pytest.mark.parametrize("form, lemma", [
+    ("voy", "ir"), ("quiero", "querer"), ("rojas", "rojo"), ("canciones", "canción"),
+    ("sé", "saber"), ("como", "como"), ("trabajo", "trabajo"),
+    # Homographs and dictionary words are left alone
+    ("fue", "fue"), ("sal", "sal"), ("cuenta", "cuenta"), ("cuento", "cuento"), ("gusto", "gusto"),
+    ("vuelo", "vuelo"), ("hecho", "hecho"), ("abuela", "abuela"), ("abuelas", "abuela"),
+    ("niña", "niña"), ("hermana", "hermana"), ("levantarse", "levantarse"),
+])
+def test_packaged_index(form, lemma):
+    assert LemmaIndex().lemmatize(form) == lemma
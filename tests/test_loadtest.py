@@ -0,0 +1,102 @@
+import json
+
+from google.genai import types
+from starlette.testclient import TestClient
+
+from benchmarks.fake_gemini import FakeGemini, create_app
+from benchmarks.loadtest import _mean_ms, is_error, parse_metrics, send_message_request
+
+
+def _tools(*names):
+    return [{"functionDeclarations": [{"name": name} for name in names]}]
+
+
+def _generate(client, body):
+    response = client.post("/v1beta/models/gemini-2.5-flash:generateContent", json=body)
+    assert response.status_code == 200
+    return types.GenerateContentResponse.model_validate(response.json())
+
+
+def test_fake_gemini_rates_messages():
+    client = TestClient(create_app(FakeGemini(latency=0, jitter=0)))
+
+    single = _generate(client, {
+        "contents": [{"role": "user", "parts": [{"text": "Ayer fui a la playa"}]}],
+        "tools": _tools("update_practice_words"),
+    })
+    assert single.function_calls[0].name == "update_practice_words"
+    assert [u["word"] for u in single.function_calls[0].args["updates"]] == ["ayer", "fui", "a", "la", "playa"]
+    assert single.usage_metadata.prompt_token_count > 0
+
+    batch = _generate(client, {
+        "contents": [{"role": "user", "parts": [{"text": json.dumps(
+            [{"message_id": 0, "message": "hola"}, {"message_id": 1, "message": "gato negro"}])}]}],
+        "tools": _tools("update_practice_words_batch"),
+    })
+    ratings = batch.function_calls[0].args["ratings"]
+    assert [len(r["updates"]) for r in ratings] == [1, 2]
+
+
+def test_fake_gemini_tutor_script():
+    client = TestClient(create_app(FakeGemini(latency=0, jitter=0, output_tokens=5)))
+    tools = _tools("get_user_info", "save_user_info", "get_practice_words")
+    user = {"role": "user", "parts": [{"text": "Hola"}]}
+    call = {"role": "model", "parts": [{"functionCall": {"name": "get_user_info", "args": {}}}]}
+    result = {"role": "user", "parts": [{"functionResponse": {"name": "get_user_info", "response": {}}}]}
+
+    def first_call(contents):
+        return _generate(client, {"contents": contents, "tools": tools}).function_calls[0].name
+
+    assert first_call([user]) == "get_user_info"
+    assert first_call([user, call, result, {"role": "model", "parts": [{"text": "¡Hola!"}]}, user]) \
+        == "save_user_info"
+    assert first_call([user, user, user]) == "get_practice_words"
+
+    context = {"role": "user", "parts": [{"text": "### SESSION CONTEXT\n**User profile:** {}"}]}
+    assert _generate(client, {"contents": [context, user], "tools": tools}).function_calls is None
+
+    answer = _generate(client, {"contents": [user, call, result], "tools": tools})
+    assert answer.function_calls is None
+    assert len(answer.text.split()) == 5
+
+
+def test_fake_gemini_answers_structured_output_with_a_quiz():
+    client = TestClient(create_app(FakeGemini(latency=0, jitter=0)))
+    answer = _generate(client, {
+        "contents": [{"role": "user", "parts": [{"text": "Topic: Travel"}]}],
+        "generationConfig": {"responseMimeType": "application/json"},
+    })
+    quiz = json.loads(answer.text)
+    assert quiz["topic"] == "Travel"
+    assert len(quiz["items"]) == 5
+
+
+def test_fake_gemini_rejects_context_caching():
+    client = TestClient(create_app(FakeGemini(latency=0)))
+    assert client.post("/v1beta/cachedContents", json={}).status_code == 400
+
+
+def test_metrics_parsing_and_deltas():
+    before = parse_metrics(
+        '# TYPE charla_db_query_seconds histogram\n'
+        'charla_db_query_seconds_sum{operation="INSERT"} 1.0\n'
+        'charla_db_query_seconds_count{operation="INSERT"} 10\n')
+    after = parse_metrics(
+        'charla_db_query_seconds_sum{operation="INSERT"} 2.0\n'
+        'charla_db_query_seconds_count{operation="INSERT"} 20\n'
+        'charla_db_query_seconds_sum{operation="UPDATE"} 0.5\n'
+        'charla_db_query_seconds_count{operation="UPDATE"} 5\n')
+
+    assert after['charla_db_query_seconds_count{operation="UPDATE"}'] == 5
+    assert _mean_ms(before, after, "charla_db_query_seconds", ["INSERT", "UPDATE"]) == 100
+    assert _mean_ms(before, before, "charla_db_query_seconds") is None
+
+
+def test_a2a_requests_and_errors():
+    request = send_message_request("Hola", "ctx-1")
+    assert request["method"] == "message/send"
+    assert request["params"]["message"]["contextId"] == "ctx-1"
+
+    assert not is_error({"result": {"kind": "task", "status": {"state": "completed"}}})
+    assert is_error({"result": {"kind": "task", "status": {"state": "failed"}}})
+    assert is_error({"error": {"code": -32603, "message": "Internal error"}})
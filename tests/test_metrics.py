@@ -0,0 +1,157 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from starlette.testclient import TestClient
+
+from charla_facil import instrumentation
+from charla_facil.instrumentation import AgentInstrumentation
+from charla_facil.metrics import (
+    DB_LOCK_ERRORS,
+    DB_QUERY_SECONDS,
+    DB_TRANSACTION_SECONDS,
+    MODEL_SECONDS,
+    MODEL_TOKENS,
+    TOOL_SECONDS,
+    MetricsRegistry,
+    timed,
+)
+
+
+def test_render_counter_and_histogram():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ["path"])
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+
+    requests.inc(path='/a"b')
+    requests.inc(2, path='/a"b')
+    for value in (0.05, 0.5, 5):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{path="/a\\"b"} 3',
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1"} 2',
+        'latency_seconds_bucket{le="+Inf"} 3',
+        "latency_seconds_sum 5.55",
+        "latency_seconds_count 3",
+    ]
+
+
+def test_collectors_are_rendered_and_failures_skipped():
+    registry = MetricsRegistry()
+
+    def broken():
+        raise RuntimeError("boom")
+
+    registry.register_collector(broken)
+    registry.register_collector(lambda: [("queue_depth", "gauge", "Queue depth.", [({"queue": "q"}, 4)])])
+
+    assert registry.render().splitlines() == [
+        "# HELP queue_depth Queue depth.", "# TYPE queue_depth gauge", 'queue_depth{queue="q"} 4']
+
+
+def test_timed_records_final_labels():
+    histogram = MetricsRegistry().histogram("op_seconds", "Op.", ["outcome"])
+
+    with timed(histogram, "op", outcome="skipped") as timing:
+        timing.labels["outcome"] = "done"
+    with pytest.raises(ValueError):
+        with timed(histogram, "op"):
+            raise ValueError()
+
+    assert histogram.count(outcome="done") == 1
+    assert histogram.count(outcome="error") == 1
+
+
+def test_sql_statements_and_transactions_are_timed():
+    engine = create_engine("sqlite:///:memory:")
+    selects = DB_QUERY_SECONDS.count(operation="SELECT")
+    commits = DB_TRANSACTION_SECONDS.count(outcome="commit")
+
+    with Session(engine) as session:
+        session.execute(text("SELECT 1"))
+        session.commit()
+
+    assert DB_QUERY_SECONDS.count(operation="SELECT") == selects + 1
+    assert DB_TRANSACTION_SECONDS.count(outcome="commit") == commits + 1
+
+
+def test_sql_transactions_are_traced(monkeypatch):
+    sdk_trace = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = sdk_trace.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    test_tracer = provider.get_tracer("test")
+    monkeypatch.setattr(instrumentation, "tracer", test_tracer)
+    engine = create_engine("sqlite:///:memory:")
+
+    with test_tracer.start_as_current_span("tool_call") as tool_span:
+        with Session(engine) as session:
+            session.execute(text("SELECT 1"))
+            session.commit()
+            session.execute(text("SELECT 2"))
+            session.rollback()
+
+    spans = [span for span in exporter.get_finished_spans() if span.name == "db_transaction"]
+    assert [span.attributes["outcome"] for span in spans] == ["commit", "rollback"]
+    assert all(span.parent.span_id == tool_span.get_span_context().span_id for span in spans)
+
+
+def test_sql_lock_errors_are_counted(tmp_path):
+    path = tmp_path / "locked.db"
+    writer = create_engine(f"sqlite:///{path}")
+    blocked = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0})
+    with writer.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+    locks = DB_LOCK_ERRORS.value(operation="INSERT")
+
+    with writer.connect() as conn:
+        conn.exec_driver_sql("BEGIN EXCLUSIVE")
+        with pytest.raises(Exception, match="database is locked"):
+            with blocked.begin() as other:
+                other.execute(text("INSERT INTO t VALUES (1)"))
+        conn.exec_driver_sql("ROLLBACK")
+
+    assert DB_LOCK_ERRORS.value(operation="INSERT") == locks + 1
+
+
+def test_agent_instrumentation_times_models_and_tools():
+    instrumentation = AgentInstrumentation()
+    callback_context = SimpleNamespace(invocation_id="i1", agent_name="tutor")
+    tool_context = SimpleNamespace(function_call_id="c1", agent_name="tutor")
+    tool = SimpleNamespace(name="get_user_info")
+    usage = SimpleNamespace(prompt_token_count=100, cached_content_token_count=80, candidates_token_count=20)
+
+    async def run():
+        await instrumentation.before_model_callback(callback_context, SimpleNamespace(model="test-model"))
+        await instrumentation.after_model_callback(
+            callback_context, SimpleNamespace(partial=False, error_code=None, usage_metadata=usage))
+        await instrumentation.before_tool_callback(tool, {}, tool_context)
+        await instrumentation.on_tool_error_callback(tool, {}, tool_context, RuntimeError())
+
+    asyncio.run(run())
+
+    assert MODEL_SECONDS.count(agent="tutor", model="test-model", outcome="ok") == 1
+    assert MODEL_TOKENS.value(model="test-model", kind="cached") == 80
+    assert TOOL_SECONDS.count(agent="tutor", tool="get_user_info", outcome="error") == 1
+
+
+def test_metrics_route():
+    from charla_facil.a2a import a2a_app
+
+    response = TestClient(a2a_app).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE charla_rating_seconds histogram" in response.text
+    assert "charla_rating_queue_depth 0" in response.text
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from charla_facil.micro_batch import MicroBatcher
+
+
+def test_full_batch_is_flushed_in_one_call():
+    calls = []
+
+    async def batch_fn(items):
+        calls.append(items)
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(batch_fn, max_batch_size=3, max_wait=10)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(run())
+
+    assert results == [0, 2, 4]
+    assert calls == [[0, 1, 2]]
+    assert (stats.batches, stats.items, stats.avg_batch_size) == (1, 3, 3)
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    calls = []
+
+    async def batch_fn(items):
+        calls.append(items)
+        return items
+
+    async def run():
+        batcher = MicroBatcher(batch_fn, max_batch_size=32, max_wait=0.01)
+        first = await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+        second = await batcher.submit("c")
+        return first, second
+
+    assert asyncio.run(run()) == (["a", "b"], "c")
+    assert calls == [["a", "b"], ["c"]]
+
+
+def test_batch_errors_are_raised_to_every_caller():
+    async def batch_fn(items):
+        raise RuntimeError("model unavailable")
+
+    async def run():
+        batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait=10)
+        return await asyncio.gather(
+            batcher.submit(1), batcher.submit(2), return_exceptions=True), batcher.stats()
+
+    results, stats = asyncio.run(run())
+
+    assert [str(r) for r in results] == ["model unavailable"] * 2
+    assert stats.failed_batches == 1
+
+
+def test_result_count_mismatch_fails_the_batch():
+    async def batch_fn(items):
+        return items[:1]
+
+    async def run():
+        batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait=10)
+        await asyncio.gather(batcher.submit(1), batcher.submit(2))
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
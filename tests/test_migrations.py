@@ -0,0 +1,121 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from charla_facil.storage import db
+from charla_facil.storage.migrations import upgrade_schema
+from charla_facil.storage.orm_models import Base
+from charla_facil.storage.word_ranking import struggle_rankings
+from charla_facil.tools.practice_words import get_practice_words, review_interval, update_practice_words
+from charla_facil.tools.user_info import get_user_info, profile_cache
+from charla_facil.util import DEFAULT_USER_ID
+
+# Schema of the single-user version (profile id 1, practice words keyed by word)
+SINGLE_USER_SCHEMA = [
+    """CREATE TABLE practice_word (
+        word VARCHAR NOT NULL,
+        familiarity_level INTEGER NOT NULL,
+        last_used DATETIME NOT NULL,
+        correct_streak_count INTEGER NOT NULL,
+        update_count INTEGER NOT NULL,
+        PRIMARY KEY (word),
+        CONSTRAINT ck_familiarity_level_range CHECK (familiarity_level >= 0 AND familiarity_level <= 100)
+    )""",
+    """CREATE TABLE user_profile (
+        id INTEGER NOT NULL, cefr_level VARCHAR, name VARCHAR, nationality VARCHAR,
+        age INTEGER, place_of_living VARCHAR, PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE user_event (
+        id INTEGER NOT NULL, user_id INTEGER, name VARCHAR NOT NULL, date VARCHAR NOT NULL,
+        PRIMARY KEY (id), CONSTRAINT uq_user_event UNIQUE (user_id, name, date),
+        FOREIGN KEY(user_id) REFERENCES user_profile (id)
+    )""",
+    """CREATE TABLE user_interest (
+        id INTEGER NOT NULL, user_id INTEGER, interest VARCHAR NOT NULL,
+        PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES user_profile (id)
+    )""",
+]
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    monkeypatch.setattr(db, "_db", engine)
+    profile_cache.clear()
+    struggle_rankings.clear()
+    yield engine
+    engine.dispose()
+
+
+def test_single_user_database_is_upgraded(engine):
+    with engine.begin() as connection:
+        for statement in SINGLE_USER_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO user_profile (id, name, cefr_level) VALUES (1, 'Ana', 'A2')"))
+        connection.execute(text("INSERT INTO user_interest (user_id, interest) VALUES (1, 'música')"))
+        connection.execute(text("INSERT INTO user_event (user_id, name, date) VALUES (1, 'Viaje', '2024-05-01')"))
+        connection.execute(
+            text("INSERT INTO practice_word VALUES ('gato', 40, :used, 0, 3)"), {"used": datetime(2024, 5, 1)})
+
+    for _ in range(2):
+        upgrade_schema(engine)
+    Base.metadata.create_all(engine)
+
+    profile = get_user_info(user_id=DEFAULT_USER_ID)
+    assert (profile.name, profile.interests, profile.recent_events[0].name) == ("Ana", ["música"], "Viaje")
+    assert [(w["word"], w["update_count"]) for w in get_practice_words(user_id=DEFAULT_USER_ID)] == [("gato", 3)]
+
+    update_practice_words([{"word": "gato", "correctness": 4}], DEFAULT_USER_ID)
+    assert get_practice_words(user_id=DEFAULT_USER_ID)[0]["update_count"] == 4
+    assert not {"user_profile_old", "practice_word_old"} & set(inspect(engine).get_table_names())
+
+
+def test_current_schema_is_left_alone(engine):
+    Base.metadata.create_all(engine)
+    update_practice_words([{"word": "gato", "correctness": 4}], "ana")
+
+    upgrade_schema(engine)
+
+    assert get_practice_words(user_id="ana")[0]["word"] == "gato"
+
+
+def test_practice_words_without_schedule_are_scheduled(engine):
+    with engine.begin() as connection:
+        connection.execute(text("""CREATE TABLE practice_word (
+            user_id VARCHAR NOT NULL, word VARCHAR NOT NULL, familiarity_level INTEGER NOT NULL,
+            last_used DATETIME NOT NULL, correct_streak_count INTEGER NOT NULL, update_count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, word)
+        )"""))
+        connection.execute(text(
+            "CREATE INDEX ix_practice_word_struggle ON practice_word "
+            "(user_id, familiarity_level, update_count, last_used, word, correct_streak_count)"))
+        connection.execute(text("INSERT INTO practice_word VALUES ('ana', 'gato', 100, :used, 3, 5)"),
+                           {"used": datetime(2024, 5, 1)})
+
+    upgrade_schema(engine)
+    Base.metadata.create_all(engine)
+
+    word = get_practice_words(user_id="ana")[0]
+    assert word["next_due_at"] == datetime(2024, 5, 1) + review_interval(100, 3)
+    indexes = {index["name"]: index["column_names"] for index in inspect(engine).get_indexes("practice_word")}
+    assert indexes["ix_practice_word_struggle"][-1] == "next_due_at"
+    assert "ix_practice_word_due" in indexes
+
+
+def test_global_compaction_mark_is_split_per_learner(engine):
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE compaction_state (name VARCHAR NOT NULL PRIMARY KEY, last_observation_id INTEGER NOT NULL)"))
+        connection.execute(text("INSERT INTO compaction_state VALUES ('practice_word', 2)"))
+        Base.metadata.tables["word_observation"].create(connection)
+        for user_id in ["ana", "luis", "ana", "eva"]:
+            connection.execute(text(
+                "INSERT INTO word_observation (user_id, word, correctness, source, observed_at) "
+                "VALUES (:user_id, 'gato', 4, 'chat', :at)"), {"user_id": user_id, "at": datetime(2024, 5, 1)})
+
+    upgrade_schema(engine)
+
+    with engine.connect() as connection:
+        marks = dict(connection.execute(text("SELECT user_id, last_observation_id FROM compaction_state")).all())
+    assert marks == {"ana": 1, "luis": 2}
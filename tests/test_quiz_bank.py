@@ -0,0 +1,209 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from charla_facil import word_rating
+from charla_facil.agents.word_repetition_agent import QuizBatch, QuizItem
+from charla_facil.quiz_bank import STRUGGLE_TOPIC, QuizBank, generate_quiz, topic_key
+from charla_facil.storage import db
+from charla_facil.storage.orm_models import Base
+from charla_facil.storage.word_ranking import struggle_rankings
+from charla_facil.tools.practice_words import update_practice_words
+
+QUIZ_TOOL = SimpleNamespace(name="word_repetition_agent")
+
+
+@pytest.fixture(autouse=True)
+def in_memory_db(monkeypatch):
+    # Struggle words are read in a worker thread
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db, "_db", engine)
+    struggle_rankings.clear()
+    yield
+    struggle_rankings.clear()
+
+
+async def bank_db(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(db, "_async_db", engine)
+    return engine
+
+
+class StubGenerator:
+    """Stands in for the model, records the calls and the peak concurrency."""
+
+    def __init__(self, tokens: int = 100):
+        self.tokens = tokens
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+
+    async def __call__(self, topic, words):
+        self.calls.append((topic, list(words)))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        items = [QuizItem(spanish_word=w, english_translation=w, difficulty="easy") for w in words or ["hola"]]
+        return QuizBatch(topic=f"{topic} #{len(self.calls)}", items=items), self.tokens
+
+
+def context(user_id="user"):
+    return SimpleNamespace(user_id=user_id)
+
+
+def test_topic_key():
+    assert topic_key("words I'm currently struggling with") == STRUGGLE_TOPIC
+    assert topic_key("hard words about animals") != STRUGGLE_TOPIC
+    assert topic_key("  ¿Viajes? ") == topic_key("viajes")
+
+
+def test_miss_refills_the_bank_and_hits_consume_quizzes(monkeypatch):
+    generator = StubGenerator()
+
+    async def run():
+        engine = await bank_db(monkeypatch)
+        bank = QuizBank("word_repetition_agent", generator, size=3, low_watermark=2)
+
+        one_off = await bank.before_tool_callback(QUIZ_TOOL, {"request": "Travel"}, context())
+        await bank.drain()
+        assert generator.calls == []
+        # Requested again, banked from now on
+        first = await bank.before_tool_callback(QUIZ_TOOL, {"request": "travel"}, context())
+        await bank.drain()
+        served = [await bank.before_tool_callback(QUIZ_TOOL, {"request": "travel"}, context()) for _ in range(2)]
+        # Low on quizzes after the second one (1 left), refilled in the background
+        await bank.drain()
+        other_user = [await bank.before_tool_callback(QUIZ_TOOL, {"request": "travel"}, context("luis"))
+                      for _ in range(2)]
+        await bank.drain()
+        await engine.dispose()
+        return one_off, first, served, other_user, bank.stats()
+
+    one_off, first, served, other_user, stats = asyncio.run(run())
+
+    assert one_off is first is None and other_user == [None, None]
+    assert [quiz["topic"] for quiz in served] == ["travel #1", "travel #2"]
+    assert (stats.hits, stats.misses) == (2, 4)
+    # 3 for the first fill, 2 to top it up again, 3 for the other learner
+    assert stats.generated == 8
+
+
+def test_changed_struggle_list_drops_banked_quizzes(monkeypatch):
+    generator = StubGenerator()
+    request = {"request": "my struggle words"}
+
+    async def run():
+        engine = await bank_db(monkeypatch)
+        bank = QuizBank("word_repetition_agent", generator, size=2)
+        update_practice_words([{"word": "gato", "correctness": 1}])
+
+        await bank.before_tool_callback(QUIZ_TOOL, request, context())
+        await bank.drain()
+        hit = await bank.before_tool_callback(QUIZ_TOOL, request, context())
+
+        update_practice_words([{"word": "perro", "correctness": 1}])
+        stale = await bank.before_tool_callback(QUIZ_TOOL, request, context())
+        await bank.drain()
+        fresh = await bank.before_tool_callback(QUIZ_TOOL, request, context())
+        await engine.dispose()
+        return hit, stale, fresh, bank.stats()
+
+    hit, stale, fresh, stats = asyncio.run(run())
+
+    assert [item["spanish_word"] for item in hit["items"]] == ["gato"]
+    assert stale is None
+    assert stats.stale == 1
+    assert sorted(item["spanish_word"] for item in fresh["items"]) == ["gato", "perro"]
+
+
+def test_small_struggle_list_changes_keep_banked_quizzes(monkeypatch):
+    generator = StubGenerator()
+    request = {"request": "my struggle words"}
+    words = ["gato", "perro", "casa", "mesa", "libro"]
+
+    async def run():
+        engine = await bank_db(monkeypatch)
+        bank = QuizBank("word_repetition_agent", generator, size=2)
+        update_practice_words([{"word": word, "correctness": 1} for word in words])
+
+        await bank.before_tool_callback(QUIZ_TOOL, request, context())
+        await bank.drain()
+        # One more word in the list (5 of 6 shared)
+        update_practice_words([{"word": "silla", "correctness": 0}])
+        hit = await bank.before_tool_callback(QUIZ_TOOL, request, context())
+        await engine.dispose()
+        return hit, bank.stats()
+
+    hit, stats = asyncio.run(run())
+
+    assert sorted(item["spanish_word"] for item in hit["items"]) == sorted(words)
+    assert stats.stale == 0
+
+
+def test_shutdown_waits_for_running_refills(monkeypatch):
+    generator = StubGenerator()
+
+    async def run():
+        engine = await bank_db(monkeypatch)
+        bank = QuizBank("word_repetition_agent", generator, size=2)
+        bank.schedule("user", "viajes")
+        await bank.shutdown()
+        await engine.dispose()
+        return bank.stats()
+
+    assert asyncio.run(run()).generated == 2
+
+
+def test_refills_respect_token_budget_and_concurrency(monkeypatch):
+    generator = StubGenerator(tokens=100)
+
+    async def run():
+        engine = await bank_db(monkeypatch)
+        bank = QuizBank("word_repetition_agent", generator, size=3, max_concurrency=1, token_budget=250)
+        bank.schedule("user", "viajes")
+        bank.schedule("user", "viajes")  # already refilling
+        bank.schedule("user", "comida")
+        await bank.drain()
+        await engine.dispose()
+        return bank.stats()
+
+    stats = asyncio.run(run())
+
+    assert generator.peak == 1
+    assert stats.generated == 3
+    assert stats.tokens == 300
+    assert stats.over_budget == 1
+
+
+def test_generate_quiz_with_stubbed_model(monkeypatch):
+    requests = []
+
+    class StubModels:
+        async def generate_content(self, model, contents, config):
+            requests.append((contents, config))
+            quiz = {"topic": "struggle words",
+                    "items": [{"spanish_word": "el gato", "english_translation": "cat", "difficulty": "easy"}]}
+            return SimpleNamespace(
+                parsed=None, text=json.dumps(quiz),
+                usage_metadata=SimpleNamespace(
+                    prompt_token_count=30, cached_content_token_count=0,
+                    candidates_token_count=12, total_token_count=42))
+
+    monkeypatch.setattr(word_rating, "_client", SimpleNamespace(aio=SimpleNamespace(models=StubModels())))
+
+    quiz, tokens = asyncio.run(generate_quiz(STRUGGLE_TOPIC, ["gato"]))
+
+    assert quiz.items[0].english_translation == "cat"
+    assert tokens == 42
+    contents, config = requests[0]
+    assert "gato" in contents
+    assert config.response_schema is QuizBatch
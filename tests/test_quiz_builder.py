@@ -0,0 +1,118 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from charla_facil import quiz_builder
+from charla_facil.agents.word_repetition_agent import QuizBatch, word_repetition_agent
+from charla_facil.dictionary import BilingualDictionary
+from charla_facil.lemma_index import get_lemma_index
+from charla_facil.quiz_builder import LocalQuizBuilder, is_struggle_request
+
+QUIZ_TOOL = SimpleNamespace(name="word_repetition_agent")
+CONTEXT = SimpleNamespace(function_call_id="call-1")
+
+
+@pytest.fixture
+def practice_words(monkeypatch):
+    """Sets the due / hardest words returned to the builder."""
+
+    words = {"due": [], "hardest": []}
+
+    async def due(count, tool_context=None):
+        return [{"word": w} for w in words["due"][:count]]
+
+    async def hardest(count, tool_context=None):
+        return [{"word": w} for w in words["hardest"][:count]]
+
+    monkeypatch.setattr(quiz_builder, "get_due_practice_words_async", due)
+    monkeypatch.setattr(quiz_builder, "get_practice_words_async", hardest)
+    return words
+
+
+def run_callback(builder, request):
+    return asyncio.run(builder.before_tool_callback(QUIZ_TOOL, {"request": request}, CONTEXT))
+
+
+def test_dictionary_build_and_lookup(tmp_path):
+    path = str(tmp_path / "dictionary.tsv")
+    count = BilingualDictionary.build([
+        ("Gato", "El", "cat", "easy"),
+        ("gato", "el", "duplicate", "easy"),
+        ("ir", "", "to go", "easy"),
+        ("mal", "", "badly", "trivial"),
+        ("incomplete", "", "row"),
+    ], path)
+    dictionary = BilingualDictionary(path)
+
+    assert count == 2
+    assert dictionary.entry("gato").spanish == "el gato"
+    assert dictionary.entry("gatos").english == "cat"  # through the lemma index
+    assert dictionary.entry("voy").spanish == "ir"
+    assert dictionary.entry("mal") is None
+    dictionary.close()
+
+
+def test_packaged_dictionary_covers_the_lemma_index():
+    dictionary = BilingualDictionary()
+    lemmas = {lemma for _, lemma in get_lemma_index()}
+    assert [lemma for lemma in sorted(lemmas) if dictionary.lookup(lemma) is None] == []
+    # Dictionary words are never mapped to another entry
+    assert [word for word, _ in dictionary if get_lemma_index().lookup(word)] == []
+
+
+@pytest.mark.parametrize("request_text, expected", [
+    ("words I'm currently struggling with", True),
+    ("Quiz me on my weakest words", True),
+    ("palabras difíciles", True),
+    ("Kitchen items", False),
+    ("Travel", False),
+    ("Practice the words I struggle with from this week", True),
+    ("mis palabras difíciles para hoy", True),
+    # Struggle wording restricted to a topic
+    ("Give me a quiz of hard words about animals", False),
+    ("practice words related to food", False),
+    ("difficult words in cooking vocabulary", False),
+    ("palabras difíciles sobre la comida", False),
+])
+def test_is_struggle_request(request_text, expected):
+    assert is_struggle_request(request_text) == expected
+
+
+def test_struggle_quiz_is_built_locally(practice_words):
+    practice_words["due"] = ["gatos", "casa"]
+    practice_words["hardest"] = ["perro", "gato", "voy", "xyzzy", "libro", "agua"]
+    builder = LocalQuizBuilder("word_repetition_agent", min_items=5)
+
+    quiz = QuizBatch.model_validate(run_callback(builder, "words I'm currently struggling with"))
+
+    assert [item.spanish_word for item in quiz.items] == ["el gato", "la casa", "el perro", "ir", "el libro", "el agua"]
+    assert quiz.items[0].english_translation == "cat"
+    assert {item.difficulty for item in quiz.items} <= {"easy", "medium", "hard"}
+    assert builder.stats().local == 1
+
+
+def test_falls_back_to_the_agent(practice_words):
+    builder = LocalQuizBuilder("word_repetition_agent", min_items=5)
+
+    # Free-form topic
+    assert run_callback(builder, "Kitchen items") is None
+    # No practice words yet
+    assert run_callback(builder, "my struggle words") is None
+    # Due word missing from the dictionary
+    practice_words["due"] = ["gato", "xyzzy"]
+    assert run_callback(builder, "my struggle words") is None
+    # Too few fill-up words in the dictionary
+    practice_words["due"] = []
+    practice_words["hardest"] = ["gato", "xyzzy", "qwerty", "perro", "zzz"]
+    assert run_callback(builder, "my struggle words") is None
+
+    assert builder.stats().fallbacks == 3
+    assert run_callback(LocalQuizBuilder("other_tool"), "my struggle words") is None
+
+
+def test_agent_tools_are_declared_under_the_sync_names():
+    names = [tool._get_declaration().name for tool in word_repetition_agent.tools]
+
+    assert names == ["get_due_practice_words", "get_practice_words"]
+    assert "_async" not in word_repetition_agent.instruction
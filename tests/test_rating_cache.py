@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from charla_facil.cache import TTLCache
+from charla_facil.rating_cache import RatingCache, normalize_message
+from charla_facil.storage import db
+from charla_facil.storage.orm_models import Base, RatingCacheORM
+
+
+@pytest.fixture
+def in_memory_db(monkeypatch):
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(db, "_db", engine)
+    return engine
+
+
+def test_normalize_message_ignores_case_and_whitespace_but_keeps_accents():
+    assert normalize_message("  Tengo   un GATO.\n") == "tengo un gato."
+    assert normalize_message("canción") != normalize_message("cancion")
+
+
+def test_equivalent_messages_share_a_key():
+    cache = RatingCache("v1")
+    cache.put("Tengo un gato.", [{"word": "gato", "correctness": 4}])
+
+    assert cache.get("tengo  UN gato.") == [{"word": "gato", "correctness": 4}]
+    assert cache.get("Tengo un perro.") is None
+    assert cache.stats().memory_hits == 1
+    assert cache.stats().misses == 1
+
+
+def test_version_change_misses():
+    old, new = RatingCache("v1"), RatingCache("v2")
+    old.put("Hola", [{"word": "hola", "correctness": 4}])
+
+    assert old.key("Hola") != new.key("Hola")
+    assert new.get("Hola") is None
+
+
+def test_ttl_cache_expires_and_evicts():
+    now = [0.0]
+    cache = TTLCache(max_size=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=100)
+
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+    cache.set("c", 3)
+    cache.set("d", 4)
+    assert cache.get("b") is None
+
+    stats = cache.stats()
+    assert (stats.expirations, stats.evictions, stats.size) == (1, 1, 2)
+
+
+def test_persistent_tier_survives_memory_clear(in_memory_db):
+    cache = RatingCache("v1", persistent=True)
+    cache.put("Tengo un gato.", [{"word": "gato", "correctness": 4}])
+    cache.clear()
+
+    assert cache.get("Tengo un gato.") == [{"word": "gato", "correctness": 4}]
+    assert cache.stats().persistent_hits == 1
+
+    # Refilled in memory
+    assert cache.get("Tengo un gato.") is not None
+    assert cache.stats().memory_hits == 1
+
+
+def test_persistent_tier_ignores_expired_rows(in_memory_db):
+    cache = RatingCache("v1", ttl=-1, persistent=True)
+    cache.put("Hola", [{"word": "hola", "correctness": 4}])
+    cache.clear()
+
+    assert cache.get("Hola") is None
+    with Session(in_memory_db) as session:
+        assert session.query(RatingCacheORM).count() == 0
+
+
+def test_persistent_tier_async(monkeypatch):
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        monkeypatch.setattr(db, "_async_db", engine)
+
+        cache = RatingCache("v1", persistent=True)
+        await cache.put_async("Hola", [{"word": "hola", "correctness": 4}])
+        cache.clear()
+        return await cache.get_async("Hola")
+
+    assert asyncio.run(run()) == [{"word": "hola", "correctness": 4}]
@@ -0,0 +1,95 @@
+import asyncio
+
+from charla_facil.rating_pipeline import QueuePolicy, RatingPipeline
+
+
+def test_submit_returns_before_handler_finishes_and_drain_waits():
+    rated = []
+
+    async def handler(message, user_id):
+        await asyncio.sleep(0.05)
+        rated.append(message)
+
+    async def run():
+        pipeline = RatingPipeline(handler, workers=2)
+        assert await pipeline.submit("s1", "u1", "hola")
+        assert await pipeline.submit("s2", "u2", "adiós")
+        assert rated == []
+
+        assert await pipeline.drain(timeout=1)
+        await pipeline.shutdown()
+        return pipeline.stats()
+
+    stats = asyncio.run(run())
+
+    assert sorted(rated) == ["adiós", "hola"]
+    assert stats.processed == 2
+    assert stats.queue_depth == 0
+    assert stats.max_lag_ms >= 0
+
+
+def test_sync_handler_runs_in_thread():
+    rated = []
+
+    async def run():
+        pipeline = RatingPipeline(lambda message, user_id: rated.append((user_id, message)), workers=1)
+        await pipeline.submit("s1", "u1", "gracias")
+        await pipeline.shutdown()
+
+    asyncio.run(run())
+
+    assert rated == [("u1", "gracias")]
+
+
+def _blocked_pipeline(policy, rated):
+    release = asyncio.Event()
+
+    async def handler(message, user_id):
+        await release.wait()
+        rated.append(message)
+
+    return RatingPipeline(handler, workers=1, max_queue_size=2, policy=policy, block_timeout=0.01), release
+
+
+def test_full_queue_policies():
+    async def run(policy):
+        rated = []
+        pipeline, release = _blocked_pipeline(policy, rated)
+
+        await pipeline.submit("s1", "u1", "uno")
+        await asyncio.sleep(0)  # worker picks "uno" and blocks
+        await pipeline.submit("s1", "u1", "dos")
+        await pipeline.submit("s2", "u2", "tres")
+        accepted = await pipeline.submit("s1", "u1", "cuatro")
+
+        release.set()
+        await pipeline.shutdown(timeout=1)
+        return accepted, rated, pipeline.stats()
+
+    accepted, rated, stats = asyncio.run(run(QueuePolicy.DROP_NEWEST))
+    assert not accepted
+    assert rated == ["uno", "dos", "tres"]
+    assert stats.dropped == 1
+
+    accepted, rated, stats = asyncio.run(run(QueuePolicy.DROP_OLDEST))
+    assert accepted
+    assert rated == ["uno", "tres", "cuatro"]
+
+    accepted, rated, stats = asyncio.run(run(QueuePolicy.MERGE))
+    assert accepted
+    assert rated == ["uno", "dos\ncuatro", "tres"]
+    assert stats.merged == 1
+
+    accepted, rated, stats = asyncio.run(run(QueuePolicy.BLOCK))
+    assert not accepted
+    assert rated == ["uno", "dos", "tres"]
+
+
+def test_shutdown_rejects_new_messages():
+    async def run():
+        pipeline = RatingPipeline(lambda message, user_id: None)
+        await pipeline.submit("s1", "u1", "hola")
+        await pipeline.shutdown()
+        return await pipeline.submit("s1", "u1", "otra vez")
+
+    assert asyncio.run(run()) is False
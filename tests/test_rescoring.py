@@ -0,0 +1,167 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, delete, insert, update
+from sqlalchemy.orm import Session
+
+from charla_facil.storage import db
+from charla_facil.storage.orm_models import Base, CompactionStateORM, PracticeWordORM, WordObservationORM
+from charla_facil.tools.practice_words import fold_word_observations, update_practice_words
+
+np = pytest.importorskip("numpy")
+
+from charla_facil import rescoring  # noqa: E402
+from charla_facil.rescoring import rescore_from_log, rescore_observations, write_rescored_words  # noqa: E402
+
+
+def random_observations(count, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    observations = []
+    for _ in range(count):
+        observations.append((
+            rng.choice(["ana", "luis", "eva"]),
+            rng.choice(["gato", "perro", "ser", "estar", "comer", "ir"]),
+            rng.randint(0, 4),
+            start + timedelta(minutes=rng.randint(0, 60 * 24 * 120)),
+        ))
+    return observations
+
+
+def reference_fold(observations):
+    grouped = defaultdict(list)
+    for user_id, word, correctness, observed_at in sorted(observations, key=lambda o: o[3]):
+        grouped[(user_id, word)].append((correctness, observed_at))
+    return {key: fold_word_observations(None, obs) for key, obs in grouped.items()}
+
+
+@pytest.mark.parametrize("vector_min_pairs", [0, rescoring.VECTOR_MIN_PAIRS, 10**9])
+def test_vectorized_rescoring_matches_reference_implementation(monkeypatch, vector_min_pairs):
+    # All steps as arrays, the default split, and all words folded one by one
+    monkeypatch.setattr(rescoring, "VECTOR_MIN_PAIRS", vector_min_pairs)
+    observations = random_observations(3000)
+    user_ids, words, correctness, observed_at = zip(*observations)
+
+    rescored = rescore_observations(user_ids, words, correctness, observed_at)
+    expected = reference_fold(observations)
+
+    assert len(rescored) == len(expected)
+    for row in rescored.rows():
+        ref = expected[(row["user_id"], row["word"])]
+        assert row["familiarity_level"] == ref["familiarity_level"]
+        assert row["correct_streak_count"] == ref["correct_streak_count"]
+        assert row["update_count"] == ref["update_count"]
+        assert row["last_used"] == ref["last_used"]
+        assert abs(row["next_due_at"] - ref["next_due_at"]) < timedelta(milliseconds=1)
+
+
+def test_rescoring_of_one_learners_log_matches_reference_implementation():
+    # Chronological input of a single learner, the order rescore_from_log reads the log in
+    observations = sorted((o for o in random_observations(3000) if o[0] == "ana"), key=lambda o: o[3])
+    _, words, correctness, observed_at = zip(*observations)
+
+    rescored = rescore_observations("ana", words, correctness, observed_at)
+    expected = reference_fold(observations)
+
+    assert len(rescored) == len(expected)
+    for row in rescored.rows():
+        ref = expected[("ana", row["word"])]
+        assert row["familiarity_level"] == ref["familiarity_level"]
+        assert row["correct_streak_count"] == ref["correct_streak_count"]
+        assert row["update_count"] == ref["update_count"]
+        assert row["last_used"] == ref["last_used"]
+
+
+def test_write_rescored_words_replaces_stored_state(monkeypatch):
+    test_engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(test_engine)
+    monkeypatch.setattr(db, "_db", test_engine)
+
+    with Session(test_engine) as session:
+        session.add(PracticeWordORM(user_id="ana", word="gato", familiarity_level=99))
+        session.commit()
+
+    now = datetime(2024, 5, 1)
+    rescored = rescore_observations(
+        "ana", ["gato", "gato", "perro"], [0, 0, 4], [now, now + timedelta(hours=1), now])
+    write_rescored_words(rescored, chunk_size=1)
+
+    with Session(test_engine) as session:
+        gato = session.get(PracticeWordORM, ("ana", "gato"))
+        perro = session.get(PracticeWordORM, ("ana", "perro"))
+        assert gato.familiarity_level == 4
+        assert gato.update_count == 2
+        assert perro.familiarity_level == 70
+
+
+def test_rescore_from_log_matches_snapshot(monkeypatch):
+    test_engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(test_engine)
+    monkeypatch.setattr(db, "_db", test_engine)
+
+    for correctness in [0, 4, 4, 2]:
+        update_practice_words([{"word": "mesa", "correctness": correctness}], user_id="ana")
+
+    with Session(test_engine) as session:
+        before = session.get(PracticeWordORM, ("ana", "mesa")).familiarity_level
+
+    rescored = rescore_from_log("ana")
+
+    assert rescored.familiarity_level.tolist() == [before]
+
+
+def test_rescore_from_log_moves_the_compaction_mark(monkeypatch):
+    test_engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(test_engine)
+    monkeypatch.setattr(db, "_db", test_engine)
+
+    for user_id in ["ana", "luis"]:
+        update_practice_words([{"word": "mesa", "correctness": 0}], user_id=user_id)
+    with Session(test_engine) as session:
+        # Logged but not compacted yet
+        session.execute(delete(PracticeWordORM))
+        session.execute(update(CompactionStateORM).values(last_observation_id=0))
+        session.commit()
+
+    rescored = rescore_from_log(chunk_size=1)
+    update_practice_words([{"word": "mesa", "correctness": 0}], user_id="ana")
+
+    assert sorted(rescored.user_id.tolist()) == ["ana", "luis"]
+    with Session(test_engine) as session:
+        # Every rating applied once, by the re-scoring or by the next compaction
+        assert session.get(PracticeWordORM, ("ana", "mesa")).update_count == 2
+        assert session.get(PracticeWordORM, ("luis", "mesa")).update_count == 1
+        assert session.get(CompactionStateORM, "luis").last_observation_id == 2
+
+
+def test_rescore_from_log_keeps_words_rated_before_the_log(monkeypatch):
+    test_engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(test_engine)
+    monkeypatch.setattr(db, "_db", test_engine)
+
+    now = datetime.now()
+    with Session(test_engine) as session:
+        # Migrated database: 20 ratings folded before the word_observation log existed
+        session.add(PracticeWordORM(
+            user_id="ana", word="mesa", familiarity_level=90, correct_streak_count=6,
+            update_count=20, last_used=now, next_due_at=now + timedelta(days=30)))
+        session.commit()
+    update_practice_words([{"word": "mesa", "correctness": 4}], user_id="ana")
+    update_practice_words([{"word": "gato", "correctness": 4}], user_id="ana")
+    with Session(test_engine) as session:
+        # A rating logged but not compacted yet
+        session.execute(insert(WordObservationORM).values(
+            user_id="ana", word="mesa", correctness=4, source="chat", observed_at=datetime.now()))
+        session.commit()
+
+    rescored = rescore_from_log("ana")
+
+    assert rescored.word.tolist() == ["gato"]
+    with Session(test_engine) as session:
+        mesa = session.get(PracticeWordORM, ("ana", "mesa"))
+        assert mesa.update_count == 22
+        assert mesa.familiarity_level >= 90
+        assert mesa.correct_streak_count == 8
+        assert session.get(CompactionStateORM, "ana").last_observation_id == 3
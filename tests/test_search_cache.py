@@ -0,0 +1,124 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from charla_facil.search_cache import (
+    CULTURE,
+    NEWS,
+    REFUSAL,
+    SCHEDULE,
+    SearchResultCache,
+    classify_query,
+    normalize_query,
+)
+from charla_facil.storage import db
+from charla_facil.storage.orm_models import Base
+
+SEARCH_TOOL = SimpleNamespace(name="safe_web_search_agent")
+
+
+def call(cache, query, call_id, run_tool):
+    """Runs the callbacks around a tool call the way ADK does, returns (response, tool ran)."""
+
+    async def run():
+        args = {"request": query}
+        context = SimpleNamespace(function_call_id=call_id)
+        response = await cache.before_tool_callback(SEARCH_TOOL, args, context)
+        ran = response is None
+        if ran:
+            response = run_tool(query)
+        await cache.after_tool_callback(SEARCH_TOOL, args, context, response)
+        return response, ran
+
+    return asyncio.run(run())
+
+
+def test_normalize_query_ignores_case_accents_and_punctuation():
+    assert normalize_query("¿Qué es  La Tomatina?") == normalize_query("que es la tomatina")
+
+
+def test_classify_query():
+    now = datetime(2026, 5, 1)
+    assert classify_query(normalize_query("Noticias de fútbol"), now) == NEWS
+    assert classify_query(normalize_query("Ganador del Goya 2026"), now) == NEWS
+    assert classify_query(normalize_query("Horario del Museo del Prado"), now) == SCHEDULE
+    assert classify_query(normalize_query("Historia de la Tomatina en 1945"), now) == CULTURE
+
+
+def test_repeated_query_is_served_from_cache():
+    cache = SearchResultCache("safe_web_search_agent", "v1")
+    calls = []
+
+    def search(query):
+        calls.append(query)
+        return {"result": "La Tomatina es una fiesta en Buñol."}
+
+    first, first_ran = call(cache, "¿Qué es la Tomatina?", "call-1", search)
+    second, second_ran = call(cache, "que es la tomatina", "call-2", search)
+
+    assert first_ran and not second_ran
+    assert first == second
+    assert calls == ["¿Qué es la Tomatina?"]
+    stats = cache.stats()
+    assert (stats.memory_hits, stats.misses, stats.stores) == (1, 1, 1)
+
+
+def test_refusals_are_cached_and_errors_are_not():
+    cache = SearchResultCache("safe_web_search_agent", "v1")
+
+    call(cache, "precio de la cocaina", "call-1", lambda q: {"result": "Refusal: unsafe request"})
+    _, ran = call(cache, "precio de la cocaina", "call-2", lambda q: {"result": "unused"})
+    assert not ran
+    assert cache.stats().refusal_hits == 1
+
+    call(cache, "museo del prado", "call-3", lambda q: {"error": "timeout"})
+    _, ran = call(cache, "museo del prado", "call-4", lambda q: {"result": "ok"})
+    assert ran
+
+
+def test_expired_entries_are_searched_again():
+    cache = SearchResultCache("safe_web_search_agent", "v1", ttls={NEWS: 0})
+
+    call(cache, "noticias de hoy", "call-1", lambda q: {"result": "old"})
+    response, ran = call(cache, "noticias de hoy", "call-2", lambda q: {"result": "new"})
+    assert ran and response == {"result": "new"}
+
+
+def test_other_tools_and_version_changes_are_not_cached():
+    cache = SearchResultCache("safe_web_search_agent", "v1")
+    other_tool = SimpleNamespace(name="word_repetition_agent")
+
+    async def run():
+        context = SimpleNamespace(function_call_id="call-1")
+        await cache.after_tool_callback(other_tool, {"request": "hola"}, context, {"result": "quiz"})
+        return await cache.before_tool_callback(other_tool, {"request": "hola"}, context)
+
+    assert asyncio.run(run()) is None
+    assert cache.stats().stores == 0
+    assert SearchResultCache("safe_web_search_agent", "v2").key("hola") != cache.key("hola")
+
+
+def test_persistent_tier_survives_a_cleared_memory(monkeypatch):
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        monkeypatch.setattr(db, "_async_db", engine)
+
+        cache = SearchResultCache("safe_web_search_agent", "v1", persistent=True)
+        assert await cache.put_async("Qué es la Tomatina", {"result": "Una fiesta."}) == CULTURE
+        cache.clear()
+        response = await cache.get_async("que es la tomatina")
+        return response, cache.stats()
+
+    response, stats = asyncio.run(run())
+    assert response == {"result": "Una fiesta."}
+    assert stats.persistent_hits == 1
+
+
+def test_refusal_category():
+    cache = SearchResultCache("safe_web_search_agent", "v1")
+    assert asyncio.run(cache.put_async("algo", "REFUSAL: not allowed")) == REFUSAL
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from google.adk.utils.instructions_utils import inject_session_state
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from charla_facil import session_bootstrap
+from charla_facil.session_bootstrap import (
+    PRACTICE_WORDS_STATE_KEY,
+    PROFILE_STATE_KEY,
+    bootstrap_session_callback,
+    refresh_profile_callback,
+    session_instruction,
+)
+from charla_facil.storage import db
+from charla_facil.storage.orm_models import Base
+from charla_facil.storage.word_ranking import struggle_rankings
+from charla_facil.tools.practice_words import update_practice_words_async
+from charla_facil.tools.user_info import profile_cache, save_user_info_async
+
+
+@pytest.fixture(autouse=True)
+def clean_caches():
+    profile_cache.clear()
+    struggle_rankings.clear()
+    yield
+    profile_cache.clear()
+    struggle_rankings.clear()
+
+
+def context(user_id="ana"):
+    """Callback / tool context stand-in: session state and the user of the invocation."""
+    return SimpleNamespace(state={}, user_id=user_id)
+
+
+async def in_memory_db(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    monkeypatch.setattr(db, "_async_db", engine)
+    return engine
+
+
+def test_bootstrap_preloads_profile_and_struggle_words(monkeypatch):
+    async def run():
+        engine = await in_memory_db(monkeypatch)
+        ctx = context()
+        await save_user_info_async({"name": "Ana", "cefr_level": "A2"}, ctx)
+        await update_practice_words_async([{"word": "gato", "correctness": 1}], "ana")
+
+        await bootstrap_session_callback(ctx)
+        await engine.dispose()
+        return ctx.state, await inject_session_state(session_instruction, SimpleNamespace(
+            state=ctx.state, _invocation_context=SimpleNamespace(session=SimpleNamespace(state=ctx.state))))
+
+    state, instruction = asyncio.run(run())
+
+    assert json.loads(state[PROFILE_STATE_KEY])["cefr_level"] == "A2"
+    assert state[PRACTICE_WORDS_STATE_KEY].startswith("gato (")
+    assert '"name":"Ana"' in instruction
+
+
+def test_bootstrap_loads_profile_once_and_refreshes_struggle_words(monkeypatch):
+    calls = []
+    words = []
+
+    async def get_user_info(max_events, tool_context):
+        calls.append(max_events)
+        return session_bootstrap.UserProfile()
+
+    async def get_practice_words(count, tool_context):
+        return list(words)
+
+    monkeypatch.setattr(session_bootstrap, "get_user_info_async", get_user_info)
+    monkeypatch.setattr(session_bootstrap, "get_practice_words_async", get_practice_words)
+
+    async def run():
+        ctx = context()
+        await bootstrap_session_callback(ctx)
+        assert ctx.state[PRACTICE_WORDS_STATE_KEY] == "none yet"
+        words.append({"word": "gato", "familiarity_level": 10})
+        await bootstrap_session_callback(ctx)
+        return ctx.state
+
+    state = asyncio.run(run())
+    assert len(calls) == 1
+    assert state[PRACTICE_WORDS_STATE_KEY] == "gato (10)"
+
+
+def test_failed_bootstrap_leaves_state_empty(monkeypatch):
+    async def failing(*args):
+        raise ConnectionError("database down")
+
+    monkeypatch.setattr(session_bootstrap, "get_user_info_async", failing)
+    monkeypatch.setattr(session_bootstrap, "get_practice_words_async", failing)
+
+    ctx = context()
+    assert asyncio.run(bootstrap_session_callback(ctx)) is None
+    assert ctx.state == {}
+
+
+def test_preloaded_profile_is_refreshed_after_save(monkeypatch):
+    save_tool = SimpleNamespace(name="save_user_info")
+
+    async def run():
+        engine = await in_memory_db(monkeypatch)
+        ctx = context()
+        await bootstrap_session_callback(ctx)
+        await save_user_info_async({"cefr_level": "B1"}, ctx)
+        assert await refresh_profile_callback(save_tool, {}, ctx, {"status": "success"}) is None
+        await engine.dispose()
+        return ctx.state
+
+    state = asyncio.run(run())
+    assert json.loads(state[PROFILE_STATE_KEY])["cefr_level"] == "B1"
@@ -0,0 +1,62 @@
+import pytest
+
+from charla_facil.spanish_filter import SpanishFilter, load_lexicon
+
+
+@pytest.fixture
+def spanish_filter():
+    return SpanishFilter(load_lexicon())
+
+
+@pytest.mark.parametrize("message", [
+    "Tengo un gato.",
+    "I want manzana",
+    "¿Qué tal?",
+    "Ayer fui a la playa",
+    "The informacion is wrong",
+    "cancion",
+])
+def test_messages_with_spanish_are_rated(spanish_filter, message):
+    assert spanish_filter.should_rate(message)
+
+
+@pytest.mark.parametrize("message", [
+    "Hello, how are you?",
+    "ok thanks, see you tomorrow",
+    "lol 😂😂",
+    "https://es.wikipedia.org/wiki/Gato",
+    "I was on sale at the van with a solo idea",
+    "12:30 ??",
+])
+def test_messages_without_spanish_are_skipped(spanish_filter, message):
+    assert not spanish_filter.should_rate(message)
+
+
+def test_min_tokens():
+    spanish_filter = SpanishFilter(load_lexicon(), min_tokens=2)
+
+    assert not spanish_filter.should_rate("I want manzana")
+    assert spanish_filter.should_rate("I want una manzana")
+
+
+def test_disabled_filter_rates_everything():
+    spanish_filter = SpanishFilter(load_lexicon(), enabled=False)
+
+    assert spanish_filter.should_rate("Hello")
+    assert spanish_filter.stats().checked == 0
+
+
+def test_stats(spanish_filter):
+    for message in ["Hola", "Hello", "Thanks"]:
+        spanish_filter.should_rate(message)
+
+    stats = spanish_filter.stats()
+    assert (stats.checked, stats.skipped) == (3, 2)
+    assert stats.skip_rate == pytest.approx(2 / 3)
+
+
+def test_custom_lexicon(tmp_path):
+    path = tmp_path / "words.txt"
+    path.write_text("# comment\nPingüino\n", encoding="utf-8")
+
+    assert load_lexicon(str(path)) == frozenset({"pinguino"})
@@ -0,0 +1,136 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from charla_facil import word_rating
+from charla_facil.micro_batch import MicroBatcher
+
+
+@pytest.fixture(autouse=True)
+def clear_rating_cache():
+    word_rating.rating_cache.clear()
+    word_rating.rating_context_cache.clear()
+    yield
+    word_rating.rating_cache.clear()
+    word_rating.rating_context_cache.clear()
+
+
+class FakeModels:
+    def __init__(self, updates):
+        self.updates = updates
+        self.calls = []
+
+    async def generate_content(self, model, contents, config):
+        self.calls.append(contents)
+        return SimpleNamespace(function_calls=[
+            SimpleNamespace(name="update_practice_words",
+                            args={"updates": self.updates})
+        ])
+
+
+def fake_client(updates):
+    models = FakeModels(updates)
+    return SimpleNamespace(aio=SimpleNamespace(models=models)), models
+
+
+def test_rate_word_use_async_applies_model_updates(monkeypatch):
+    client, models = fake_client([{"word": "gato", "correctness": 4}])
+    applied = []
+
+    async def fake_update(updates, user_id):
+        applied.append((user_id, updates))
+
+    monkeypatch.setattr(word_rating, "_client", client)
+    monkeypatch.setattr(word_rating, "update_practice_words_async", fake_update)
+
+    asyncio.run(word_rating.rate_word_use_async("Tengo un gato.", "u1"))
+
+    assert models.calls == ["Tengo un gato."]
+    assert applied == [("u1", [{"word": "gato", "correctness": 4}])]
+
+
+def test_rate_word_use_async_skips_empty_messages(monkeypatch):
+    client, models = fake_client([])
+    monkeypatch.setattr(word_rating, "_client", client)
+
+    asyncio.run(word_rating.rate_word_use_async("   "))
+
+    assert models.calls == []
+
+
+def test_rate_word_use_async_reuses_cached_ratings(monkeypatch):
+    client, models = fake_client([{"word": "gato", "correctness": 4}])
+    applied = []
+
+    async def fake_update(updates, user_id):
+        applied.append(user_id)
+
+    monkeypatch.setattr(word_rating, "_client", client)
+    monkeypatch.setattr(word_rating, "update_practice_words_async", fake_update)
+
+    asyncio.run(word_rating.rate_word_use_async("Tengo un gato.", "u1"))
+    asyncio.run(word_rating.rate_word_use_async("tengo un  gato.", "u2"))
+
+    assert models.calls == ["Tengo un gato."]
+    assert applied == ["u1", "u2"]
+
+
+def test_rate_word_use_async_skips_messages_without_spanish(monkeypatch):
+    client, models = fake_client([])
+    monkeypatch.setattr(word_rating, "_client", client)
+
+    asyncio.run(word_rating.rate_word_use_async("Sounds good, thanks!"))
+
+    assert models.calls == []
+
+
+def test_concurrent_messages_are_rated_in_one_batch(monkeypatch):
+    calls = []
+
+    async def generate_content(model, contents, config):
+        messages = json.loads(contents)
+        calls.append(messages)
+        return SimpleNamespace(function_calls=[
+            SimpleNamespace(name="update_practice_words_batch", args={"ratings": [
+                {"message_id": m["message_id"], "updates": [{"word": m["message"].split()[-1], "correctness": 4}]}
+                for m in messages if m["message_id"] != 2
+            ]})
+        ])
+
+    client = SimpleNamespace(aio=SimpleNamespace(models=SimpleNamespace(generate_content=generate_content)))
+    applied = []
+
+    async def fake_update(updates, user_id):
+        applied.append((user_id, updates[0]["word"]))
+
+    monkeypatch.setattr(word_rating, "_client", client)
+    monkeypatch.setattr(word_rating, "update_practice_words_async", fake_update)
+    monkeypatch.setattr(word_rating, "rating_batcher", MicroBatcher(
+        word_rating._rate_messages, max_batch_size=3, max_wait=10))
+
+    async def run():
+        await asyncio.gather(
+            word_rating.rate_word_use_async("Tengo un gato", "u1"),
+            word_rating.rate_word_use_async("Tengo un perro", "u2"),
+            word_rating.rate_word_use_async("Tengo una casa", "u3"),
+        )
+
+    asyncio.run(run())
+
+    assert len(calls) == 1
+    assert [m["message"] for m in calls[0]] == ["Tengo un gato", "Tengo un perro", "Tengo una casa"]
+    # The message the model did not rate is skipped
+    assert sorted(applied) == [("u1", "gato"), ("u2", "perro")]
+
+
+def test_batch_prompt_only_asks_for_the_batch_call():
+    prompt = word_rating._batch_system_prompt
+
+    assert "You MUST call `update_practice_words_batch` exactly once" in prompt
+    assert "`update_practice_words` " not in prompt
+    assert "`update_practice_words`" in word_rating._system_prompt
+    # Both prompts grade with the same rubric
+    assert word_rating._rating_rules in prompt
+    assert word_rating._rating_rules in word_rating._system_prompt
@@ -0,0 +1,29 @@
+"""Minimal stdio MCP server for the process pool tests."""
+
+import os
+
+from mcp.server.fastmcp import FastMCP
+
+server = FastMCP("stub")
+
+
+@server.tool()
+def echo(text: str) -> str:
+    """Returns the text."""
+    return text
+
+
+@server.tool()
+def pid() -> int:
+    """Process id of the server."""
+    return os.getpid()
+
+
+@server.tool()
+def crash() -> None:
+    """Exits the server process."""
+    os._exit(1)
+
+
+if __name__ == "__main__":
+    server.run("stdio")
@@ -0,0 +1,82 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams
+from mcp import StdioServerParameters
+
+from charla_facil.tools.mcp.process_pool import McpProcessPool, PooledMcpToolset
+
+STUB_SERVER = StdioServerParameters(
+    command=sys.executable, args=[str(Path(__file__).with_name("mcp_stub_server.py"))])
+
+
+async def _pid(session) -> int:
+    result = await session.call_tool("pid", {})
+    return int(result.content[0].text)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except OSError:
+        return False
+
+
+def test_pool_multiplexes_warm_processes():
+    async def run():
+        pool = McpProcessPool(STUB_SERVER, size=2, timeout=20, health_interval=0)
+        await pool.start()
+        assert pool.stats().ready == 2
+
+        sessions = [await pool.session() for _ in range(4)]
+        pids = await asyncio.gather(*(_pid(s) for s in sessions))
+        echoes = await asyncio.gather(*(s.call_tool("echo", {"text": f"hola {i}"}) for i, s in enumerate(sessions)))
+
+        await pool.close()
+        await asyncio.sleep(0.2)
+        return pids, [e.content[0].text for e in echoes], pool.stats()
+
+    pids, echoes, stats = asyncio.run(run())
+    assert len(set(pids)) == 2
+    assert echoes == [f"hola {i}" for i in range(4)]
+    assert stats.ready == 0 and stats.starts == 2
+    assert not any(_alive(pid) for pid in set(pids))
+
+
+def test_crashed_process_is_restarted():
+    async def run():
+        pool = McpProcessPool(STUB_SERVER, size=1, timeout=20, health_interval=0)
+        session = await pool.session()
+        first = await _pid(session)
+
+        with pytest.raises(Exception):
+            await asyncio.wait_for(session.call_tool("crash", {}), 5)
+
+        assert await pool.check_health() == 1
+        second = await _pid(await pool.session())
+        stats = pool.stats()
+        await pool.close()
+        return first, second, stats
+
+    first, second, stats = asyncio.run(run())
+    assert first != second
+    assert stats.restarts == 1
+
+
+def test_pooled_toolset_lists_and_calls_tools():
+    async def run():
+        toolset = PooledMcpToolset(
+            connection_params=StdioConnectionParams(server_params=STUB_SERVER, timeout=20), pool_size=1)
+        await toolset.start()
+        tools = {tool.name: tool for tool in await toolset.get_tools()}
+        result = await tools["echo"]._run_async_impl(args={"text": "buenos días"}, tool_context=None, credential=None)
+        await toolset.close()
+        return sorted(tools), result
+
+    names, result = asyncio.run(run())
+    assert names == ["crash", "echo", "pid"]
+    assert result["content"][0]["text"] == "buenos días"
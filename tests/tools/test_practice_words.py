@@ -1,16 +1,35 @@
+import asyncio
+import time
 from datetime import datetime, timedelta
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
 from charla_facil.storage import db
-from charla_facil.storage.orm_models import PracticeWordORM, Base
+from charla_facil.storage.orm_models import Base, CompactionStateORM, PracticeWordORM, WordObservationORM
+from charla_facil.tools import practice_words
 from charla_facil.tools.practice_words import (
+    MAX_INTERVAL,
+    MIN_INTERVAL,
+    ObservationSource,
     PracticeWordSchema,
+    compact_pending_observations,
+    decay_familiarity,
+    get_due_practice_words,
     get_practice_words,
+    get_practice_words_async,
+    initial_familiarity,
+    merge_lemma_duplicates,
     update_practice_words,
+    update_practice_words_async,
+    review_interval,
+    wait_for_warmups,
     WordCorrectness,
 )
+from charla_facil.storage.word_ranking import StruggleRanking, StruggleRankingCache, struggle_rankings
+from charla_facil.util import DEFAULT_USER_ID
 
 
 @pytest.fixture(autouse=True)
@@ -19,7 +38,9 @@ def in_memory_db(monkeypatch):
     Replaces the global engine with an in-memory SQLite engine.
     Ensures tests are isolated and have a clean DB each time.
     """
-    test_engine = create_engine("sqlite:///:memory:", echo=False)
+    # Shared with the thread loading struggle rankings
+    test_engine = create_engine(
+        "sqlite:///:memory:", echo=False, poolclass=StaticPool, connect_args={"check_same_thread": False})
 
     # Create schema
     Base.metadata.create_all(test_engine)
@@ -29,11 +50,14 @@ def in_memory_db(monkeypatch):
 
     monkeypatch.setattr(db, "get_db_engine", lambda: test_engine)
 
+    # Rankings cached by previous tests belong to another database
+    struggle_rankings.clear()
+
     yield
 
 
-def get_word(session, word):
-    return session.get(PracticeWordORM, word)
+def get_word(session, word, user_id=DEFAULT_USER_ID):
+    return session.get(PracticeWordORM, (user_id, word))
 
 
 def test_correct_word_sets_high_familiarity():
@@ -167,7 +191,7 @@ def test_get_top_practice_words():
     # Insert into DB
     with Session(db.get_db_engine()) as session:
         for wd in words_data:
-            session.add(PracticeWordORM(**wd))
+            session.add(PracticeWordORM(user_id=DEFAULT_USER_ID, **wd))
         session.commit()
 
     # Fetch top 3 words for practice
@@ -182,3 +206,355 @@ def test_get_top_practice_words():
     actual_order = [w.word for w in top_words]
 
     assert actual_order == expected_order
+
+
+def test_practice_words_are_scoped_per_user():
+    update_practice_words([
+        {"word": "gato", "correctness": WordCorrectness.DID_NOT_KNOW}
+    ], user_id="ana")
+    update_practice_words([
+        {"word": "gato", "correctness": WordCorrectness.PERFECT},
+        {"word": "perro", "correctness": WordCorrectness.PERFECT},
+    ], user_id="luis")
+
+    ana_words = get_practice_words(user_id="ana")
+    luis_words = get_practice_words(user_id="luis")
+
+    assert [(w["word"], w["familiarity_level"]) for w in ana_words] == [("gato", 10)]
+    assert sorted(w["word"] for w in luis_words) == ["gato", "perro"]
+    assert all(w["familiarity_level"] == 70 for w in luis_words)
+    assert get_practice_words() == []
+
+
+def test_duplicate_words_in_batch_match_sequential_updates():
+    update_practice_words([
+        {"word": "Casa", "correctness": WordCorrectness.DID_NOT_KNOW},
+        {"word": "casa ", "correctness": WordCorrectness.PERFECT},
+        {"word": "casa", "correctness": WordCorrectness.PERFECT},
+    ])
+
+    for correctness in [WordCorrectness.DID_NOT_KNOW, WordCorrectness.PERFECT, WordCorrectness.PERFECT]:
+        update_practice_words([{"word": "mesa", "correctness": correctness}])
+
+    with Session(db.get_db_engine()) as s:
+        batched = get_word(s, "casa")
+        sequential = get_word(s, "mesa")
+
+        assert batched.familiarity_level == sequential.familiarity_level
+        assert batched.correct_streak_count == sequential.correct_streak_count == 2
+
+
+def test_batch_is_written_in_single_transaction():
+    update_practice_words([
+        {"word": "sol", "correctness": WordCorrectness.PERFECT},
+    ])
+
+    commits = []
+    event.listen(db.get_db_engine(), "commit", lambda conn: commits.append(conn))
+
+    update_practice_words([
+        {"word": w, "correctness": WordCorrectness.SOMEWHAT_WRONG}
+        for w in ["sol", "luna", "estrella", "cielo", "mar"]
+    ])
+
+    assert len(commits) == 1
+    with Session(db.get_db_engine()) as s:
+        assert s.scalar(select(func.count()).select_from(PracticeWordORM)) == 5
+        assert get_word(s, "sol").familiarity_level < 70
+
+
+def test_async_update_and_get_practice_words(monkeypatch):
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        monkeypatch.setattr(db, "_async_db", engine)
+
+        await update_practice_words_async([
+            {"word": "gato", "correctness": WordCorrectness.PERFECT},
+            {"word": "perro", "correctness": WordCorrectness.DID_NOT_KNOW},
+        ])
+        words = await get_practice_words_async(count=5)
+
+        await engine.dispose()
+        return words
+
+    words = asyncio.run(run())
+
+    assert [w["word"] for w in words] == ["perro", "gato"]
+    assert [w["familiarity_level"] for w in words] == [10, 70]
+
+
+def test_get_practice_words_uses_ranking_updated_on_write():
+    update_practice_words([
+        {"word": "uno", "correctness": WordCorrectness.PERFECT},
+        {"word": "dos", "correctness": WordCorrectness.SOMEWHAT_WRONG},
+    ])
+    assert [w["word"] for w in get_practice_words()] == ["dos", "uno"]
+    asyncio.run(wait_for_warmups())
+    assert struggle_rankings.get(DEFAULT_USER_ID) is not None
+
+    # Served from memory (no database round trip) and kept in sync by writes
+    queries = []
+    event.listen(db.get_db_engine(), "before_cursor_execute",
+                 lambda *args: queries.append(args[2]))
+
+    update_practice_words([
+        {"word": "tres", "correctness": WordCorrectness.DID_NOT_KNOW},
+        {"word": "dos", "correctness": WordCorrectness.PERFECT},
+    ])
+    writes = len(queries)
+    top = get_practice_words(count=2)
+
+    assert len(queries) == writes
+    assert [w["word"] for w in top] == ["tres", "dos"]
+    assert set(top[0]) == set(PracticeWordSchema.model_fields)
+
+
+def test_cold_reads_use_the_top_n_query_and_warm_the_ranking():
+    update_practice_words([{"word": w, "correctness": 1} for w in ("uno", "dos", "tres")])
+    struggle_rankings.clear()
+    queries = []
+    event.listen(db.get_db_engine(), "before_cursor_execute",
+                 lambda *args: queries.append(args[2]))
+
+    assert len(get_practice_words(count=2)) == 2
+    assert "LIMIT" in queries[0] and "ORDER BY" in queries[0]
+    asyncio.run(wait_for_warmups())
+    assert len(struggle_rankings.get(DEFAULT_USER_ID)) == 3
+
+
+def test_warm_up_racing_a_write_is_dropped():
+    update_practice_words([{"word": "uno", "correctness": 1}])
+    struggle_rankings.clear()
+
+    writes = struggle_rankings.begin_warm(DEFAULT_USER_ID)
+    assert struggle_rankings.begin_warm(DEFAULT_USER_ID) is None  # already loading
+    update_practice_words([{"word": "dos", "correctness": 1}])
+    struggle_rankings.finish_warm(DEFAULT_USER_ID, get_practice_words(count=1), writes)
+
+    assert struggle_rankings.get(DEFAULT_USER_ID) is None
+    assert struggle_rankings.begin_warm(DEFAULT_USER_ID) is not None
+
+
+def test_learners_too_large_for_the_cache_are_remembered(monkeypatch):
+    monkeypatch.setattr(struggle_rankings, "max_words", 2)
+    update_practice_words([{"word": w, "correctness": c} for w, c in (("uno", 4), ("dos", 0), ("tres", 2))])
+    struggle_rankings.clear()
+
+    get_practice_words()
+    asyncio.run(wait_for_warmups())
+
+    assert struggle_rankings.get(DEFAULT_USER_ID) is None
+    assert struggle_rankings.begin_warm(DEFAULT_USER_ID) is None
+    assert [w["word"] for w in get_practice_words(count=1)] == ["dos"]
+
+
+def test_struggle_ranking_cache_evicts_least_recently_used():
+    cache = StruggleRankingCache(max_words=3, ttl=None)
+    now = datetime.now()
+
+    def ranking(*words):
+        return StruggleRanking(
+            {"word": w, "familiarity_level": 10, "last_used": now,
+             "correct_streak_count": 0, "update_count": 0, "next_due_at": now}
+            for w in words)
+
+    cache.put("ana", ranking("a", "b"))
+    cache.put("luis", ranking("c"))
+    cache.get("ana")
+    cache.put("eva", ranking("d"))
+
+    assert cache.get("luis") is None
+    assert cache.get("ana") is not None
+    assert cache.get("eva") is not None
+
+    cache.put("big", ranking("e", "f", "g", "h"))
+    assert cache.get("big") is None
+
+
+def test_update_refreshes_usage_and_schedules_next_review():
+    update_practice_words([{"word": "agua", "correctness": WordCorrectness.PERFECT}])
+    with Session(db.get_db_engine()) as s:
+        first = get_word(s, "agua")
+        first_used, first_due = first.last_used, first.next_due_at
+        assert first.update_count == 1
+        assert first_due > first_used
+
+    update_practice_words([
+        {"word": "agua", "correctness": WordCorrectness.PERFECT},
+        {"word": "agua", "correctness": WordCorrectness.PERFECT},
+    ])
+    with Session(db.get_db_engine()) as s:
+        w = get_word(s, "agua")
+        assert w.update_count == 3
+        assert w.last_used > first_used
+        # Longer rest after a streak of good answers
+        assert w.next_due_at - w.last_used > first_due - first_used
+
+
+def test_review_interval_grows_with_familiarity_and_streak():
+    assert review_interval(10, 0) < review_interval(70, 0) < review_interval(70, 3)
+    assert review_interval(0, 0) == MIN_INTERVAL
+    assert review_interval(100, 1000) == MAX_INTERVAL
+
+
+def test_familiarity_decays_only_after_due_date():
+    last_used = datetime(2024, 1, 1)
+    due = last_used + timedelta(days=2)
+
+    assert decay_familiarity(80, last_used, due, due - timedelta(hours=1)) == 80
+    assert decay_familiarity(80, last_used, due, due + timedelta(days=2)) == 40
+
+
+def test_get_due_practice_words():
+    now = datetime.now()
+    with Session(db.get_db_engine()) as session:
+        for word, due in [("ayer", now - timedelta(days=1)),
+                          ("antes", now - timedelta(days=3)),
+                          ("mañana", now + timedelta(days=1))]:
+            session.add(PracticeWordORM(
+                user_id=DEFAULT_USER_ID, word=word, familiarity_level=50, next_due_at=due))
+        session.commit()
+
+    due_words = get_due_practice_words(count=5, now=now)
+
+    assert [w["word"] for w in due_words] == ["antes", "ayer"]
+
+
+def test_ratings_are_appended_to_observation_log():
+    update_practice_words([
+        {"word": "gato", "correctness": WordCorrectness.PERFECT},
+        {"word": "gato", "correctness": WordCorrectness.SOMEWHAT_WRONG},
+    ], source=ObservationSource.QUIZ)
+
+    with Session(db.get_db_engine()) as s:
+        log = s.scalars(select(WordObservationORM).order_by(WordObservationORM.id)).all()
+        assert [(o.word, o.correctness, o.source) for o in log] == [
+            ("gato", 4, "quiz"), ("gato", 2, "quiz")]
+        assert s.get(CompactionStateORM, DEFAULT_USER_ID).last_observation_id == log[-1].id
+
+
+def test_deferred_compaction_folds_log_into_snapshot(monkeypatch):
+    monkeypatch.setattr(practice_words, "COMPACTION_MODE", "deferred")
+    monkeypatch.setattr(practice_words, "COMPACTION_INTERVAL", 3600)
+    monkeypatch.setattr(practice_words, "_last_compaction", time.monotonic())
+    monkeypatch.setattr(practice_words, "_pending_users", set())
+
+    update_practice_words([{"word": "sol", "correctness": WordCorrectness.DID_NOT_KNOW}])
+    update_practice_words([{"word": "sol", "correctness": WordCorrectness.PERFECT}])
+
+    with Session(db.get_db_engine()) as s:
+        assert get_word(s, "sol") is None
+
+    assert compact_pending_observations(batch_size=1) == 2
+    assert compact_pending_observations() == 0
+
+    for correctness in [WordCorrectness.DID_NOT_KNOW, WordCorrectness.PERFECT]:
+        monkeypatch.setattr(practice_words, "COMPACTION_MODE", "inline")
+        update_practice_words([{"word": "luna", "correctness": correctness}])
+
+    with Session(db.get_db_engine()) as s:
+        sol, luna = get_word(s, "sol"), get_word(s, "luna")
+        assert sol.update_count == luna.update_count == 2
+        assert sol.familiarity_level == luna.familiarity_level
+
+
+def test_compaction_marks_are_per_learner(monkeypatch):
+    monkeypatch.setattr(practice_words, "COMPACTION_MODE", "deferred")
+    monkeypatch.setattr(practice_words, "COMPACTION_INTERVAL", 3600)
+    monkeypatch.setattr(practice_words, "_last_compaction", time.monotonic())
+    monkeypatch.setattr(practice_words, "_pending_users", set())
+
+    update_practice_words([{"word": "sol", "correctness": WordCorrectness.PERFECT}], user_id="ana")
+    update_practice_words([{"word": "sol", "correctness": WordCorrectness.PERFECT}], user_id="luis")
+    assert practice_words._take_pending_users() == ["ana", "luis"]
+
+    assert compact_pending_observations(user_ids=["luis"]) == 1
+    update_practice_words([{"word": "mar", "correctness": WordCorrectness.PERFECT}], user_id="luis")
+    assert compact_pending_observations() == 2
+
+    with Session(db.get_db_engine()) as s:
+        marks = dict(s.execute(select(CompactionStateORM.user_id, CompactionStateORM.last_observation_id)).all())
+        assert marks == {"ana": 1, "luis": 3}
+        assert get_word(s, "sol", "ana").update_count == get_word(s, "sol", "luis").update_count == 1
+
+
+def test_invalid_ratings_cannot_poison_the_log(monkeypatch):
+    monkeypatch.setattr(practice_words, "COMPACTION_MODE", "deferred")
+    monkeypatch.setattr(practice_words, "COMPACTION_INTERVAL", 3600)
+    monkeypatch.setattr(practice_words, "_last_compaction", time.monotonic())
+    monkeypatch.setattr(practice_words, "_pending_users", set())
+
+    update_practice_words([{"word": "perro", "correctness": WordCorrectness.DID_NOT_KNOW}])
+    update_practice_words([{"word": "perro", "correctness": 7}, {"word": "gato", "correctness": -1}])
+    # Logged before ratings were validated
+    with Session(db.get_db_engine()) as s:
+        s.add(WordObservationORM(user_id=DEFAULT_USER_ID, word="perro", correctness=9))
+        s.commit()
+
+    assert compact_pending_observations() == 1
+    update_practice_words([{"word": "perro", "correctness": WordCorrectness.PERFECT}])
+    assert compact_pending_observations() == 1
+
+    with Session(db.get_db_engine()) as s:
+        assert s.scalars(select(WordObservationORM.correctness).order_by(WordObservationORM.id)).all() == [0, 9, 4]
+        assert get_word(s, "perro").update_count == 2
+        assert get_word(s, "gato") is None
+
+
+def test_invalid_rating_does_not_master_a_new_word():
+    update_practice_words([
+        {"word": "gato", "correctness": 7},
+        {"word": "perro", "correctness": WordCorrectness.SOMEWHAT_WRONG},
+    ])
+
+    with Session(db.get_db_engine()) as s:
+        assert get_word(s, "gato") is None
+        assert get_word(s, "perro").familiarity_level == initial_familiarity(2)
+
+
+def test_inflected_forms_are_stored_as_lemma():
+    update_practice_words([
+        {"word": "Casas", "correctness": WordCorrectness.DID_NOT_KNOW},
+        {"word": "casa", "correctness": WordCorrectness.PERFECT},
+        {"word": "voy", "correctness": WordCorrectness.PERFECT},
+    ])
+
+    with Session(db.get_db_engine()) as s:
+        words = s.scalars(select(PracticeWordORM.word).order_by(PracticeWordORM.word)).all()
+        assert words == ["casa", "ir"]
+        assert get_word(s, "casa").update_count == 2
+
+
+def test_merge_lemma_duplicates():
+    now = datetime.now()
+    with Session(db.get_db_engine()) as session:
+        for word, familiarity, update_count, days_ago in [
+            ("casa", 30, 2, 5), ("casas", 90, 3, 1), ("gato", 50, 1, 1),
+        ]:
+            session.add(PracticeWordORM(
+                user_id=DEFAULT_USER_ID, word=word, familiarity_level=familiarity,
+                update_count=update_count, last_used=now - timedelta(days=days_ago)))
+        session.add(PracticeWordORM(
+            user_id="u2", word="voy", familiarity_level=10, update_count=1, last_used=now))
+        session.add(PracticeWordORM(
+            user_id="u2", word="gusto", familiarity_level=20, update_count=1, last_used=now))
+        session.add(WordObservationORM(
+            user_id=DEFAULT_USER_ID, word="casas", correctness=4, observed_at=now))
+        session.commit()
+
+    with Session(db.get_db_engine()) as session:
+        merged = merge_lemma_duplicates(session)
+        session.commit()
+
+    assert {u: [r["word"] for r in rows] for u, rows in merged.items()} == {
+        DEFAULT_USER_ID: ["casa"], "u2": ["ir"]}
+
+    with Session(db.get_db_engine()) as s:
+        casa = get_word(s, "casa")
+        assert (casa.familiarity_level, casa.update_count) == (90, 5)
+        assert get_word(s, "casas") is None
+        assert get_word(s, "ir", "u2").familiarity_level == 10
+        assert get_word(s, "gusto", "u2").familiarity_level == 20
+        assert s.scalars(select(WordObservationORM.word)).all() == ["casa"]
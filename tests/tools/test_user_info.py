@@ -1,15 +1,23 @@
+import asyncio
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from google.adk.tools import FunctionTool
 
 from charla_facil.storage import db
-from charla_facil.storage.orm_models import Base, UserProfileORM
+from charla_facil.storage.orm_models import Base
 from charla_facil.tools.user_info import (
     UserHistoryEvent,
     UserInfoUpdate,
     save_user_info,
+    save_user_info_async,
     get_user_info,
+    get_user_info_async,
+    profile_cache,
 )
+from charla_facil.util import as_tool
 
 
 @pytest.fixture(autouse=True)
@@ -28,11 +36,7 @@ def in_memory_db(monkeypatch):
     monkeypatch.setattr(db, "_db", test_engine)
 
     monkeypatch.setattr(db, "get_db_engine", lambda: test_engine)
-
-    # Insert the single initial profile row
-    with Session(test_engine) as session:
-        session.add(UserProfileORM(id=1))
-        session.commit()
+    profile_cache.clear()
 
     yield
 
@@ -93,7 +97,7 @@ def test_overwriting_works():
     assert profile.interests == ["cards"]  # fully replaced
 
 
-def test_duplicate_events_not_added_and_error_raised():
+def test_duplicate_events_are_skipped():
     first = UserInfoUpdate(
         new_events=[
             UserHistoryEvent(
@@ -105,20 +109,163 @@ def test_duplicate_events_not_added_and_error_raised():
     # First insert succeeds
     save_user_info(first)
 
-    # Try to add duplicate event
+    # Duplicate event is skipped, the rest of the update is saved
     second = UserInfoUpdate(
+        name="Alice",
         new_events=[
-            UserHistoryEvent(
-                name="Event1",
-                date="2024-01-01"
-            )
+            UserHistoryEvent(name="Event1", date="2024-01-01"),
+            UserHistoryEvent(name="Event2", date="2024-01-02"),
         ]
     )
-    # We expect IntegrityError inside save_user_info
-    with pytest.raises(Exception):
-        save_user_info(second)
+    result = save_user_info(second)
+
+    assert result.status == "success"
+    assert result.updated_fields == ["name", "new_events"]
+    assert "1 already stored" in result.message
 
-    # Verify only one event exists
     profile = get_user_info(None)
-    assert len(profile.recent_events) == 1
-    assert profile.recent_events[0].name == "Event1"
+    assert profile.name == "Alice"
+    assert [e.name for e in profile.recent_events] == ["Event2", "Event1"]
+
+    # Nothing new, nothing updated
+    result = save_user_info(second)
+    assert result.updated_fields == []
+
+
+def test_interests_are_diffed():
+    save_user_info(UserInfoUpdate(interests=["tea", "chess"]))
+
+    queries = []
+    event.listen(db.get_db_engine(), "before_cursor_execute",
+                 lambda *args: queries.append(args[2]))
+
+    result = save_user_info(UserInfoUpdate(interests=["chess", "cards"]))
+    writes = [q for q in queries if q.startswith(("INSERT", "DELETE", "UPDATE"))]
+
+    assert result.updated_fields == ["interests"]
+    assert len(writes) == 2
+    assert get_user_info().interests == ["chess", "cards"]
+
+    queries.clear()
+    assert save_user_info(UserInfoUpdate(interests=["cards", "chess"])).updated_fields == []
+    assert not [q for q in queries if q.startswith(("INSERT", "DELETE", "UPDATE"))]
+
+
+def test_async_save_and_retrieve(monkeypatch):
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        monkeypatch.setattr(db, "_async_db", engine)
+
+        result = await save_user_info_async({
+            "name": "Alice",
+            "interests": ["tea"],
+            "new_events": [{"name": "Met the Hatter", "date": "2024-02-02"}],
+        })
+        profile = await get_user_info_async()
+
+        await engine.dispose()
+        return result, profile
+
+    result, profile = asyncio.run(run())
+
+    assert result.status == "success"
+    assert profile.name == "Alice"
+    assert profile.interests == ["tea"]
+    assert profile.recent_events[0].name == "Met the Hatter"
+
+
+def test_async_tools_are_declared_under_the_sync_names(monkeypatch):
+    tool = FunctionTool(as_tool(get_user_info_async, get_user_info.__name__))
+    declaration = tool._get_declaration()
+
+    assert declaration.name == "get_user_info"
+    assert list(declaration.parameters.properties) == ["max_events"]
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        monkeypatch.setattr(db, "_async_db", engine)
+        await save_user_info_async({"name": "Alice"})
+        profile = await tool.func(max_events=1)
+        await engine.dispose()
+        return profile
+
+    assert asyncio.run(run()).name == "Alice"
+
+
+def test_profiles_are_scoped_per_user():
+    assert get_user_info(user_id="ana") == get_user_info(user_id="luis")
+
+    save_user_info(UserInfoUpdate(name="Ana", interests=["fútbol"]), user_id="ana")
+    save_user_info(UserInfoUpdate(name="Luis"), user_id="luis")
+
+    ana = get_user_info(user_id="ana")
+    luis = get_user_info(user_id="luis")
+
+    assert ana.name == "Ana"
+    assert ana.interests == ["fútbol"]
+    assert luis.name == "Luis"
+    assert luis.interests is None
+    assert get_user_info().name is None
+
+
+def test_profile_reads_are_cached_and_saves_write_through():
+    save_user_info(UserInfoUpdate(
+        name="Alice",
+        interests=["tea"],
+        new_events=[
+            UserHistoryEvent(name="Old", date="2024-01-01"),
+            UserHistoryEvent(name="Newer", date="2024-03-01"),
+        ],
+    ))
+    assert get_user_info(max_events=1).recent_events[0].name == "Newer"
+
+    queries = []
+    event.listen(db.get_db_engine(), "before_cursor_execute",
+                 lambda *args: queries.append(args[2]))
+
+    # Served from memory, kept in sync by saves
+    save_user_info(UserInfoUpdate(
+        interests=["chess"],
+        new_events=[
+            UserHistoryEvent(name="Same day", date="2024-03-01"),
+            UserHistoryEvent(name="Ancient", date="2020-01-01"),
+        ],
+    ))
+    writes = len(queries)
+    profile = get_user_info()
+
+    assert len(queries) == writes
+    assert profile.name == "Alice"
+    assert profile.interests == ["chess"]
+    assert [e.name for e in profile.recent_events] == ["Same day", "Newer", "Old", "Ancient"]
+
+    # Returned profiles are copies
+    profile.interests.append("cards")
+    assert get_user_info().interests == ["chess"]
+
+    # Same result as a database read
+    profile_cache.clear()
+    assert get_user_info() == profile.model_copy(update={"interests": ["chess"]})
+
+
+def test_profile_interests_and_events_are_loaded_in_one_query():
+    save_user_info(UserInfoUpdate(
+        name="Alice",
+        interests=["tea", "chess"],
+        new_events=[UserHistoryEvent(name=f"Event {day}", date=f"2024-01-{day:02d}") for day in range(1, 16)],
+    ))
+    profile_cache.clear()
+
+    queries = []
+    event.listen(db.get_db_engine(), "before_cursor_execute",
+                 lambda *args: queries.append(args[2]))
+    profile = get_user_info(max_events=3)
+
+    assert len(queries) == 1
+    assert profile.name == "Alice"
+    assert profile.interests == ["tea", "chess"]
+    assert [e.name for e in profile.recent_events] == ["Event 15", "Event 14", "Event 13"]